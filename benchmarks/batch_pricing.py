@@ -0,0 +1,58 @@
+"""
+Benchmark of the vectorized batch pricing against pricing every cart in a
+Python loop. `Cart.total` is cached, so the scalar baseline re-prices the
+quantities of every cart with :func:`lana_store.core.pricing.price_cart`.
+
+Usage::
+
+    $ python -m benchmarks.batch_pricing
+"""
+import random
+import time
+from typing import List
+
+from lana_store.core.batch_pricing import batch_totals, price_matrix, quantity_matrix
+from lana_store.core.pricing import price_cart
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES
+
+
+#: Number of carts priced on every run.
+CART_COUNTS = (10_000, 1_000_000)
+
+
+def build_carts(count: int) -> List[Cart]:
+    """
+    Builds `count` random carts with up to 20 products each.
+    """
+    rand = random.Random(4321)
+    return [Cart(products=rand.choices(PRODUCT_CODES, k=rand.randint(0, 20))) for _ in range(count)]
+
+
+def main() -> None:
+    print(f"{'carts':>10} {'loop (s)':>10} {'batch (s)':>10} {'matrix (s)':>11} {'speedup':>8}")
+    for count in CART_COUNTS:
+        carts = build_carts(count)
+
+        start = time.perf_counter()
+        scalar = [price_cart(cart.quantities) for cart in carts]
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vector = batch_totals(carts)
+        batch_time = time.perf_counter() - start
+
+        quantities = quantity_matrix(carts)
+        start = time.perf_counter()
+        price_matrix(quantities)
+        matrix_time = time.perf_counter() - start
+
+        assert scalar == vector
+        print(
+            f"{count:>10} {loop_time:>10.3f} {batch_time:>10.3f} {matrix_time:>11.4f} "
+            f"{loop_time / batch_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
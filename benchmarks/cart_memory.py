@@ -0,0 +1,73 @@
+"""
+Memory benchmark of the carts representation: bytes per cart of the compact
+`Cart` vs. the former pydantic model, both stored in a dict as the in-memory
+store does.
+
+Usage::
+
+    $ python -m benchmarks.cart_memory [carts]
+"""
+import gc
+import random
+import sys
+import tracemalloc
+import uuid
+from typing import Any, Callable, Dict, List
+
+from pydantic import BaseModel, Field, UUID4
+
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES, ProductCodes
+
+
+class LegacyCart(BaseModel):
+    """
+    Former layout: pydantic model keyed by the string Id.
+    """
+
+    id: UUID4 = Field(default_factory=uuid.uuid4)
+    products: List[ProductCodes] = []
+
+
+def measure(count: int, build: Callable[[List[ProductCodes]], Any]) -> float:
+    """
+    Builds `count` carts with `build` and stores them in a dict.
+
+    :return: Bytes per cart.
+    """
+    rand = random.Random(4321)
+    contents = [rand.choices(PRODUCT_CODES, k=rand.randint(0, 6)) for _ in range(count)]
+
+    gc.collect()
+    tracemalloc.start()
+    db: Dict[Any, Any] = {}
+    for products in contents:
+        key, cart = build(products)
+        db[key] = cart
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return size / count
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    def legacy(products: List[ProductCodes]) -> Any:
+        cart = LegacyCart(products=products)
+        return str(cart.id), cart
+
+    def compact(products: List[ProductCodes]) -> Any:
+        cart = Cart(products=products)
+        return cart.key, cart
+
+    legacy_size = measure(count, legacy)
+    compact_size = measure(count, compact)
+
+    print(f"{'layout':>8} {'bytes/cart':>12}")
+    print(f"{'legacy':>8} {legacy_size:>12.0f}")
+    print(f"{'compact':>8} {compact_size:>12.0f}  ({legacy_size / compact_size:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
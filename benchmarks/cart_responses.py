@@ -0,0 +1,92 @@
+"""
+Benchmark of the cart responses: latency of every cart endpoint through the
+test client, and the serialization cost of the fast encoder vs. the former
+pydantic path (build the scheme, validate it and encode it).
+
+Usage::
+
+    $ python -m benchmarks.cart_responses [requests]
+"""
+import json
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from lana_store import schemas
+from lana_store.core.config import settings
+from lana_store.core.encoding import encode_cart
+from lana_store.core.money import format_money
+from lana_store.main import app
+from lana_store.models.cart import Cart
+
+
+CARTS_URL = f"{settings.API_V1_STR}/carts"
+#: Products of the carts the serialization is timed with.
+PRODUCTS = ["PEN", "TSHIRT", "MUG"] * 4
+#: Timed runs of the serialization microbenchmark.
+NUMBER = 20_000
+
+
+def latencies(requests: int, call: Callable[[int], object]) -> List[float]:
+    """
+    Runs `call(i)` for every request.
+
+    :return: Latency of every request (microseconds).
+    """
+    timings = []
+    for index in range(requests):
+        start = time.perf_counter()
+        call(index)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def pydantic_path(cart: Cart) -> bytes:
+    """
+    Serialization of `get_cart` before the fast encoder.
+    """
+    output = schemas.CartOutput(id=cart.id, products=cart.products, total=format_money(cart.total))
+    validated = schemas.CartOutput.validate(output)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+
+    results: Dict[str, List[float]] = {}
+    with TestClient(app) as client:
+        ids: List[str] = []
+        results["POST /carts/"] = latencies(
+            requests, lambda index: ids.append(client.post(f"{CARTS_URL}/").json()["id"])
+        )
+        results["PATCH /carts/{id}"] = latencies(
+            requests,
+            lambda index: client.patch(f"{CARTS_URL}/{ids[index]}", json={"product": "PEN"}),
+        )
+        results["GET /carts/{id}"] = latencies(
+            requests, lambda index: client.get(f"{CARTS_URL}/{ids[index]}")
+        )
+
+    print(f"{'endpoint':>20} {'p50 us':>10} {'p99 us':>10}")
+    for endpoint, timings in results.items():
+        p99 = statistics.quantiles(timings, n=100)[98]
+        print(f"{endpoint:>20} {statistics.median(timings):>10.1f} {p99:>10.1f}")
+
+    cart = Cart(products=PRODUCTS)  # type: ignore
+    encoders: Tuple[Tuple[str, Callable[[Cart], bytes]], ...] = (
+        ("pydantic", pydantic_path),
+        ("fast encoder", encode_cart),
+    )
+    print(f"\n{'serialization':>20} {'us/cart':>10}")
+    for name, encode in encoders:
+        elapsed = min(timeit.repeat(lambda: encode(cart), number=NUMBER, repeat=3))
+        print(f"{name:>20} {elapsed / NUMBER * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
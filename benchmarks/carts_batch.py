@@ -0,0 +1,78 @@
+"""
+Benchmark of the carts batch endpoint: operations per second of creating,
+fetching and deleting carts one request per operation vs. batches of
+operations in a single request.
+
+Usage::
+
+    $ python -m benchmarks.carts_batch [carts] [batch size]
+"""
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import requests
+from fastapi.testclient import TestClient
+
+from lana_store.core.config import settings
+from lana_store.main import app
+
+
+CARTS_URL = f"{settings.API_V1_STR}/carts"
+
+
+def timed(operations: int, run: Callable[[], None]) -> float:
+    """
+    Runs `run()` once.
+
+    :return: Operations per second.
+    """
+    start = time.perf_counter()
+    run()
+    return operations / (time.perf_counter() - start)
+
+
+def one_call_per_operation(client: requests.Session, carts: int) -> float:
+    def run() -> None:
+        ids = [client.post(f"{CARTS_URL}/").json()["id"] for _ in range(carts)]
+        for id in ids:
+            client.get(f"{CARTS_URL}/{id}")
+        for id in ids:
+            client.delete(f"{CARTS_URL}/{id}")
+
+    return timed(3 * carts, run)
+
+
+def batched(client: requests.Session, carts: int, batch_size: int) -> float:
+    def batch(operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results = []
+        for start in range(0, len(operations), batch_size):
+            end = start + batch_size
+            resp = client.post(f"{CARTS_URL}/batch", json={"operations": operations[start:end]})
+            results.extend(resp.json()["results"])
+        return results
+
+    def run() -> None:
+        ids = [result["id"] for result in batch([{"op": "create"}] * carts)]
+        batch([{"op": "get", "id": id} for id in ids])
+        batch([{"op": "delete", "id": id} for id in ids])
+
+    return timed(3 * carts, run)
+
+
+def main() -> None:
+    carts = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    with TestClient(app) as client:
+        single = one_call_per_operation(client, carts)
+        batch = batched(client, carts, batch_size)
+
+    print(f"{'mode':>18} {'ops/s':>12}")
+    print(f"{'one call per op':>18} {single:>12,.0f}")
+    print(f"{f'batches of {batch_size}':>18} {batch:>12,.0f}")
+    print(f"{'speedup':>18} {batch / single:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
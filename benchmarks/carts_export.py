@@ -0,0 +1,64 @@
+"""
+Benchmark of the carts export format: export throughput and size per cart,
+import throughput into a fresh in-memory store, and memory allocated while
+reading an export through its memory map.
+
+Usage::
+
+    $ python -m benchmarks.carts_export [carts]
+"""
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import lana_store
+from lana_store import crud
+from lana_store.db.export import export_carts, read_export
+from lana_store.db.memory import ShardedCartStore
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    random.seed(42)
+    carts = [
+        Cart(products=random.choices(PRODUCT_CODES, k=random.randint(0, 8))) for _ in range(count)
+    ]
+
+    with tempfile.TemporaryFile() as file:
+        start = time.perf_counter()
+        for chunk in export_carts(carts):
+            file.write(chunk)
+        file.flush()
+        export_seconds = time.perf_counter() - start
+        size = file.tell()
+        del carts
+
+        file.seek(0)
+        tracemalloc.start()
+        for _ in read_export(file):
+            pass
+        read_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        lana_store.carts_db = ShardedCartStore()
+        file.seek(0)
+        start = time.perf_counter()
+        imported = crud.import_carts(read_export(file))
+        import_seconds = time.perf_counter() - start
+
+    print(f"{'carts':>24} {imported:>12}")
+    print(f"{'export size (MB)':>24} {size / 1e6:>12.1f}")
+    print(f"{'bytes per cart':>24} {size / imported:>12.1f}")
+    print(f"{'export (carts/s)':>24} {imported / export_seconds:>12.0f}")
+    print(f"{'import (carts/s)':>24} {imported / import_seconds:>12.0f}")
+    print(f"{'import time (s)':>24} {import_seconds:>12.2f}")
+    print(f"{'read peak alloc (KB)':>24} {read_peak / 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
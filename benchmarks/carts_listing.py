@@ -0,0 +1,86 @@
+"""
+Benchmark of the carts listing: latency of a page through the secondary
+indexes (first page, deep cursor, creation time, common and rare product,
+total filters) vs. a scan of every cart, and memory of the indexes per cart.
+
+Usage::
+
+    $ python -m benchmarks.carts_listing [carts]
+"""
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import lana_store
+from lana_store import crud
+from lana_store.core.index import CartIndex
+from lana_store.db.memory import ShardedCartStore
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES
+
+
+#: Carts per page.
+LIMIT = 50
+
+
+def per_call_ms(run: Callable[[], Any], repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    random.seed(42)
+    lana_store.carts_db = ShardedCartStore()
+    carts = []
+    for i in range(count):
+        # The last product is rare: in 1 cart every 10k
+        products = random.choices(PRODUCT_CODES[:-1], k=random.randint(0, 4))
+        if i % 10_000 == 0:
+            products.append(PRODUCT_CODES[-1])
+        cart = Cart(products=products)
+        lana_store.carts_db.add(cart)
+        carts.append(cart)
+
+    index = CartIndex()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for cart in carts:
+        index.add(cart.key, cart.counts)
+    index_seconds = time.perf_counter() - start
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    lana_store.index = index
+
+    middle = list(index.scan(created_after=index.created(carts[count // 2].key)))[0]
+    common, rare = PRODUCT_CODES[0], PRODUCT_CODES[-1]
+
+    cases = {
+        "first page": lambda: crud.list_carts(LIMIT),
+        "deep cursor": lambda: crud.list_carts(LIMIT, after=middle),
+        "created after": lambda: crud.list_carts(LIMIT, created_after=middle[0]),
+        f"product {common}": lambda: crud.list_carts(LIMIT, product=common),
+        f"product {rare}": lambda: crud.list_carts(LIMIT, product=rare),
+        "min total": lambda: crud.list_carts(LIMIT, min_total=3000),
+    }
+
+    def full_scan() -> Any:
+        matching = [cart for cart in lana_store.carts_db.values() if cart.counts[-1]]
+        return matching[:LIMIT]
+
+    print(f"{'carts':>24} {count:>12}")
+    print(f"{'index build (carts/s)':>24} {count / index_seconds:>12.0f}")
+    print(f"{'index bytes per cart':>24} {index_bytes / count:>12.0f}")
+    print(f"{'page':>24} {'ms':>12}")
+    for name, run in cases.items():
+        print(f"{name:>24} {per_call_ms(run):>12.3f}")
+    print(f"{'full scan ' + rare:>24} {per_call_ms(full_scan, repeat=3):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the carts analytics: cost of publishing a cart change, throughput
+of the consumer adding the changes to the aggregates, and time to get the
+stats from the aggregates (stats endpoint) vs. computing them by scanning
+every cart.
+
+Usage::
+
+    $ python -m benchmarks.carts_stats [carts]
+"""
+import asyncio
+import random
+import sys
+import time
+
+import lana_store
+from lana_store.api.v1.endpoints.carts import get_carts_stats
+from lana_store.core.analytics import CartAnalytics
+from lana_store.db.memory import ShardedCartStore
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES
+
+
+def scan_stats(carts_db: ShardedCartStore) -> None:
+    """
+    Computes the stats from every cart, as without the analytics.
+    """
+    analytics = CartAnalytics()
+    analytics.load(cart.counts for cart in carts_db.values())
+
+
+async def run(count: int) -> None:
+    random.seed(42)
+    carts_db = ShardedCartStore()
+    changes = []
+    for _ in range(count):
+        cart = Cart(products=random.choices(PRODUCT_CODES, k=random.randint(0, 8)))
+        carts_db.add(cart)
+        changes.append((None, tuple(cart.counts)))
+
+    analytics = CartAnalytics(max_pending=count)
+    analytics.start()
+
+    start = time.perf_counter()
+    for before, after in changes:
+        analytics.publish(before, after)
+    publish_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    while analytics.pending:
+        await asyncio.sleep(0)
+    consume_seconds = time.perf_counter() - start
+    analytics.stop()
+    assert analytics.carts == count and not analytics.dropped
+
+    lana_store.analytics = analytics
+    start = time.perf_counter()
+    for _ in range(1000):
+        await get_carts_stats()
+    read_seconds = (time.perf_counter() - start) / 1000
+
+    start = time.perf_counter()
+    scan_stats(carts_db)
+    scan_seconds = time.perf_counter() - start
+
+    print(f"{'carts':>24} {count:>12}")
+    print(f"{'publish (ns/change)':>24} {publish_seconds / count * 1e9:>12.0f}")
+    print(f"{'consume (changes/s)':>24} {count / consume_seconds:>12.0f}")
+    print(f"{'stats endpoint (us)':>24} {read_seconds * 1e6:>12.1f}")
+    print(f"{'stats by scan (ms)':>24} {scan_seconds * 1e3:>12.1f}")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    asyncio.run(run(count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark of the API consumers against a local uvicorn server: operations per
+second of the blocking consumer (one request at a time) vs. the asynchronous
+one with a pool of keep-alive connections and several requests in flight.
+
+Every cart is created, gets a product, is fetched and is deleted (4 requests).
+The server delays every response by `LATENCY_MS` (default 5 ms) without using
+any CPU, to simulate the network round trip a local server does not have.
+
+Usage::
+
+    $ LATENCY_MS=5 python -m benchmarks.client_throughput [carts] [concurrency ...]
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+from benchmarks.server import uvicorn_server
+
+from lana_client.api import LanaStoreApi
+from lana_client.async_api import AsyncLanaStoreApi
+from lana_store.main import app
+
+
+LATENCY_MS = float(os.environ.get("LATENCY_MS", 5))
+
+
+async def delayed_app(scope, receive, send) -> None:  # type: ignore
+    """
+    The API, with the simulated network latency.
+    """
+    if scope["type"] == "http":
+        await asyncio.sleep(LATENCY_MS / 1000)
+    await app(scope, receive, send)
+
+
+def blocking(endpoint: str, carts: int) -> float:
+    api = LanaStoreApi()
+    api.CARTS_ENDPOINT = endpoint
+
+    start = time.perf_counter()
+    for _ in range(carts):
+        id = api.create_cart().json()["id"]
+        api.add_product(id, "PEN")
+        api.get_cart(id)
+        api.remove_cart(id)
+
+    return 4 * carts / (time.perf_counter() - start)
+
+
+async def concurrent(endpoint: str, carts: int, concurrency: int) -> float:
+    async with AsyncLanaStoreApi(
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        max_concurrency=concurrency,
+    ) as api:
+        api.CARTS_ENDPOINT = endpoint
+
+        async def cart_lifecycle() -> None:
+            id = (await api.create_cart()).json()["id"]
+            await api.add_product(id, "PEN")
+            await api.get_cart(id)
+            await api.remove_cart(id)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(cart_lifecycle() for _ in range(carts)))
+
+        return 4 * carts / (time.perf_counter() - start)
+
+
+def main() -> None:
+    carts = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    concurrencies: List[int] = [int(arg) for arg in sys.argv[2:]] or [1, 10, 50, 100]
+
+    with uvicorn_server("benchmarks.client_throughput:delayed_app") as server:
+        endpoint = f"{server.base_url}/api/v1/carts/"
+        single = blocking(endpoint, carts)
+        print(f"simulated latency: {LATENCY_MS:g} ms")
+        print(f"{'client':>24} {'ops/s':>10} {'speedup':>8}")
+        print(f"{'blocking':>24} {single:>10,.0f} {1:>7.1f}x")
+        for concurrency in concurrencies:
+            ops = asyncio.run(concurrent(endpoint, carts, concurrency))
+            print(f"{f'async, {concurrency} in flight':>24} {ops:>10,.0f} {ops / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
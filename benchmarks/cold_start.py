@@ -0,0 +1,130 @@
+"""
+Benchmark of the cold start of the API: time to import the app in a fresh
+interpreter, and time from launching a uvicorn process until its first cart
+response and first OpenAPI schema response, with the schema generated on
+request and precomputed (`OPENAPI_SCHEMA_PATH`).
+
+Exits with status 1 when the median import time or time to first response is
+over the given limits, so it can gate a CI pipeline.
+
+Usage::
+
+    $ python -m benchmarks.cold_start [--runs 5] [--max-import-ms 300]
+        [--max-first-response-ms 1500]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from benchmarks.server import free_port
+
+
+IMPORT_SCRIPT = (
+    "import time; start = time.perf_counter(); import lana_store.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def import_seconds() -> float:
+    """
+    Seconds to import the app in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], capture_output=True, check=True, text=True
+    )
+    return float(result.stdout)
+
+
+def first_responses(env: Dict[str, str]) -> Tuple[float, float]:
+    """
+    Launches a uvicorn process and times its first responses.
+
+    :param env: Environment of the process.
+    :raises RuntimeError: When the server does not start.
+    :return: Seconds from the launch until the first cart response, and
+        seconds of the first OpenAPI schema request.
+    """
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "lana_store.main:app",
+            "--port", str(port), "--log-level", "warning", "--no-access-log",
+        ],
+        env=env,
+    )
+
+    try:
+        deadline = start + 30
+        while True:
+            try:
+                requests.post(f"{base_url}/api/v1/carts/", timeout=1).raise_for_status()
+                break
+            except requests.exceptions.ConnectionError:
+                if time.perf_counter() > deadline or server.poll() is not None:
+                    raise RuntimeError("The server did not start")
+                time.sleep(0.002)
+        first_cart = time.perf_counter() - start
+
+        start = time.perf_counter()
+        requests.get(f"{base_url}/api/v1/openapi.json", timeout=5).raise_for_status()
+        first_schema = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    return first_cart, first_schema
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold start benchmark of the Lana Store API.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-first-response-ms", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    imports = [import_seconds() for _ in range(args.runs)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        schema_path = os.path.join(directory, "openapi.json")
+        subprocess.run([sys.executable, "-m", "lana_store.openapi", schema_path], check=True)
+
+        envs = {
+            "generated schema": dict(os.environ),
+            "precomputed schema": dict(os.environ, OPENAPI_SCHEMA_PATH=schema_path),
+        }
+        responses: Dict[str, List[Tuple[float, float]]] = {
+            name: [first_responses(env) for _ in range(args.runs)] for name, env in envs.items()
+        }
+
+    import_ms = statistics.median(imports) * 1000
+    print(f"{'import':>20} {import_ms:>10.1f} ms")
+    print(f"{'mode':>20} {'first cart':>13} {'first schema':>13}")
+    first_response_ms = 0.0
+    for name, runs in responses.items():
+        cart_ms = statistics.median(cart for cart, _schema in runs) * 1000
+        schema_ms = statistics.median(schema for _cart, schema in runs) * 1000
+        first_response_ms = max(first_response_ms, cart_ms)
+        print(f"{name:>20} {cart_ms:>10.1f} ms {schema_ms:>10.1f} ms")
+
+    failed = False
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"Import time over {args.max_import_ms} ms")
+        failed = True
+    if args.max_first_response_ms is not None and first_response_ms > args.max_first_response_ms:
+        print(f"Time to first response over {args.max_first_response_ms} ms")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
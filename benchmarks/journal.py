@@ -0,0 +1,96 @@
+"""
+Benchmarks of the carts write-ahead log: write throughput of every fsync
+policy and recovery time (snapshot plus log tail) of 1M carts.
+
+Usage::
+
+    $ python -m benchmarks.journal [directory]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from typing import Iterator
+
+from lana_store.db.journal import CartJournal, OP_ADD_PRODUCT, OP_CREATE, SNAPSHOT_FILE
+from lana_store.db.memory import ShardedCartStore
+from lana_store.db.snapshot import SnapshotCart, write_snapshot
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES
+
+
+#: Changes logged per fsync policy.
+WRITES = {"always": 2_000, "interval": 100_000, "never": 100_000}
+#: Carts in the recovered snapshot.
+RECOVERY_CARTS = 1_000_000
+#: Records in the recovered log tail.
+RECOVERY_TAIL = 100_000
+
+
+def bench_writes(directory: str) -> None:
+    print(f"{'fsync':>8} {'writes':>8} {'writes/s':>12}")
+    for policy, writes in WRITES.items():
+        path = os.path.join(directory, policy)
+        store = ShardedCartStore()
+        journal = CartJournal(store, path, fsync=policy)  # type: ignore
+        journal.open()
+
+        cart = Cart()
+        start = time.perf_counter()
+        journal.apply(OP_CREATE, lambda: (store.add(cart), cart)[1])  # type: ignore
+        for _ in range(writes - 1):
+            journal.apply(
+                OP_ADD_PRODUCT, lambda: store.update(str(cart.id), lambda c: None), "PEN"
+            )
+        journal.close()
+        elapsed = time.perf_counter() - start
+
+        print(f"{policy:>8} {writes:>8} {writes / elapsed:>12,.0f}")
+
+
+def bench_recovery(directory: str) -> None:
+    rand = random.Random(4321)
+    path = os.path.join(directory, "recovery")
+    os.makedirs(path)
+
+    def carts() -> Iterator[SnapshotCart]:
+        for _ in range(RECOVERY_CARTS):
+            lines = bytes(rand.choices(range(len(PRODUCT_CODES)), k=rand.randint(0, 6)))
+            yield SnapshotCart(uuid.uuid4().bytes, len(lines), lines)
+
+    write_snapshot(os.path.join(path, SNAPSHOT_FILE), carts(), 0)
+
+    store = ShardedCartStore()
+    journal = CartJournal(store, path, fsync="never")
+    journal.open()
+    for _ in range(RECOVERY_TAIL // 2):
+        cart = Cart()
+        journal.apply(OP_CREATE, lambda: (store.add(cart), cart)[1])  # type: ignore
+        journal.apply(
+            OP_ADD_PRODUCT,
+            lambda: store.update(str(cart.id), lambda c: c.add_product("MUG")),
+            "MUG",
+        )
+    journal.close()
+
+    start = time.perf_counter()
+    recovered = CartJournal(ShardedCartStore(), path).open()
+    elapsed = time.perf_counter() - start
+
+    print(f"recovered {recovered:,} carts + {RECOVERY_TAIL:,} records in {elapsed:.2f}s")
+
+
+def main() -> None:
+    directory = tempfile.mkdtemp(dir=sys.argv[1] if len(sys.argv) > 1 else None)
+    try:
+        bench_writes(directory)
+        bench_recovery(directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
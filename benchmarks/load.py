@@ -0,0 +1,399 @@
+"""
+Load generator of the carts API: drives a realistic mix of cart operations
+(create, add a product, get and delete) against the app, either in-process or
+over a local uvicorn server, and reports the throughput, the latency
+percentiles and the memory used per cart.
+
+Results can be saved as JSON and compared with a stored baseline: the run
+fails (exit status 1) when a metric is worse than the baseline by more than
+the threshold.
+
+Usage::
+
+    $ python -m benchmarks.load --mode uvicorn --concurrency 16 --output results.json
+    $ python -m benchmarks.load --mix create=1,patch=6,get=4,delete=1 --requests 50000
+    $ python -m benchmarks.load --baseline benchmarks/load_baseline.json --threshold 10
+"""
+import argparse
+import asyncio
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks.server import uvicorn_server
+
+from lana_store.core.config import settings
+from lana_store.models.product import PRODUCT_CODES
+
+
+CARTS_URL = f"{settings.API_V1_STR}/carts"
+
+#: Default weight of every operation in the mix.
+DEFAULT_MIX = {"create": 1, "patch": 6, "get": 4, "delete": 1}
+
+#: Metrics compared with the baseline and whether higher values are better.
+METRICS = {
+    "throughput": True,
+    "latency_p50_ms": False,
+    "latency_p99_ms": False,
+    "latency_p999_ms": False,
+    "bytes_per_cart": False,
+}
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """
+    Parses an operations mix (e.g. `create=1,patch=6,get=4,delete=1`).
+
+    :raises ValueError: On unknown operations or invalid weights.
+    :return: Weight of every operation.
+    """
+    mix: Dict[str, int] = {}
+    for item in text.split(","):
+        op, _, weight = item.partition("=")
+        if op not in DEFAULT_MIX:
+            raise ValueError(f"Unknown operation '{op}'")
+        mix[op] = int(weight)
+        if mix[op] < 0:
+            raise ValueError(f"Invalid weight of '{op}'")
+
+    if not any(mix.values()):
+        raise ValueError("The mix has no operations")
+
+    return mix
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    :param values: Sorted values.
+    :param p: Percentile (e.g. `99.9`).
+    """
+    if not values:
+        return 0.0
+
+    # Rounded, so float errors (e.g. 99.9 / 100 * 1000) do not skip a rank
+    rank = math.ceil(round(p / 100 * len(values), 9))
+    return values[max(0, min(len(values) - 1, rank - 1))]
+
+
+class LoadGenerator:
+    """
+    Runs random cart operations and records their latencies.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, int], seed: int) -> None:
+        """
+        Class initialization.
+
+        :param client: HTTP client, connected to the app.
+        :param mix: Weight of every operation.
+        :param seed: Random seed, the same seed runs the same operations.
+        """
+        self.client = client
+        self.ops = list(mix)
+        self.weights = list(mix.values())
+        self.rand = random.Random(seed)
+
+        #: Ids of the carts created and not deleted yet, but those in use.
+        self.carts: List[str] = []
+        #: Latencies (seconds) of every operation.
+        self.latencies: Dict[str, List[float]] = {op: [] for op in DEFAULT_MIX}
+        #: Number of unexpected responses.
+        self.errors = 0
+
+    async def request(self, op: str, verb: str, url: str, **kwargs: Any) -> httpx.Response:
+        start = time.perf_counter()
+        resp = await self.client.request(verb, url, **kwargs)
+        self.latencies[op].append(time.perf_counter() - start)
+
+        if resp.status_code >= 400:
+            self.errors += 1
+
+        return resp
+
+    def take_cart(self) -> str:
+        """
+        Takes a random cart out of the list of carts, so no other client uses
+        it (e.g. deletes it) meanwhile.
+        """
+        # Swap with the last one to remove in O(1)
+        index = self.rand.randrange(len(self.carts))
+        self.carts[index], self.carts[-1] = self.carts[-1], self.carts[index]
+        return self.carts.pop()
+
+    async def operation(self) -> None:
+        """
+        Runs a random operation. Carts are created when there are none free.
+        """
+        op = self.rand.choices(self.ops, self.weights)[0]
+        if op == "create" or not self.carts:
+            resp = await self.request("create", "POST", f"{CARTS_URL}/")
+            if resp.status_code == 201:
+                self.carts.append(resp.json()["id"])
+            return
+
+        id = self.take_cart()
+        if op == "patch":
+            product = self.rand.choice(PRODUCT_CODES)
+            await self.request("patch", "PATCH", f"{CARTS_URL}/{id}", json={"product": product})
+        elif op == "get":
+            await self.request("get", "GET", f"{CARTS_URL}/{id}")
+        else:
+            await self.request("delete", "DELETE", f"{CARTS_URL}/{id}")
+            return
+
+        self.carts.append(id)
+
+    async def run(self, requests: int, concurrency: int) -> float:
+        """
+        Runs operations from `concurrency` concurrent clients.
+
+        :return: Elapsed seconds.
+        """
+
+        async def worker(count: int) -> None:
+            for _ in range(count):
+                await self.operation()
+
+        counts = [
+            requests // concurrency + (i < requests % concurrency) for i in range(concurrency)
+        ]
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(count) for count in counts))
+
+        return time.perf_counter() - start
+
+    async def fill(self, carts: int, measure: Callable[[], Optional[int]]) -> Optional[float]:
+        """
+        Creates carts with a few products each and measures the memory they use.
+
+        :param carts: Number of carts to create.
+        :param measure: Returns the memory used by the app (bytes), `None` when
+            it cannot be measured.
+        :return: Bytes per cart (if it can be measured).
+        """
+        before = measure()
+        for _ in range(carts):
+            resp = await self.client.post(f"{CARTS_URL}/")
+            products = self.rand.choices(PRODUCT_CODES, k=self.rand.randint(1, 6))
+            await self.client.patch(
+                f"{CARTS_URL}/{resp.json()['id']}/products",
+                json={"add": [{"product": product, "quantity": 1} for product in products]},
+            )
+        after = measure()
+
+        if before is None or after is None:
+            return None
+        return (after - before) / carts
+
+
+def process_memory(pid: int) -> Callable[[], Optional[int]]:
+    """
+    Resident memory of a process (Linux only).
+    """
+
+    def measure() -> Optional[int]:
+        try:
+            with open(f"/proc/{pid}/statm") as file:
+                return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return None
+
+    return measure
+
+
+def traced_memory() -> Optional[int]:
+    """
+    Memory allocated by the current process since the first call. Tracing
+    starts then, so it does not slow down the measured load.
+    """
+    gc.collect()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    args: argparse.Namespace,
+    measure: Callable[[], Optional[int]],
+) -> Dict[str, Any]:
+    """
+    Runs the warm-up, the measured load and the memory fill.
+
+    :return: Results.
+    """
+    generator = LoadGenerator(client, args.mix, args.seed)
+    await generator.run(args.warmup, args.concurrency)
+    generator.latencies = {op: [] for op in DEFAULT_MIX}
+    generator.errors = 0
+
+    elapsed = await generator.run(args.requests, args.concurrency)
+
+    latencies = {
+        op: sorted(values) for op, values in generator.latencies.items() if values
+    }
+    latencies["all"] = sorted(value for values in generator.latencies.values() for value in values)
+
+    return {
+        "mode": args.mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "seed": args.seed,
+        "throughput": args.requests / elapsed,
+        "errors": generator.errors,
+        "latency_ms": {
+            op: {
+                f"p{label}": percentile(values, p) * 1000
+                for label, p in (("50", 50), ("99", 99), ("999", 99.9))
+            }
+            for op, values in latencies.items()
+        },
+        "bytes_per_cart": await generator.fill(args.fill, measure) if args.fill else None,
+    }
+
+
+async def run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Drives the app in this process (no network nor HTTP parsing).
+    """
+    from lana_store.main import app
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://lana") as client:
+            return await run_load(client, args, traced_memory)
+    finally:
+        tracemalloc.stop()
+        await app.router.shutdown()
+
+
+async def run_over_uvicorn(args: argparse.Namespace, pid: int, base_url: str) -> Dict[str, Any]:
+    """
+    Drives the app running in a uvicorn process.
+    """
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        return await run_load(client, args, process_memory(pid))
+
+
+def flatten(results: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """
+    Metrics compared with the baseline.
+    """
+    latency = results["latency_ms"]["all"]
+    return {
+        "throughput": results["throughput"],
+        "latency_p50_ms": latency["p50"],
+        "latency_p99_ms": latency["p99"],
+        "latency_p999_ms": latency["p999"],
+        "bytes_per_cart": results["bytes_per_cart"],
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Compares results with a baseline.
+
+    :param results: Results of this run.
+    :param baseline: Stored results.
+    :param threshold: Max percentage a metric can be worse than the baseline.
+    :return: Description of every regression.
+    """
+    regressions = []
+    current, previous = flatten(results), flatten(baseline)
+    for metric, higher_is_better in METRICS.items():
+        value, reference = current[metric], previous[metric]
+        if value is None or not reference:
+            continue
+
+        change = (value - reference) / reference * 100
+        if (-change if higher_is_better else change) > threshold:
+            regressions.append(
+                f"{metric}: {value:,.2f} vs. {reference:,.2f} in the baseline ({change:+.1f}%)"
+            )
+
+    return regressions
+
+
+def report(results: Dict[str, Any]) -> None:
+    print(f"mode: {results['mode']}, {results['requests']:,} requests, "
+          f"concurrency {results['concurrency']}, mix {results['mix']}")
+    print(f"throughput: {results['throughput']:,.0f} req/s, errors: {results['errors']}")
+    if results["bytes_per_cart"] is not None:
+        print(f"memory: {results['bytes_per_cart']:,.0f} bytes per cart")
+
+    print(f"{'latency (ms)':>12} {'p50':>9} {'p99':>9} {'p99.9':>9}")
+    for op, latency in results["latency_ms"].items():
+        print(f"{op:>12} {latency['p50']:>9.3f} {latency['p99']:>9.3f} {latency['p999']:>9.3f}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator of the carts API.")
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--requests", type=int, default=20_000, help="Measured requests.")
+    parser.add_argument("--warmup", type=int, default=1_000, help="Requests before measuring.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients.")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="Weight of every operation, e.g. create=1,patch=6,get=4,delete=1.",
+    )
+    parser.add_argument("--fill", type=int, default=5_000, help="Carts to measure memory.")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Saves the results as JSON.")
+    parser.add_argument("--baseline", help="Results to compare with.")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="Max regression percentage."
+    )
+    args = parser.parse_args(argv)
+
+    if args.mode == "inprocess":
+        results = asyncio.run(run_in_process(args))
+    else:
+        with uvicorn_server() as server:
+            results = asyncio.run(run_over_uvicorn(args, server.process.pid, server.base_url))
+
+    results["python"] = platform.python_version()
+    results["date"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    report(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if (baseline["mode"], baseline["mix"]) != (results["mode"], results["mix"]):
+            print("Warning: the baseline was run with a different mode or mix")
+
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:g}% of the baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Benchmark of the metrics overhead: cost of the counter and histogram updates,
+of the pricing timers and of the latency middleware per request (a trivial
+app with and without the middleware).
+
+Usage::
+
+    $ python -m benchmarks.metrics [iterations]
+"""
+import asyncio
+import sys
+import time
+from time import perf_counter
+from typing import Any, Callable
+
+from starlette.types import Receive, Scope, Send
+
+from lana_store.api.middleware import MetricsMiddleware
+from lana_store.core.metrics import Counter, Histogram
+
+
+def per_call(iterations: int, run: Callable[[int], None]) -> float:
+    """
+    Runs `run(iterations)` and returns the nanoseconds per iteration.
+    """
+    start = time.perf_counter()
+    run(iterations)
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+async def endpoint() -> None:
+    pass
+
+
+class Route:
+    path = "/api/v1/carts/{cart_id}"
+    endpoint = endpoint
+
+
+class App:
+    routes = [Route()]
+
+
+async def trivial_app(scope: Scope, receive: Receive, send: Send) -> None:
+    scope["endpoint"] = endpoint
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def requests_per_call(iterations: int, app: Any) -> float:
+    """
+    Runs `iterations` requests through an ASGI app.
+
+    :return: Nanoseconds per request.
+    """
+
+    async def send(message: Any) -> None:
+        pass
+
+    async def receive() -> Any:
+        return {"type": "http.request", "body": b""}
+
+    async def run() -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            scope = {"type": "http", "method": "GET", "path": "/", "app": App}
+            await app(scope, receive, send)
+        return (time.perf_counter() - start) / iterations * 1e9
+
+    return asyncio.run(run())
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    counter = Counter("counter_total", "Counter.", ("product",))
+    histogram = Histogram("histogram_seconds", "Histogram.", ("operation",))
+
+    def increments(n: int) -> None:
+        for _ in range(n):
+            counter.inc(("PEN",))
+
+    def observations(n: int) -> None:
+        for _ in range(n):
+            histogram.observe(("add_product",), 0.003)
+
+    def timers(n: int) -> None:
+        for _ in range(n):
+            start = perf_counter()
+            histogram.observe(("add_product",), perf_counter() - start)
+
+    bare = requests_per_call(iterations, trivial_app)
+    instrumented = requests_per_call(iterations, MetricsMiddleware(trivial_app))
+
+    print(f"{'operation':>28} {'ns':>8}")
+    print(f"{'counter increment':>28} {per_call(iterations, increments):>8.0f}")
+    print(f"{'histogram observation':>28} {per_call(iterations, observations):>8.0f}")
+    print(f"{'pricing timer':>28} {per_call(iterations, timers):>8.0f}")
+    print(f"{'request without middleware':>28} {bare:>8.0f}")
+    print(f"{'request with middleware':>28} {instrumented:>8.0f}")
+    print(f"{'middleware overhead':>28} {instrumented - bare:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Microbenchmark of the money formatting on the GET cart path: integer
+formatting with `divmod` vs. the former float division, and the whole cart
+serialization with each of them.
+
+Usage::
+
+    $ python -m benchmarks.money
+"""
+import timeit
+from typing import Callable
+
+from lana_store.core import encoding
+from lana_store.core.money import format_money
+from lana_store.models.cart import Cart
+
+
+#: Timed runs per case.
+NUMBER = 500_000
+#: Cart serialized on every run.
+CART = Cart(products=["PEN", "TSHIRT", "MUG"] * 4)
+
+
+def float_format_money(amount: int) -> str:
+    """
+    Former float-based formatting.
+    """
+    return f"{amount / (10 ** 2):.2f}"
+
+
+def time_ns(run: Callable[[], object]) -> float:
+    """
+    :return: Nanoseconds per run.
+    """
+    return min(timeit.repeat(run, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+
+def main() -> None:
+    print(f"{'case':>28} {'ns/op':>10}")
+    print(f"{'format (float)':>28} {time_ns(lambda: float_format_money(CART.total)):>10.1f}")
+    print(f"{'format (divmod)':>28} {time_ns(lambda: format_money(CART.total)):>10.1f}")
+
+    for name, formatter in (("float", float_format_money), ("divmod", format_money)):
+        encoding.format_money = formatter  # type: ignore
+        elapsed = time_ns(lambda: encoding.encode_cart(CART, with_total=True))
+        print(f"{f'GET cart encoding ({name})':>28} {elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
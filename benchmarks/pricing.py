@@ -0,0 +1,62 @@
+"""
+Microbenchmark of the pricing engine: the cost of pricing a cart must not
+depend on the number of loaded pricing rules.
+
+Usage::
+
+    $ python -m benchmarks.pricing
+"""
+import timeit
+from typing import Dict, List
+
+from lana_store.core.config import settings
+from lana_store.core.pricing import compile_rules
+from lana_store.models.pricing import PricingRule
+from lana_store.models.product import Product, ProductCodes
+
+
+#: Number of extra (synthetic) products with a rule each.
+RULE_COUNTS = (0, 10, 1_000, 100_000)
+#: Cart priced on every run.
+CART: Dict[ProductCodes, int] = {"PEN": 7, "TSHIRT": 4, "MUG": 3}
+#: Timed runs per rule count.
+NUMBER = 200_000
+
+
+def build_catalog(extra_rules: int) -> Dict[str, Product]:
+    """
+    Builds a product table with `extra_rules` synthetic products on top of the
+    configured ones.
+    """
+    table: Dict[str, Product] = dict(settings.PRODUCT_TABLE)  # type: ignore
+    for index in range(extra_rules):
+        table[f"SKU{index}"] = {"name": f"Product {index}", "price": 100 + index}
+    return table
+
+
+def build_rules(extra_rules: int) -> List[PricingRule]:
+    """
+    Builds the configured rules plus one synthetic rule per synthetic product.
+    """
+    rules: List[PricingRule] = list(settings.PRICING_RULES)
+    for index in range(extra_rules):
+        rules.append(
+            {"kind": "BUY_X_PAY_Y", "product": f"SKU{index}", "buy": 3, "pay": 2}  # type: ignore
+        )
+    return rules
+
+
+def main() -> None:
+    print(f"{'rules':>8} {'ns/cart':>10}")
+    for extra in RULE_COUNTS:
+        table = compile_rules(build_catalog(extra), build_rules(extra))  # type: ignore
+
+        def price() -> int:
+            return sum(table[product](count) for product, count in CART.items())
+
+        elapsed = min(timeit.repeat(price, number=NUMBER, repeat=5))
+        print(f"{len(settings.PRICING_RULES) + extra:>8} {elapsed / NUMBER * 1e9:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Runs an ASGI app under a local uvicorn process for the benchmarks that need a
+real server.
+"""
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple
+
+import requests
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Server(NamedTuple):
+    #: Server process.
+    process: "subprocess.Popen[bytes]"
+    #: Base URL of the server (e.g. `http://127.0.0.1:8000`).
+    base_url: str
+
+
+@contextmanager
+def uvicorn_server(app: str = "lana_store.main:app") -> Iterator[Server]:
+    """
+    Runs an app in a uvicorn process and waits until it accepts requests.
+
+    :param app: Import path of the app.
+    :raises RuntimeError: When the server does not start.
+    :return: The server process and its base URL.
+    """
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", app,
+            "--port", str(port), "--log-level", "warning", "--no-access-log",
+        ]
+    )
+    server = Server(process, f"http://127.0.0.1:{port}")
+
+    try:
+        for _ in range(100):
+            try:
+                requests.get(f"{server.base_url}/docs", timeout=1)
+                break
+            except requests.exceptions.ConnectionError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("The server did not start")
+
+        yield server
+    finally:
+        process.terminate()
+        process.wait()
@@ -0,0 +1,93 @@
+"""
+Benchmark of the shared-memory carts store across worker processes: aggregate
+throughput of a get/patch mix with 1, 2, 4... processes (up to the number of
+cores), and lookups of unknown carts before and after churn (every cart
+deleted and created again a few times).
+
+Usage::
+
+    $ python -m benchmarks.shm_scaling [operations per process]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import time
+import uuid
+from typing import List
+
+from lana_store.db.shm import SharedMemoryCartStore
+from lana_store.models.cart import Cart
+
+
+#: Carts shared by all the processes.
+CARTS = 10_000
+
+
+def add_mug(cart: Cart) -> None:
+    if len(cart.products) < 64:
+        cart.add_product("MUG")
+
+
+def work(store: SharedMemoryCartStore, ids: List[str], operations: int, seed: int) -> None:
+    rand = random.Random(seed)
+    for _ in range(operations):
+        id = rand.choice(ids)
+        if rand.random() < 0.2:
+            store.update(id, add_mug)
+        else:
+            store.get(id)
+
+
+def misses_per_second(store: SharedMemoryCartStore, lookups: int = 10_000) -> float:
+    ids = [str(uuid.uuid4()) for _ in range(lookups)]
+    start = time.perf_counter()
+    for id in ids:
+        store.get(id)
+    return lookups / (time.perf_counter() - start)
+
+
+def main() -> None:
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    ctx = multiprocessing.get_context("fork")
+
+    store = SharedMemoryCartStore(capacity=CARTS * 2, max_lines=64)
+    try:
+        ids = []
+        for _ in range(CARTS):
+            cart = Cart()
+            store.add(cart)
+            ids.append(str(cart.id))
+
+        processes, baseline = 1, 0.0
+        print(f"{'processes':>10} {'ops/s':>12} {'scaling':>8}")
+        while processes <= (os.cpu_count() or 1):
+            workers = [
+                ctx.Process(target=work, args=(store, ids, operations, seed))
+                for seed in range(processes)
+            ]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            throughput = processes * operations / (time.perf_counter() - start)
+            baseline = baseline or throughput
+
+            print(f"{processes:>10} {throughput:>12,.0f} {throughput / baseline:>7.2f}x")
+            processes *= 2
+
+        before = misses_per_second(store)
+        for _ in range(10):
+            for id in ids:
+                popped = store.pop(id)
+                assert popped is not None
+                store.add(popped)
+        after = misses_per_second(store)
+        print(f"{'misses/s':>10} {before:>12,.0f} before churn, {after:,.0f} after")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
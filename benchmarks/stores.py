@@ -0,0 +1,79 @@
+"""
+Benchmark of the carts storage backends: create, patch and get throughput of
+the in-memory store vs. the SQLite store. A get reads the cart total, as the
+get endpoint does for the ETag, and a get of the products reads the order of
+the products too.
+
+Usage::
+
+    $ python -m benchmarks.stores [operations]
+"""
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, TypeVar
+
+from lana_store.db.base import CartStore
+from lana_store.db.memory import ShardedCartStore
+from lana_store.db.sqlite import SQLiteCartStore
+from lana_store.models.cart import Cart
+
+
+ResultT = TypeVar("ResultT")
+
+
+def timed(operations: int, run: Callable[[int], ResultT]) -> float:
+    """
+    Runs `run(i)` for every operation.
+
+    :return: Operations per second.
+    """
+    start = time.perf_counter()
+    for index in range(operations):
+        run(index)
+    return operations / (time.perf_counter() - start)
+
+
+def bench(store: CartStore, operations: int) -> Dict[str, float]:
+    ids: List[str] = []
+
+    def create(index: int) -> None:
+        cart = Cart()
+        store.add(cart)
+        ids.append(str(cart.id))
+
+    results = {"create": timed(operations, create)}
+    results["patch"] = timed(
+        operations, lambda index: store.update(ids[index], lambda cart: cart.add_product("PEN"))
+    )
+    results["get"] = timed(operations, lambda index: store.get(ids[index]).total)  # type: ignore
+    results["products"] = timed(
+        operations, lambda index: store.get(ids[index]).products  # type: ignore
+    )
+
+    return results
+
+
+def main() -> None:
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    with tempfile.TemporaryDirectory() as directory:
+        stores: Dict[str, CartStore] = {
+            "memory": ShardedCartStore(),
+            "sqlite": SQLiteCartStore(os.path.join(directory, "carts.sqlite3")),
+        }
+
+        print(
+            f"{'store':>8} {'create/s':>12} {'patch/s':>12} {'get/s':>12} {'products/s':>12}"
+        )
+        for name, store in stores.items():
+            results = bench(store, operations)
+            print(
+                f"{name:>8} {results['create']:>12,.0f} {results['patch']:>12,.0f} "
+                f"{results['get']:>12,.0f} {results['products']:>12,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
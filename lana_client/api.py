@@ -1,7 +1,8 @@
 """
 Lana Store API consumer.
 """
-from typing import Any, Dict, Optional
+import json
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
 
 import backoff
 import requests
@@ -49,6 +50,7 @@ class ApiConsumerBase:
         url: str,
         params: Optional[Dict[str, Any]] = None,
         payload: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
     ) -> requests.Response:
         """
         Makes HTTPs requests falling back to an exponential back-off strategy
@@ -58,6 +60,7 @@ class ApiConsumerBase:
         :param url: The request URL.
         :param params: The URL parameters of the request, defaults to None.
         :param payload: The body of the request, defaults to None.
+        :param headers: Extra headers of the request, defaults to None.
         :raises ValueError: For invalid HTTP verbs.
         :return: The request response.
         """
@@ -68,6 +71,7 @@ class ApiConsumerBase:
                 params=params,
                 data=payload if not self.json else None,
                 json=payload if self.json else None,
+                headers=headers,
                 timeout=self.max_request_timeout,
             )
         else:
@@ -91,6 +95,9 @@ class LanaStoreApi(ApiConsumerBase):
         """
         super().__init__(json=True)
 
+        #: Last fetched version of every cart: entity tag and response.
+        self.carts_cache: Dict[str, Tuple[str, requests.Response]] = {}
+
     def create_cart(self) -> requests.Response:
         """
         Creates a new Cart
@@ -99,13 +106,44 @@ class LanaStoreApi(ApiConsumerBase):
 
     def get_cart(self, cart_id: str) -> requests.Response:
         """
-        Fetches a cart.
+        Fetches a cart. The cart is only downloaded again when it changed since
+        the last time it was fetched (conditional request with `If-None-Match`).
 
         :param cart_id: Cart Id.
-        :return: HTTP response object.
+        :return: HTTP response object, the cached one when the cart did not change.
+        """
+        cached = self.carts_cache.get(cart_id)
+        resp = self.make_request(
+            "GET",
+            "".join((self.CARTS_ENDPOINT, cart_id)),
+            headers={"If-None-Match": cached[0]} if cached else None,
+        )
+
+        if resp.status_code == 304 and cached:
+            return cached[1]
+
+        if resp.status_code == 200 and "ETag" in resp.headers:
+            self.carts_cache[cart_id] = (resp.headers["ETag"], resp)
+        else:
+            self.carts_cache.pop(cart_id, None)
+
+        return resp
+
+    def open_cart_events(self, cart_id: str) -> requests.Response:
         """
+        Opens the stream of changes (server-sent events) of a cart. The stream
+        is read with :func:`iter_events`.
 
-        return self.make_request("GET", "".join((self.CARTS_ENDPOINT, cart_id)))
+        :param cart_id: Cart Id.
+        :return: Streaming HTTP response object.
+        """
+        # No read timeout, the stream stays idle while the cart does not change
+        return self.session.get(
+            "".join((self.CARTS_ENDPOINT, cart_id, "/events")),
+            headers={"Accept": "text/event-stream"},
+            stream=True,
+            timeout=(self.max_request_timeout, None),
+        )
 
     def remove_cart(self, cart_id: str) -> requests.Response:
         """
@@ -114,6 +152,8 @@ class LanaStoreApi(ApiConsumerBase):
         :param cart_id: Cart Id.
         :return: HTTP response object.
         """
+        self.carts_cache.pop(cart_id, None)
+
         return self.make_request("DELETE", "".join((self.CARTS_ENDPOINT, cart_id)))
 
     def add_product(self, cart_id: str, product: ProductCodes) -> requests.Response:
@@ -127,3 +167,50 @@ class LanaStoreApi(ApiConsumerBase):
         return self.make_request(
             "PATCH", "".join((self.CARTS_ENDPOINT, cart_id)), payload={"product": product}
         )
+
+    def update_products(
+        self,
+        cart_id: str,
+        add: Mapping[ProductCodes, int],
+        remove: Optional[Mapping[ProductCodes, int]] = None,
+    ) -> requests.Response:
+        """
+        Adds and removes many units of products of a cart in a single request.
+
+        :param cart_id: Cart Id.
+        :param add: Units to add of every product (code).
+        :param remove: Units to remove of every product (code), defaults to None.
+        :return: HTTP response object.
+        """
+        return self.make_request(
+            "PATCH",
+            "".join((self.CARTS_ENDPOINT, cart_id, "/products")),
+            payload={
+                "add": [{"product": p, "quantity": q} for p, q in add.items()],
+                "remove": [{"product": p, "quantity": q} for p, q in (remove or {}).items()],
+            },
+        )
+
+
+def iter_events(resp: requests.Response) -> Iterator[Tuple[str, Optional[int], Dict[str, Any]]]:
+    """
+    Parses a stream of server-sent events.
+
+    :param resp: Streaming HTTP response object.
+    :return: Iterator of event type, event Id and JSON payload of every event.
+    """
+    event, id, data = "message", None, ""
+    for line in resp.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, id, json.loads(data)
+            event, id, data = "message", None, ""
+        elif not line.startswith(":"):
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "id":
+                id = int(value)
+            elif field == "data":
+                data += value
@@ -0,0 +1,228 @@
+"""
+Asynchronous Lana Store API consumer.
+
+Requests share a pool of keep-alive connections and many of them can be in
+flight at the same time (bounded by `max_concurrency`), so driving many carts
+is no longer bound by the latency of every single request.
+"""
+import asyncio
+from typing import Any, Dict, Mapping, Optional, Tuple, TypeVar
+
+import backoff
+import httpx
+
+from lana_client.config import ProductCodes, settings
+
+
+ConsumerT = TypeVar("ConsumerT", bound="AsyncApiConsumerBase")
+
+
+class AsyncApiConsumerBase:
+    """
+    Base class to make specific asynchronous service API consumers. It makes
+    HTTP requests with an exponential backoff retry logic, which waits without
+    blocking the event loop.
+    """
+
+    #: Max number of seconds to wait for server to send a response.
+    max_request_timeout = settings.CLIENT_API_CONSUMER_MAX_REQUEST_TIMEOUT
+
+    def __init__(
+        self,
+        json: bool = True,
+        max_connections: int = settings.CLIENT_API_CONSUMER_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.CLIENT_API_CONSUMER_MAX_KEEPALIVE_CONNECTIONS,
+        max_concurrency: int = settings.CLIENT_API_CONSUMER_MAX_CONCURRENCY,
+        http2: bool = settings.CLIENT_API_CONSUMER_HTTP2,
+    ) -> None:
+        """
+        Class initialization.
+
+        :param json: `True` to consume JSON APIs, default to `True`.
+        :param max_connections: Max number of open connections.
+        :param max_keepalive_connections: Max number of idle connections kept
+            open for reuse.
+        :param max_concurrency: Max number of requests in flight, the rest wait
+            for their turn.
+        :param http2: `True` to use HTTP/2 when the server supports it (requires
+            the `h2` package), multiplexing the requests over few connections.
+        """
+        headers: Dict[str, str] = (
+            {"Content-Type": "application/json", "Accept": "application/json"} if json else {}
+        )
+
+        self.json = json
+        self.client = httpx.AsyncClient(
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=self.max_request_timeout,
+            http2=http2,
+        )
+        self.max_concurrency = max_concurrency
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self: ConsumerT) -> ConsumerT:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Closes all the pooled connections.
+        """
+        await self.client.aclose()
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """
+        Limit of requests in flight (created lazily inside the event loop).
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @backoff.on_exception(
+        backoff.expo,
+        httpx.TransportError,
+        max_tries=settings.CLIENT_API_CONSUMER_MAX_TRIES,
+    )
+    async def make_request(
+        self,
+        verb: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """
+        Makes HTTPs requests falling back to an exponential back-off strategy
+        in case of network failures.
+        :param verb: The HTTP verb of the request. Valid choices:
+            [`GET`,`POST`, `PUT`, `PATCH`, 'DELETE`].
+        :param url: The request URL.
+        :param params: The URL parameters of the request, defaults to None.
+        :param payload: The body of the request, defaults to None.
+        :param headers: Extra headers of the request, defaults to None.
+        :raises ValueError: For invalid HTTP verbs.
+        :return: The request response.
+        """
+        if verb not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+            raise ValueError(
+                f"Invalid HTTP verb '{verb}'. "
+                f"Valid options: 'GET', 'POST', 'PUT', 'PATCH' or 'DELETE'"
+            )
+
+        options: Dict[str, Any] = {}
+        if params is not None:
+            options["params"] = params
+        if payload is not None:
+            options["json" if self.json else "data"] = payload
+        if headers is not None:
+            options["headers"] = headers
+
+        # The slot is released while backing off, so retries do not starve
+        # the other requests
+        async with self.semaphore:
+            return await self.client.request(verb, url, **options)
+
+
+class AsyncLanaStoreApi(AsyncApiConsumerBase):
+    """
+    Asynchronous consumer of the Lana Store API.
+    """
+
+    #: Carts endpoint's base url.
+    CARTS_ENDPOINT = "/".join((settings.CLIENT_STORE_API_BASE_URL, "carts/"))
+
+    def __init__(self, **kwargs: Any) -> None:
+        """
+        Class initialization.
+
+        :param kwargs: Connection pool options, see :class:`AsyncApiConsumerBase`.
+        """
+        super().__init__(json=True, **kwargs)
+
+        #: Last fetched version of every cart: entity tag and response.
+        self.carts_cache: Dict[str, Tuple[str, httpx.Response]] = {}
+
+    async def create_cart(self) -> httpx.Response:
+        """
+        Creates a new Cart
+        """
+        return await self.make_request("POST", self.CARTS_ENDPOINT)
+
+    async def get_cart(self, cart_id: str) -> httpx.Response:
+        """
+        Fetches a cart. The cart is only downloaded again when it changed since
+        the last time it was fetched (conditional request with `If-None-Match`).
+
+        :param cart_id: Cart Id.
+        :return: HTTP response object, the cached one when the cart did not change.
+        """
+        cached = self.carts_cache.get(cart_id)
+        resp = await self.make_request(
+            "GET",
+            "".join((self.CARTS_ENDPOINT, cart_id)),
+            headers={"If-None-Match": cached[0]} if cached else None,
+        )
+
+        if resp.status_code == 304 and cached:
+            return cached[1]
+
+        if resp.status_code == 200 and "ETag" in resp.headers:
+            self.carts_cache[cart_id] = (resp.headers["ETag"], resp)
+        else:
+            self.carts_cache.pop(cart_id, None)
+
+        return resp
+
+    async def remove_cart(self, cart_id: str) -> httpx.Response:
+        """
+        Removes a cart.
+
+        :param cart_id: Cart Id.
+        :return: HTTP response object.
+        """
+        self.carts_cache.pop(cart_id, None)
+
+        return await self.make_request("DELETE", "".join((self.CARTS_ENDPOINT, cart_id)))
+
+    async def add_product(self, cart_id: str, product: ProductCodes) -> httpx.Response:
+        """
+        Adds a product to a cart.
+
+        :param cart_id: Cart Id.
+        :param product: Product (code) to add to the cart.
+        :return: HTTP response object.
+        """
+        return await self.make_request(
+            "PATCH", "".join((self.CARTS_ENDPOINT, cart_id)), payload={"product": product}
+        )
+
+    async def update_products(
+        self,
+        cart_id: str,
+        add: Mapping[ProductCodes, int],
+        remove: Optional[Mapping[ProductCodes, int]] = None,
+    ) -> httpx.Response:
+        """
+        Adds and removes many units of products of a cart in a single request.
+
+        :param cart_id: Cart Id.
+        :param add: Units to add of every product (code).
+        :param remove: Units to remove of every product (code), defaults to None.
+        :return: HTTP response object.
+        """
+        return await self.make_request(
+            "PATCH",
+            "".join((self.CARTS_ENDPOINT, cart_id, "/products")),
+            payload={
+                "add": [{"product": p, "quantity": q} for p, q in add.items()],
+                "remove": [{"product": p, "quantity": q} for p, q in (remove or {}).items()],
+            },
+        )
@@ -1,9 +1,12 @@
 """
 Lana Store client.
 """
-
+import socket
+import threading
 from typing import List, Optional
 
+import requests
+
 from rich.console import Console
 from rich.pretty import Pretty
 from rich.prompt import IntPrompt
@@ -11,14 +14,19 @@ from rich.text import Text
 from rich.theme import Theme
 
 from lana_client import gui
-from lana_client.api import LanaStoreApi
+from lana_client.api import iter_events, LanaStoreApi
 from lana_client.config import settings
+from lana_client.mirror import CartMirror
 
 
 # Created carts
 cart_ids: List[str] = []
 # Cart currently selected.
 selected_cart: Optional[int] = None
+# Subscription to the changes of the selected cart.
+watcher: Optional["CartWatcher"] = None
+# Local copy of the selected cart.
+mirror: Optional[CartMirror] = None
 
 # Rich themes
 # fmt: off
@@ -56,32 +64,121 @@ def create_cart() -> None:
 
     cart_ids.append(cart_data["id"])
     selected_cart = len(cart_ids) - 1
+    watch_cart()
 
     # Update GUI panels
     layout["carts"].update(gui.CartList(cart_ids, selected_cart))
-    layout["content"].update(gui.CartDetail(cart_data["products"]))
     layout["footer"].update(gui.Status(Text("New cart created!", style="info")))
 
 
-def refresh_cart() -> bool:
+class CartWatcher(threading.Thread):
+    """
+    Feeds the changes pushed by the server (server-sent events) to the mirror
+    of the selected cart, so carts never need to be fetched again.
+    """
+
+    def __init__(self, resp: requests.Response, mirror: CartMirror) -> None:
+        """
+        Class initialization.
+
+        :param resp: Opened events stream of the cart.
+        :param mirror: Mirror of the cart.
+        """
+        super().__init__(daemon=True)
+        self.resp = resp
+        self.mirror = mirror
+
+    def run(self) -> None:
+        try:
+            for event in iter_events(self.resp):
+                if not self.mirror.apply_event(event):
+                    break
+        except (requests.exceptions.RequestException, AttributeError, ValueError):
+            # Stream closed
+            pass
+
+    def stop(self) -> None:
+        """
+        Closes the events stream. The socket is shut down first to unblock the
+        thread waiting for events.
+        """
+        connection = getattr(self.resp.raw, "connection", None)
+        sock = getattr(connection, "sock", None)
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        self.join(timeout=1.0)
+        self.resp.close()
+
+
+def show_cart(cart: CartMirror) -> None:
+    """
+    GUI helper to display the content of a cart.
+
+    :param cart: Mirror of the cart.
+    """
+    layout["content"].update(gui.CartDetail(cart.displayed, cart.total))
+
+
+def show_products_error(resp: requests.Response) -> None:
+    """
+    GUI helper to display why the store rejected the products added to a cart.
+
+    :param resp: HTTP response object.
     """
-    GUI helper to display carts content.
+    layout["content"].update(Pretty(resp.json()))
+    layout["footer"].update(gui.Status(Text("[ERROR] Cannot add products", style="danger")))
 
-    *Note:* Before calling this method make sure that `selected_cart != None`.
 
-    :return: `True` if cart data could be fetched, `False` otherwise.
+def unwatch_cart(flush: bool = True) -> None:
+    """
+    Stops mirroring the selected cart.
+
+    :param flush: `True` to send the products not sent yet, `False` to discard them.
     """
-    resp = api_client.get_cart(cart_ids[selected_cart])  # type: ignore
+    global watcher, mirror
+
+    if mirror:
+        resp = mirror.close(flush)
+        if resp is not None and resp.status_code != 200:
+            show_products_error(resp)
+        mirror = None
+
+    if watcher:
+        watcher.stop()
+        watcher = None
+
+
+def watch_cart() -> bool:
+    """
+    GUI helper to display the content of the selected cart, kept up to date
+    with its changes.
+
+    :return: `True` if the cart could be watched, `False` otherwise.
+    """
+    global watcher, mirror
+
+    unwatch_cart()
+
+    if selected_cart is None:
+        layout["content"].update(gui.CartDetail([]))
+        return False
+
+    cart_id = cart_ids[selected_cart]
+    resp = api_client.open_cart_events(cart_id)
     if resp.status_code != 200:
         # Error processing the request.
         layout["content"].update(Pretty(resp.json()))
         layout["footer"].update(gui.Status(Text("[ERROR] Cannot get cart content", style="danger")))
         return False
 
-    cart_data = resp.json()
-
-    # Update GUI panels
-    layout["content"].update(gui.CartDetail(cart_data["products"], cart_data["total"]))
+    mirror = CartMirror(cart_id, api_client, show_cart, show_products_error)
+    watcher = CartWatcher(resp, mirror)
+    watcher.start()
+    mirror.wait_for(0)
 
     return True
 
@@ -100,7 +197,7 @@ def select_cart(cart_index: int) -> None:
 
     selected_cart = cart_index - 1
 
-    if refresh_cart():
+    if watch_cart():
         # Update GUI panels
         layout["carts"].update(gui.CartList(cart_ids, selected_cart))
         layout["footer"].update(gui.Status(Text("Cart selected! :smiley:")))
@@ -118,16 +215,15 @@ def add_product(product_index: int) -> None:
 
     product = settings.CLIENT_PRODUCT_CODES[product_index - 1]
 
-    resp = api_client.add_product(cart_ids[selected_cart], product)
-    if resp.status_code != 200:
-        # Error processing the request.
-        layout["content"].update(Pretty(resp.json()))
-        layout["footer"].update(gui.Status(Text("[ERROR] Cannot add product", style="error")))
+    if not mirror and not watch_cart():
         return None
 
-    if refresh_cart():
-        # Update GUI panels
-        layout["footer"].update(gui.Status(Text("Product added!", style="info")))
+    # Displayed right away, sent to the store along with the products added
+    # right after it
+    mirror.add(product)  # type: ignore
+
+    # Update GUI panels
+    layout["footer"].update(gui.Status(Text("Product added!", style="info")))
 
 
 def delete_cart() -> None:
@@ -140,6 +236,8 @@ def delete_cart() -> None:
         layout["footer"].update(gui.Status(Text("Must create a cart first! ", style="warning")))
         return None
 
+    # The products not sent yet are discarded along with the cart
+    unwatch_cart(flush=False)
     resp = api_client.remove_cart(cart_ids[selected_cart])
     if resp.status_code != 204:
         # Error processing the request.
@@ -154,7 +252,7 @@ def delete_cart() -> None:
     else:
         selected_cart = None
 
-    refresh_cart()
+    watch_cart()
     # Update GUI panels
     layout["footer"].update(gui.Status(Text("Cart deleted!", style="info")))
 
@@ -202,4 +300,5 @@ if __name__ == "__main__":
                 delete_cart()
 
             else:
+                unwatch_cart()
                 break
@@ -1,4 +1,4 @@
-from typing import List, Literal
+from typing import Any, Dict, List, Literal
 
 from pydantic import BaseSettings
 
@@ -13,6 +13,22 @@ class ClientSettings(BaseSettings):
     #: Products data.
     CLIENT_PRODUCT_CODES: List[ProductCodes] = ["PEN", "TSHIRT", "MUG"]
 
+    #: Unit price of every product in money-as-integer format (same as the store's).
+    CLIENT_PRODUCT_PRICES: Dict[ProductCodes, int] = {"PEN": 500, "TSHIRT": 2000, "MUG": 750}
+
+    #: Promotions, with the format of the store's `PRICING_RULES` (tests check they match).
+    CLIENT_PRICING_RULES: List[Dict[str, Any]] = [
+        {"kind": "BUY_X_PAY_Y", "product": "PEN", "buy": 2, "pay": 1},
+        {"kind": "BULK_DISCOUNT", "product": "TSHIRT", "min_quantity": 3, "discount": 25},
+    ]
+
+    #: Money decimal precision.
+    CLIENT_MONEY_DECIMALS: int = 2
+
+    #: Seconds to wait for more products added to a cart before sending all of
+    #: them in a single request.
+    CLIENT_DEBOUNCE_SECONDS: float = 1.0
+
     #: Lana Store API base path.
     CLIENT_STORE_API_BASE_URL: str = "http://127.0.0.1:8000/api/v1"
 
@@ -22,6 +38,18 @@ class ClientSettings(BaseSettings):
     #: HTTP read request max timeout (seconds).
     CLIENT_API_CONSUMER_MAX_REQUEST_TIMEOUT: int = 5
 
+    #: Max open connections of the asynchronous API consumer.
+    CLIENT_API_CONSUMER_MAX_CONNECTIONS: int = 100
+
+    #: Max idle (keep-alive) connections of the asynchronous API consumer.
+    CLIENT_API_CONSUMER_MAX_KEEPALIVE_CONNECTIONS: int = 100
+
+    #: Max requests in flight of the asynchronous API consumer.
+    CLIENT_API_CONSUMER_MAX_CONCURRENCY: int = 100
+
+    #: Use HTTP/2 when the server supports it (requires the `h2` package).
+    CLIENT_API_CONSUMER_HTTP2: bool = False
+
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,261 @@
+"""
+Local mirror of a cart.
+
+The mirror is kept up to date from the responses of the changes made by the
+client and the events pushed by the store, and it is priced locally, so carts
+never need to be fetched again. Products added in a quick succession are sent
+in a single bulk request once no more products are added for a short while.
+"""
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from lana_client.api import LanaStoreApi
+from lana_client.config import ProductCodes, settings
+from lana_client.pricing import format_money, price_products
+
+
+#: Pushed event: event type, cart version and payload.
+CartEvent = Tuple[str, Optional[int], Dict[str, Any]]
+
+logger = logging.getLogger(__name__)
+
+
+class CartMirror:
+    """
+    Local copy of a cart: products confirmed by the store plus the products
+    added locally and not confirmed yet.
+    """
+
+    def __init__(
+        self,
+        cart_id: str,
+        api: LanaStoreApi,
+        on_change: Callable[["CartMirror"], None],
+        on_error: Callable[[requests.Response], None],
+        debounce: float = settings.CLIENT_DEBOUNCE_SECONDS,
+    ) -> None:
+        """
+        Class initialization.
+
+        :param cart_id: Cart Id.
+        :param api: Store API consumer.
+        :param on_change: Called after every change of the displayed products.
+        :param on_error: Called when the store rejects the products sent.
+        :param debounce: Seconds to wait for more products before sending them.
+        """
+        self.cart_id = cart_id
+        self.api = api
+        self.on_change = on_change
+        self.on_error = on_error
+        self.debounce = debounce
+
+        #: Products confirmed by the store and the cart version they belong to.
+        self.products: List[str] = []
+        self.version = -1
+        #: Products added locally, not sent yet.
+        self.pending: List[ProductCodes] = []
+        #: Products sent, waiting for the response.
+        self.sending: List[ProductCodes] = []
+
+        self.changed = threading.Condition()
+        # Events received while products are being sent or the cart fetched
+        # again, applied after the response
+        self._deferred: List[CartEvent] = []
+        # Set when a pushed change could not be applied, until the cart is fetched
+        self._stale = False
+        self._timer: Optional[threading.Timer] = None
+        # One bulk request in flight at a time
+        self._flush_lock = threading.Lock()
+
+    @property
+    def displayed(self) -> List[str]:
+        """
+        Products of the cart, including those not confirmed yet.
+        """
+        with self.changed:
+            return [*self.products, *self.sending, *self.pending]
+
+    @property
+    def total(self) -> str:
+        """
+        Formatted total price of the displayed products.
+        """
+        return format_money(price_products(self.displayed))
+
+    def apply_event(self, event: CartEvent) -> bool:
+        """
+        Applies a change pushed by the store.
+
+        :param event: Pushed event.
+        :return: `False` once the cart was deleted, `True` otherwise.
+        """
+        name, version, data = event
+        with self.changed:
+            if self.sending or self._stale:
+                # The response brings the whole cart, only later changes matter
+                self._deferred.append(event)
+                return name != "cart_deleted"
+
+            in_sync = self._apply(name, version, data)
+
+        if not in_sync:
+            self._resync()
+        self.on_change(self)
+        return name != "cart_deleted"
+
+    def _apply(self, name: str, version: Optional[int], data: Dict[str, Any]) -> bool:
+        """
+        Applies a pushed change to the confirmed products. The lock must be held.
+
+        :return: `False` when the change could not be applied and the cart
+            must be fetched again, `True` otherwise.
+        """
+        if version is not None and version <= self.version:
+            # Already included
+            return True
+
+        if name == "cart":
+            self.products = data["products"]
+        elif name == "product_added":
+            self.products.append(data["product"])
+        elif name == "products_updated":
+            try:
+                for line in data["added"]:
+                    self.products.extend([line["product"]] * line["quantity"])
+                for line in data["removed"]:
+                    for _ in range(line["quantity"]):
+                        index = len(self.products) - 1 - self.products[::-1].index(line["product"])
+                        del self.products[index]
+            except ValueError:
+                logger.warning(
+                    "Cart %s out of sync at version %s, fetching it", self.cart_id, version
+                )
+                self._stale = True
+                return False
+
+        if version is not None:
+            self.version = version
+        self.changed.notify_all()
+        return True
+
+    def _apply_deferred(self) -> bool:
+        """
+        Applies the events deferred while products were sent or the cart
+        fetched again, up to the first one that cannot be applied. The lock
+        must be held.
+
+        :return: `False` when the cart must be fetched again, `True` otherwise.
+        """
+        while self._deferred:
+            if not self._apply(*self._deferred.pop(0)):
+                return False
+        return True
+
+    def _resync(self) -> None:
+        """
+        Replaces the confirmed products with the whole cart fetched from the
+        store. The lock must not be held: the cart is fetched without it, and
+        applied only if newer than the confirmed products.
+        """
+        in_sync = False
+        while not in_sync:
+            resp = self.api.get_cart(self.cart_id)
+            with self.changed:
+                if resp.status_code == 200:
+                    version = int(resp.headers.get("ETag", "-1").strip('"'))
+                    if version > self.version:
+                        self.products = resp.json()["products"]
+                        self.version = version
+                self._stale = False
+                # While products are sent, their response applies the events
+                in_sync = bool(self.sending) or self._apply_deferred()
+                self.changed.notify_all()
+
+    def wait_for(self, version: int, timeout: float = 1.0) -> None:
+        """
+        Waits until the mirror includes a version of the cart.
+
+        :param version: Version of the cart.
+        :param timeout: Max seconds to wait.
+        """
+        with self.changed:
+            self.changed.wait_for(lambda: self.version >= version, timeout)
+
+    def add(self, product: ProductCodes) -> None:
+        """
+        Adds a product locally. It is sent along with the products added within
+        the debounce window.
+
+        :param product: Product code.
+        """
+        with self.changed:
+            self.pending.append(product)
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self._flush_later)
+            self._timer.daemon = True
+            self._timer.start()
+
+        self.on_change(self)
+
+    def _flush_later(self) -> None:
+        """
+        Sends the pending products once the debounce window expires.
+        """
+        resp = self.flush()
+        if resp is not None and resp.status_code != 200:
+            self.on_error(resp)
+
+    def flush(self) -> Optional[requests.Response]:
+        """
+        Sends the pending products in a single request right away.
+
+        :return: HTTP response object, `None` when there was nothing to send.
+        """
+        with self._flush_lock:
+            with self.changed:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self.pending:
+                    return None
+                self.sending, self.pending = self.pending, []
+
+            resp = self.api.update_products(self.cart_id, add=Counter(self.sending))
+
+            with self.changed:
+                if resp.status_code == 200:
+                    self.products = resp.json()["products"]
+                    self.version = int(resp.headers.get("ETag", "-1").strip('"'))
+                    self._stale = False
+                self.sending = []
+                # Still stale: applied once the cart is fetched again
+                in_sync = self._stale or self._apply_deferred()
+                self.changed.notify_all()
+
+        if not in_sync:
+            self._resync()
+        self.on_change(self)
+        return resp
+
+    def close(self, flush: bool = True) -> Optional[requests.Response]:
+        """
+        Stops mirroring the cart.
+
+        :param flush: `True` to send the pending products, `False` to discard them.
+        :return: HTTP response object of the products sent (if any).
+        """
+        if flush:
+            return self.flush()
+
+        with self.changed:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            self.pending = []
+
+        return None
@@ -0,0 +1,61 @@
+"""
+Local pricing of carts, so the client can display totals without asking the
+store. Mirrors the store's pricing rules: every product gets the best of the
+promotions over it.
+"""
+from collections import Counter
+from typing import Iterable
+
+from lana_client.config import settings
+
+
+#: Minor units in a major unit (e.g. 100 cents in a euro).
+MINOR_UNITS = 10 ** settings.CLIENT_MONEY_DECIMALS
+
+
+def price_line(product: str, count: int) -> int:
+    """
+    Calculates the price of `count` units of a product after discounts.
+
+    :param product: Product code.
+    :param count: Number of units of the product.
+    :return: Price with the money-as-integer format.
+    """
+    price = settings.CLIENT_PRODUCT_PRICES[product]  # type: ignore
+    best = price * count
+
+    for rule in settings.CLIENT_PRICING_RULES:
+        if rule["product"] != product:
+            continue
+
+        if rule["kind"] == "BUY_X_PAY_Y":
+            groups, rest = divmod(count, rule["buy"])
+            best = min(best, (groups * rule["pay"] + rest) * price)
+        elif rule["kind"] == "BULK_DISCOUNT" and count >= rule["min_quantity"]:
+            best = min(best, price * count * (100 - rule["discount"]) // 100)
+
+    return best
+
+
+def price_products(products: Iterable[str]) -> int:
+    """
+    Calculates the total price of a list of products after discounts.
+
+    :param products: Product codes, one per unit.
+    :return: Total price with the money-as-integer format.
+    """
+    return sum(price_line(product, count) for product, count in Counter(products).items())
+
+
+def format_money(amount: int) -> str:
+    """
+    Formats a money-as-integer amount with `CLIENT_MONEY_DECIMALS` decimals.
+
+    :param amount: Amount of money (non-negative).
+    :return: Formatted amount.
+    """
+    units, minor = divmod(amount, MINOR_UNITS)
+    if settings.CLIENT_MONEY_DECIMALS == 0:
+        return f"{units}"
+
+    return f"{units}.{minor:0{settings.CLIENT_MONEY_DECIMALS}d}"
@@ -1,8 +1,37 @@
 """
 Define the carts database as an in-memory object globally accessible.
 """
-from typing import Dict
+from typing import Optional
 
-from lana_store.models.cart import Cart
+from lana_store.core.analytics import CartAnalytics
+from lana_store.core.config import settings
+from lana_store.core.events import CartEventHub
+from lana_store.core.expiry import CartExpiry
+from lana_store.core.index import CartIndex
+from lana_store.db import CartJournal, CartStore, create_store
 
-carts_db: Dict[str, Cart] = dict()
+carts_db: CartStore = create_store(settings)
+
+#: Write-ahead log of `carts_db` (only when persistence is enabled).
+journal: Optional[CartJournal] = None
+
+#: Subscribers to the changes of the carts.
+events = CartEventHub()
+
+#: Last access tracking of `carts_db` (only when carts expire or are capped).
+expiry: Optional[CartExpiry] = (
+    CartExpiry(settings.CART_TTL_SECONDS, settings.MAX_CARTS)
+    if settings.CART_TTL_SECONDS is not None or settings.MAX_CARTS is not None
+    else None
+)
+
+#: Secondary indexes of `carts_db` (only when enabled). Kept per process, so never
+#: with a store shared by processes: carts created by the others would be missing.
+index: Optional[CartIndex] = (
+    CartIndex() if settings.CARTS_INDEX_ENABLED and settings.CARTS_STORE == "memory" else None
+)
+
+#: Live aggregates of `carts_db` (only when enabled).
+analytics: Optional[CartAnalytics] = (
+    CartAnalytics(settings.ANALYTICS_QUEUE_SIZE) if settings.ANALYTICS_ENABLED else None
+)
@@ -0,0 +1,113 @@
+"""
+Moves all the carts of a running server out to an export file and back in
+(see :mod:`lana_store.db.export`) through the admin endpoints, e.g. to warm
+up a new server before moving the traffic to it.
+
+Usage::
+
+    $ python -m lana_store.admin --url http://old-host:8000 export carts.lcex
+    $ python -m lana_store.admin --url http://new-host:8000 import carts.lcex
+
+The admin token is read from `--token` or the `ADMIN_TOKEN` environment
+variable.
+"""
+import argparse
+import os
+import sys
+from typing import Any, BinaryIO, cast, Dict, IO, Iterator, Optional, Sequence
+
+import requests
+
+from lana_store.core.config import settings
+
+
+#: Size of the chunks of the downloaded and uploaded exports.
+CHUNK_SIZE = 1 << 16
+
+
+def _headers(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _carts_url(url: str, action: str) -> str:
+    return f"{url.rstrip('/')}{settings.API_V1_STR}/admin/carts/{action}"
+
+
+def _chunks(file: BinaryIO) -> Iterator[bytes]:
+    """
+    Reads a file in chunks, so uploads are streamed (chunked encoding).
+    """
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def download_export(session: requests.Session, url: str, token: str, path: str) -> int:
+    """
+    Downloads the export of all the carts of a server.
+
+    :param session: HTTP session.
+    :param url: Base URL of the server.
+    :param token: Admin token.
+    :param path: Export file path.
+    :raises requests.HTTPError: When the server refuses the export.
+    :return: Size of the export (bytes).
+    """
+    size = 0
+    with session.get(_carts_url(url, "export"), headers=_headers(token), stream=True) as resp:
+        resp.raise_for_status()
+        with open(path, "wb") as file:
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                file.write(chunk)
+                size += len(chunk)
+
+    return size
+
+
+def upload_export(session: requests.Session, url: str, token: str, path: str) -> int:
+    """
+    Imports an export into a server, streaming the file.
+
+    :param session: HTTP session.
+    :param url: Base URL of the server.
+    :param token: Admin token.
+    :param path: Export file path.
+    :raises requests.HTTPError: When the server refuses the export.
+    :return: Number of imported carts.
+    """
+    with open(path, "rb") as file:
+        # Requests streams iterators too, its stubs only declare file-like bodies
+        body = cast(IO[Any], _chunks(file))
+        resp = session.post(_carts_url(url, "import"), headers=_headers(token), data=body)
+    resp.raise_for_status()
+
+    return resp.json()["imported"]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Exports and imports the carts of a server.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL.")
+    parser.add_argument("--token", default=os.environ.get("ADMIN_TOKEN"), help="Admin token.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="Export file.")
+    args = parser.parse_args(argv)
+
+    if not args.token:
+        parser.error("The admin token is required (--token or ADMIN_TOKEN)")
+
+    try:
+        with requests.Session() as session:
+            if args.command == "export":
+                size = download_export(session, args.url, args.token, args.path)
+                print(f"Exported {size} bytes to '{args.path}'")
+            else:
+                imported = upload_export(session, args.url, args.token, args.path)
+                print(f"Imported {imported} carts from '{args.path}'")
+    except requests.RequestException as exc:
+        sys.exit(f"Failed to {args.command} the carts: {exc}")
+
+
+if __name__ == "__main__":
+    main()
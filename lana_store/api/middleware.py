@@ -0,0 +1,157 @@
+"""
+ASGI middlewares.
+"""
+import os
+import random
+import re
+import time
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from lana_store.core.metrics import http_request_duration
+from lana_store.core.profiling import Profile, StackSampler
+
+
+#: Label value of every status code.
+_STATUS_LABELS: Dict[int, str] = {}
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every request (until the response starts) per
+    method, route and status code. A pure ASGI middleware, so it adds no task
+    nor extra buffering to the requests.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        Class initialization.
+
+        :param app: Wrapped app.
+        """
+        self.app = app
+        #: Path template of every endpoint, so routes with path parameters are
+        #: a single series.
+        self._routes: Dict[Any, str] = {}
+
+    def _route(self, scope: Scope) -> str:
+        """
+        Path template of the route that handled the request.
+        """
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+
+        if endpoint not in self._routes:
+            for candidate in scope["app"].routes:
+                self._routes[getattr(candidate, "endpoint", None)] = candidate.path
+
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                self._record(scope, message["status"], perf_counter() - start)
+                # Already recorded
+                start = 0.0
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if start:
+                # Failed before responding
+                self._record(scope, 500, perf_counter() - start)
+
+    def _record(self, scope: Scope, status: int, elapsed: float) -> None:
+        """
+        Records the latency of a request.
+        """
+        status_label = _STATUS_LABELS.get(status)
+        if status_label is None:
+            status_label = _STATUS_LABELS[status] = str(status)
+
+        http_request_duration.observe((scope["method"], self._route(scope), status_label), elapsed)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a random fraction of the requests, and the requests with the
+    profiling header, writing the stack samples of every one of them to a
+    collapsed-stack file. Only installed when profiling is enabled, so other
+    deployments do not pay for it at all.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        directory: str,
+        sample_rate: float = 0.0,
+        header: Optional[str] = None,
+        interval: float = 0.001,
+    ) -> None:
+        """
+        Class initialization.
+
+        :param app: Wrapped app.
+        :param directory: Directory of the profile files.
+        :param sample_rate: Fraction of the requests profiled.
+        :param header: Request header that gets a request profiled, if any.
+        :param interval: Seconds between stack samples.
+        """
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode("latin-1") if header else None
+        self.sampler = StackSampler(interval)
+
+    def _profiled(self, scope: Scope) -> bool:
+        """
+        Whether a request is profiled.
+        """
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+
+        if self.header is not None:
+            return any(name == self.header for name, _value in scope["headers"])
+
+        return False
+
+    def _save(self, scope: Scope, status: int, profile: Profile) -> None:
+        """
+        Writes the profile of a request, named after its time, method, path
+        and status code.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = re.sub(r"[^A-Za-z0-9_.-]+", "_", scope["path"].strip("/")) or "root"
+        filename = f"{time.time_ns()}-{scope['method']}-{path}-{status}.collapsed"
+        profile.write(os.path.join(self.directory, filename))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._profiled(scope) or not self.sampler.available():
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profile = self.sampler.start()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.sampler.stop(profile)
+            self._save(scope, status, profile)
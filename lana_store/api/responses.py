@@ -0,0 +1,39 @@
+"""
+Custom response classes.
+"""
+import asyncio
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class CancellableStreamingResponse(StreamingResponse):
+    """
+    Streaming response that stops as soon as the client disconnects, even
+    while nothing is being sent.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Same as `StreamingResponse` but with tasks, as `asyncio.wait` no longer
+        # accepts bare coroutines
+        tasks = {
+            asyncio.ensure_future(self.stream_response(send)),
+            asyncio.ensure_future(self.listen_for_disconnect(receive)),
+        }
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            task.result()
+
+        if self.background is not None:
+            await self.background()
+
+
+class EventStreamResponse(CancellableStreamingResponse):
+    """
+    Stream of server-sent events.
+    """
+
+    media_type = "text/event-stream"
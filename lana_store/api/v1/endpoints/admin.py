@@ -0,0 +1,104 @@
+"""
+The API views for the administration of the store on the version `v1`.
+"""
+import secrets
+import tempfile
+from typing import Any, BinaryIO, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from lana_store import crud, schemas
+from lana_store.api.responses import CancellableStreamingResponse
+from lana_store.core.config import settings
+from lana_store.db.export import export_carts, ExportError, read_export
+
+
+#: Media type of the carts exports.
+EXPORT_MEDIA_TYPE = "application/vnd.lana.carts-export"
+
+
+def require_admin(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Restricts the admin endpoints to the holders of the admin token.
+
+    :param authorization: `Authorization` header, `Bearer <token>`.
+    :raises HTTPException: When the admin endpoints are disabled (not found)
+        or the token is missing or wrong (unauthorized).
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+#: Routes of the administration, built with their final paths (except the API
+#: version prefix).
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get(
+    "/carts/export",
+    response_class=CancellableStreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {EXPORT_MEDIA_TYPE: {}},
+            "description": "Export of all the carts",
+        }
+    },
+)
+async def export_all_carts() -> CancellableStreamingResponse:
+    """
+    Streams all the carts in the compact binary export format. Carts changed
+    during the export are exported either before or after the change.
+    \f
+
+    :return: Stream of the export.
+    """
+    return CancellableStreamingResponse(
+        export_carts(crud.iter_all_carts()), media_type=EXPORT_MEDIA_TYPE
+    )
+
+
+def _import_file(file: BinaryIO) -> int:
+    """
+    Imports the carts of an export file.
+    """
+    return crud.import_carts(read_export(file))
+
+
+@router.post(
+    "/carts/import",
+    response_model=schemas.CartImportOutput,
+    responses={status.HTTP_400_BAD_REQUEST: {"description": "Invalid export"}},
+)
+async def import_all_carts(request: Request) -> Any:
+    """
+    Imports the carts of an export (the request body, as returned by the
+    export endpoint), replacing the carts with the same Ids.
+    \f
+
+    :param request: Request, streamed to a temporary file.
+    :raises HTTPException: When the export is invalid.
+    :return: Number of imported carts.
+    """
+    with tempfile.TemporaryFile() as file:
+        async for chunk in request.stream():
+            file.write(chunk)
+        file.flush()
+        file.seek(0)
+
+        try:
+            imported = await run_in_threadpool(_import_file, file)
+        except ExportError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    return schemas.CartImportOutput(imported=imported)
@@ -1,15 +1,137 @@
 """
 The API views for the `Cart` resource on the version `v1`.
 """
-from typing import Any
+import asyncio
+import base64
+import binascii
+import math
+import struct
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, Optional
 
-from fastapi import APIRouter, HTTPException, Response, status
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
 
 from lana_store import crud, schemas
+from lana_store.api.responses import EventStreamResponse
 from lana_store.core.config import settings
+from lana_store.core.encoding import encode_cart
+from lana_store.core.index import CartPosition
+from lana_store.core.money import format_money, MINOR_UNITS
+from lana_store.models.cart import Cart, NotEnoughProductsError, VersionConflictError
+from lana_store.models.product import PRODUCT_CODES, ProductCodes
 
 
-router = APIRouter()
+#: Routes of the carts, built with their final paths (except the API version prefix) so
+#: they are only built once more, when included in the app.
+router = APIRouter(prefix="/carts", tags=["carts"])
+
+#: Layout of the listing cursors: creation timestamp and key of the last cart.
+_CURSOR = struct.Struct("<d16s")
+
+
+def cart_etag(cart: Cart) -> str:
+    """
+    Entity tag of a cart, changes with every change of the cart.
+
+    :param cart: Cart.
+    :return: Quoted (strong) entity tag.
+    """
+    return f'"{cart.version}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Checks an `If-None-Match` header (weak comparison).
+
+    :param if_none_match: Header value, a list of entity tags or `*`.
+    :param etag: Current entity tag.
+    :return: Whether the entity tag is listed in the header.
+    """
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(tag.strip().replace("W/", "", 1) == etag for tag in if_none_match.split(","))
+
+
+def if_match_version(if_match: Optional[str]) -> Optional[int]:
+    """
+    Parses an `If-Match` header into the cart version a change expects.
+
+    :param if_match: Header value, a single (strong) entity tag of a cart or `*`.
+    :raises HTTPException: Entity tags other than the ones of carts never match.
+    :return: The expected version, `None` when any version matches.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    tag = if_match.strip()
+    if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+        return int(tag[1:-1])
+
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED, detail="The entity tag does not match"
+    )
+
+
+def version_conflict(exc: VersionConflictError) -> HTTPException:
+    """
+    Builds the error of a conditional change over a modified cart.
+
+    :param exc: Version conflict.
+    :return: `412 Precondition Failed` error with the current entity tag.
+    """
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="The cart was modified meanwhile",
+        headers={"ETag": f'"{exc.version}"'},
+    )
+
+
+def encode_cursor(position: CartPosition) -> str:
+    """
+    Encodes the position of a cart in the listing as an opaque cursor.
+
+    :param position: Creation timestamp and key of the cart.
+    :return: URL-safe cursor.
+    """
+    return base64.urlsafe_b64encode(_CURSOR.pack(*position)).decode()
+
+
+def decode_cursor(cursor: str) -> CartPosition:
+    """
+    Decodes a listing cursor.
+
+    :param cursor: Cursor from a previous page.
+    :raises HTTPException: When the cursor is invalid.
+    :return: Creation timestamp and key of the last cart of the previous page.
+    """
+    try:
+        created, key = _CURSOR.unpack(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, struct.error, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    return created, key
+
+
+def cart_response(
+    cart: Cart, status_code: int = status.HTTP_200_OK, with_total: bool = False
+) -> Response:
+    """
+    Serializes a cart with the fast encoder. The returned response skips the
+    `response_model` validation, which is only kept for the OpenAPI schema.
+
+    :param cart: Cart to serialize.
+    :param status_code: Response status code.
+    :param with_total: Whether to include the formatted total.
+    :return: JSON response with the entity tag of the cart.
+    """
+    return Response(
+        encode_cart(cart, with_total),
+        status_code=status_code,
+        headers={"ETag": cart_etag(cart)},
+        media_type="application/json",
+    )
 
 
 @router.post("/", response_model=schemas.CartCreateOutput, status_code=status.HTTP_201_CREATED)
@@ -20,20 +142,124 @@ async def create_cart() -> Any:
 
     :return: New cart.
     """
-    return crud.create_new_cart()
+    cart = await crud.run_change(crud.create_new_cart)
+    return cart_response(cart, status_code=status.HTTP_201_CREATED)
+
+
+@router.get(
+    "/",
+    response_model=schemas.CartListOutput,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid cursor"},
+        status.HTTP_404_NOT_FOUND: {"description": "Carts listing disabled"},
+    },
+)
+async def list_carts(
+    cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page."),
+    limit: int = Query(50, ge=1, le=500),
+    created_after: Optional[datetime] = Query(
+        None, description="Only carts created after this time (UTC when without time zone)."
+    ),
+    contains_product: Optional[ProductCodes] = Query(
+        None, description="Only carts with units of this product."
+    ),
+    min_total: Optional[Decimal] = Query(
+        None, ge=0, description="Only carts with this total or more."
+    ),
+) -> Any:
+    """
+    Lists the carts, oldest first, a page at a time: `next_cursor` gets the
+    next page. Pages may have less than `limit` carts with a `min_total`
+    filter and still be followed by more.
+    \f
+
+    :param cursor: Cursor of the page.
+    :param limit: Max number of carts of the page.
+    :param created_after: Creation time filter.
+    :param contains_product: Product filter.
+    :param min_total: Total filter.
+    :raises HTTPException: When the cursor is invalid or the listing is disabled.
+    :return: Carts of the page and cursor of the next one.
+    """
+    if created_after is not None and created_after.tzinfo is None:
+        created_after = created_after.replace(tzinfo=timezone.utc)
+
+    page = crud.list_carts(
+        limit,
+        after=decode_cursor(cursor) if cursor else None,
+        created_after=created_after.timestamp() if created_after else None,
+        product=contains_product,
+        min_total=math.ceil(min_total * MINOR_UNITS) if min_total is not None else None,
+        max_scan=settings.CARTS_LIST_MAX_SCAN,
+    )
+    if page is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Carts listing disabled"
+        )
+
+    carts, last = page
+    next_cursor = b'"%s"' % encode_cursor(last).encode() if last else b"null"
+    body = b'{"carts":[%s],"next_cursor":%s}' % (
+        b",".join([encode_cart(cart, with_total=True) for cart in carts]),
+        next_cursor,
+    )
+
+    return Response(body, media_type="application/json")
+
+
+@router.get(
+    "/stats",
+    response_model=schemas.CartStatsOutput,
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Carts stats disabled"}},
+)
+async def get_carts_stats() -> Any:
+    """
+    Retrieves live stats of all the carts: units of every product, revenue
+    after discounts and share of the carts getting every promotion. Cart
+    changes are added to the stats shortly after they happen. When changes
+    come too fast to be added, the stats are `stale` until they are rebuilt
+    from the carts in the background.
+    \f
+
+    :raises HTTPException: When the stats are disabled.
+    :return: Stats of the carts.
+    """
+    stats = crud.get_carts_stats()
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carts stats disabled")
+
+    return schemas.CartStatsOutput(
+        carts=stats.carts,
+        units={PRODUCT_CODES[ordinal]: units for ordinal, units in enumerate(stats.units)},
+        revenue=format_money(stats.revenue),
+        promotions={
+            PRODUCT_CODES[ordinal]: schemas.PromotionStats(
+                carts=carts, share=carts / stats.carts if stats.carts else 0.0
+            )
+            for ordinal, carts in stats.promoted.items()
+        },
+        pending_changes=stats.pending,
+        dropped_changes=stats.dropped,
+        stale=stats.stale,
+    )
 
 
 @router.get(
     "/{cart_id}",
     response_model=schemas.CartOutput,
-    responses={status.HTTP_404_NOT_FOUND: {"description": "Cart not found"}},
+    responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "Cart not modified"},
+        status.HTTP_404_NOT_FOUND: {"description": "Cart not found"},
+    },
 )
-async def get_cart(cart_id: str) -> Any:
+async def get_cart(cart_id: str, if_none_match: Optional[str] = Header(None)) -> Any:
     """
-    Retrieves a cart.
+    Retrieves a cart. Conditional requests with the `ETag` of the cart get a
+    `304 Not Modified` while the cart does not change.
     \f
 
     :param cart_id: Cart Id to lookup.
+    :param if_none_match: Entity tags of the cart versions the client has.
     :raises HTTPException: Cart not found.
     :return: Correspondent cart.
     """
@@ -41,33 +267,219 @@ async def get_cart(cart_id: str) -> Any:
     if not cart:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
 
-    # Adds 2 decimals to format money output
-    total_price = f"{cart.total / (10 ** settings.MONEY_DECIMALS):.2f}"
+    etag = cart_etag(cart)
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return cart_response(cart, with_total=True)
+
+
+@router.get(
+    "/{cart_id}/events",
+    response_class=EventStreamResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {"text/event-stream": {}},
+            "description": "Stream of server-sent events: first a `cart` event with the "
+            "whole cart, then `product_added`, `products_updated` and `cart_deleted` "
+            "deltas with the new `total` and `version` of the cart.",
+        },
+        status.HTTP_404_NOT_FOUND: {"description": "Cart not found or events disabled"},
+    },
+)
+async def stream_cart_events(cart_id: str) -> Any:
+    """
+    Streams the changes of a cart (server-sent events) until it is deleted.
+    Deltas with a version lower than or equal to the one of the initial
+    `cart` event are already included in it.
+    \f
+
+    :param cart_id: Cart Id.
+    :raises HTTPException: Cart not found or the events are disabled.
+    :return: Events stream.
+    """
+    if not settings.EVENTS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart events disabled")
+
+    watched = crud.watch_cart(cart_id)
+    if not watched:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
+
+    cart, subscription = watched
+
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            yield b"event: cart\ndata: %s\nid: %d\n\n" % (
+                encode_cart(cart, with_total=True),
+                cart.version,
+            )
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(), settings.EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    # Keeps idle connections open through proxies
+                    yield b": keep-alive\n\n"
+                    continue
+
+                if message is None:
+                    break
+                yield message
+        finally:
+            crud.unwatch_cart(subscription)
+
+    return EventStreamResponse(events(), headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/totals", response_model=schemas.CartTotalsOutput)
+async def get_carts_totals(totals_in: schemas.CartTotalsInput) -> Any:
+    """
+    Calculates the totals of many carts at once (all of them by default).
+    \f
+
+    :param totals_in: Payload of the request.
+    :return: Totals of the carts found and Ids of the missing ones.
+    """
+    # Only imported when used: numpy is a large share of the startup time
+    from lana_store.core.batch_pricing import batch_totals
 
-    return schemas.CartOutput(**cart.dict(), total=total_price)
+    missing = []
+    if totals_in.ids is None:
+        carts = crud.get_all_carts()
+    else:
+        carts = []
+        for cart_id, cart in zip(totals_in.ids, crud.get_carts_by_ids(totals_in.ids)):
+            if cart:
+                carts.append(cart)
+            else:
+                missing.append(cart_id)
+
+    totals = [
+        schemas.CartTotal(id=cart.id, total=format_money(total))
+        for cart, total in zip(carts, batch_totals(carts))
+    ]
+
+    return schemas.CartTotalsOutput(totals=totals, missing=missing)
+
+
+@router.post("/batch", response_model=schemas.CartBatchOutput)
+async def run_carts_batch(batch_in: schemas.CartBatchInput) -> Any:
+    """
+    Runs many cart operations (create, get, delete) in order, in one request.
+    Every operation gets its own result: operations over missing carts do not
+    stop the rest.
+    \f
+
+    :param batch_in: Payload of the request.
+    :return: Result of every operation.
+    """
+    operations = batch_in.operations
+    carts = await crud.run_change(
+        crud.run_cart_operations, [(item.op, item.id) for item in operations]
+    )
+
+    results = []
+    for item, cart in zip(operations, carts):
+        if cart is None:
+            result = schemas.CartBatchResult(
+                status=status.HTTP_404_NOT_FOUND, id=item.id, detail="Cart not found"
+            )
+        elif item.op == "delete":
+            result = schemas.CartBatchResult(status=status.HTTP_204_NO_CONTENT, id=item.id)
+        else:
+            result = schemas.CartBatchResult(
+                status=status.HTTP_201_CREATED if item.op == "create" else status.HTTP_200_OK,
+                id=str(cart.id),
+                cart=schemas.CartOutput(
+                    id=cart.id, products=cart.products, total=format_money(cart.total)
+                ),
+            )
+        results.append(result)
+
+    return schemas.CartBatchOutput(results=results)
 
 
 @router.patch(
     "/{cart_id}",
     response_model=schemas.CartUpdateOutput,
-    responses={status.HTTP_404_NOT_FOUND: {"description": "Cart not found"}},
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Cart not found"},
+        status.HTTP_412_PRECONDITION_FAILED: {"description": "Cart modified meanwhile"},
+    },
 )
-async def partial_update_cart(cart_id: str, cart_in: schemas.CartUpdateInput) -> Any:
+async def partial_update_cart(
+    cart_id: str, cart_in: schemas.CartUpdateInput, if_match: Optional[str] = Header(None)
+) -> Any:
     """
-    Updates a cart by adding a product.
+    Updates a cart by adding a product. With `If-Match`, the product is only
+    added if the cart is still at the version of the given `ETag`.
     \f
 
     :param cart_id: Cart Id.
     :param cart_in: Payload of the request.
-    :raises HTTPException: Cart not found.
+    :param if_match: Entity tag of the cart version the change expects.
+    :raises HTTPException: Cart not found or cart modified meanwhile.
+    :return: Updated cart.
+    """
+    try:
+        cart = await crud.run_change(
+            crud.update_cart_with_product,
+            cart_id,
+            cart_in.product,
+            expected_version=if_match_version(if_match),
+        )
+    except VersionConflictError as exc:
+        raise version_conflict(exc)
+
+    if not cart:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
+
+    return cart_response(cart)
+
+
+@router.patch(
+    "/{cart_id}/products",
+    response_model=schemas.CartUpdateOutput,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Cart not found"},
+        status.HTTP_409_CONFLICT: {"description": "Not enough units to remove"},
+        status.HTTP_412_PRECONDITION_FAILED: {"description": "Cart modified meanwhile"},
+    },
+)
+async def update_cart_products(
+    cart_id: str, products_in: schemas.CartProductsInput, if_match: Optional[str] = Header(None)
+) -> Any:
+    """
+    Adds and removes many units of products of a cart at once. Either all the
+    changes are applied or none. With `If-Match`, the changes are only applied
+    if the cart is still at the version of the given `ETag`.
+    \f
+
+    :param cart_id: Cart Id.
+    :param products_in: Payload of the request.
+    :param if_match: Entity tag of the cart version the changes expect.
+    :raises HTTPException: Cart not found, not enough units to remove or cart
+        modified meanwhile.
     :return: Updated cart.
     """
-    cart = crud.update_cart_with_product(cart_id, cart_in.product)
+    try:
+        cart = await crud.run_change(
+            crud.update_cart_products,
+            cart_id,
+            add=[(line.product, line.quantity) for line in products_in.add],
+            remove=[(line.product, line.quantity) for line in products_in.remove],
+            expected_version=if_match_version(if_match),
+        )
+    except NotEnoughProductsError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    except VersionConflictError as exc:
+        raise version_conflict(exc)
 
     if not cart:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
 
-    return cart
+    return cart_response(cart)
 
 
 @router.delete(
@@ -84,7 +496,7 @@ async def delete_cart(cart_id: str) -> Any:
     :raises HTTPException: Cart not found.
     :return: Empty payload.
     """
-    cart = crud.remove_cart(cart_id)
+    cart = await crud.run_change(crud.remove_cart, cart_id)
 
     if not cart:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
@@ -0,0 +1,260 @@
+"""
+Live aggregates of the carts (units per product, revenue after discounts and
+carts getting each promotion), kept up to date from the changes of the carts
+instead of scanning them.
+
+Every change is published as the units of every product of the cart before
+and after it to a bounded queue, drained by a single consumer task of the
+event loop that updates the aggregates in O(products) per change. Reading the
+aggregates never touches the carts. When the consumer falls behind and the
+queue fills up, changes are dropped (and counted) rather than slowing down
+the requests, and the aggregates are flagged as stale: they are rebuilt from
+the stored carts by a worker thread, off the event loop.
+
+The changes published while the carts are scanned are added to the rebuilt
+aggregates, but a change can be both published then and seen by the scan: the
+aggregates stay stale (and are rebuilt again later) unless the carts did not
+change during the scan.
+
+Changes made outside of the event loop thread are handed over to it with a
+single callback per change, as the events of :mod:`lana_store.core.events`.
+"""
+import asyncio
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from lana_store.core import metrics
+from lana_store.core.config import settings
+from lana_store.core.pricing import price_counts, pricers_by_ordinal
+from lana_store.models.product import PRODUCT_CODES, PRODUCT_ORDINALS
+
+
+#: Units of every product of a cart by product ordinal, `None` when there is no cart.
+CartCounts = Optional[Tuple[int, ...]]
+
+#: Change of a cart: its units before and after.
+CartChange = Tuple[CartCounts, CartCounts]
+
+#: Units of every product of every stored cart.
+CartsSource = Callable[[], Iterable[Sequence[int]]]
+
+#: Max changes handled by the consumer before yielding to the event loop.
+BATCH_SIZE = 1000
+
+#: Seconds between rebuilds of the aggregates while they are stale.
+RESYNC_INTERVAL_SECONDS = 60.0
+
+
+class CartAnalytics:
+    """
+    Incremental aggregates of the carts and the queue of changes feeding them.
+    """
+
+    def __init__(self, max_pending: int = 10_000) -> None:
+        """
+        Class initialization.
+
+        :param max_pending: Max changes queued (see `publish`).
+        """
+        self.max_pending = max_pending
+
+        #: Number of carts.
+        self.carts = 0
+        #: Units of every product in the carts, by product ordinal.
+        self.units: List[int] = [0] * len(PRODUCT_CODES)
+        #: Sum of the cart totals (money-as-integer format).
+        self.revenue = 0
+        #: Carts getting the promotion of every product with pricing rules, by
+        #: product ordinal.
+        self.promoted: Dict[int, int] = {
+            PRODUCT_ORDINALS[rule["product"]]: 0 for rule in settings.PRICING_RULES
+        }
+        #: Changes dropped so far.
+        self.dropped = 0
+        #: Whether changes were dropped since the aggregates were last rebuilt.
+        self.stale = False
+
+        self._prices = [settings.PRODUCT_TABLE[product]["price"] for product in PRODUCT_CODES]
+        self._queue: Optional["asyncio.Queue[CartChange]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._consumer: Optional["asyncio.Task[None]"] = None
+        self._source: Optional[CartsSource] = None
+        self._resync: Optional["asyncio.Task[None]"] = None
+        #: Changes published during a rebuild of the aggregates.
+        self._window: Optional[List[CartChange]] = None
+
+    @property
+    def pending(self) -> int:
+        """
+        Changes queued, not added to the aggregates yet.
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _apply(self, counts: Sequence[int], sign: int) -> None:
+        """
+        Adds (`sign` 1) or subtracts (`sign` -1) a cart to the aggregates.
+        """
+        self.carts += sign
+        self.revenue += sign * price_counts(counts)
+        units = self.units
+        for ordinal, count in enumerate(counts):
+            units[ordinal] += sign * count
+        for ordinal in self.promoted:
+            count = counts[ordinal]
+            if pricers_by_ordinal[ordinal](count) < self._prices[ordinal] * count:
+                self.promoted[ordinal] += sign
+
+    def apply(self, before: CartCounts, after: CartCounts) -> None:
+        """
+        Adds a change of a cart to the aggregates.
+
+        :param before: Units of the cart before the change, `None` if created.
+        :param after: Units of the cart after the change, `None` if deleted.
+        """
+        if before is not None:
+            self._apply(before, -1)
+        if after is not None:
+            self._apply(after, 1)
+
+    def load(self, carts: Iterable[Sequence[int]]) -> None:
+        """
+        Adds carts already stored (e.g. on startup) to the aggregates.
+
+        :param carts: Units of every product of every cart.
+        """
+        for counts in carts:
+            self._apply(counts, 1)
+
+    def clear(self) -> None:
+        """
+        Resets the aggregates and drops the queued changes.
+        """
+        self.carts = 0
+        self.units = [0] * len(PRODUCT_CODES)
+        self.revenue = 0
+        self.promoted = dict.fromkeys(self.promoted, 0)
+        self.dropped = 0
+        self.stale = False
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+
+    def publish(self, before: CartCounts, after: CartCounts) -> None:
+        """
+        Queues a change of a cart for the consumer. Changes are ignored until
+        the consumer runs, and dropped when the queue is full.
+
+        :param before: Units of the cart before the change, `None` if created.
+        :param after: Units of the cart after the change, `None` if deleted.
+        """
+        if self._loop is None:
+            return
+
+        if threading.get_ident() == self._loop_thread:
+            self._enqueue((before, after))
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, (before, after))
+
+    def _enqueue(self, change: CartChange) -> None:
+        """
+        Queues a change (event loop side), rebuilding the aggregates when it is
+        dropped.
+        """
+        assert self._queue is not None
+        if self._window is not None:
+            self._window.append(change)
+        try:
+            self._queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.stale = True
+            metrics.analytics_events_dropped.inc()
+            if self._resync is None and self._source is not None:
+                assert self._loop is not None
+                self._resync = self._loop.create_task(self._rebuild())
+
+    def process_pending(self) -> int:
+        """
+        Adds the queued changes to the aggregates at once. Must be called from
+        the event loop.
+
+        :return: Number of changes added.
+        """
+        processed = 0
+        while self._queue is not None and not self._queue.empty():
+            self.apply(*self._queue.get_nowait())
+            processed += 1
+        metrics.analytics_events_processed.inc(amount=processed)
+
+        return processed
+
+    def start(self, source: Optional[CartsSource] = None) -> None:
+        """
+        Starts the consumer of the changes. Must be called from the event loop.
+
+        :param source: Units of the stored carts, to rebuild the aggregates from
+            when changes are dropped. They stay stale when missing.
+        """
+        self._source = source
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread = threading.get_ident()
+        self._queue = asyncio.Queue(self.max_pending)
+        self._consumer = self._loop.create_task(self._consume())
+
+    def stop(self) -> None:
+        """
+        Stops the consumer, adding the changes still queued to the aggregates.
+        """
+        if self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+        if self._resync is not None:
+            self._resync.cancel()
+            self._resync = None
+            self._window = None
+        self.process_pending()
+        self._loop = None
+
+    async def _consume(self) -> None:
+        """
+        Adds the changes to the aggregates as they come, in batches.
+        """
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            self.apply(*await queue.get())
+            processed = 1
+            while processed < BATCH_SIZE and not queue.empty():
+                self.apply(*queue.get_nowait())
+                processed += 1
+            metrics.analytics_events_processed.inc(amount=processed)
+            # Lets the requests run between batches
+            await asyncio.sleep(0)
+
+    async def _rebuild(self) -> None:
+        """
+        Rebuilds the aggregates from the stored carts in a worker thread, again
+        every `RESYNC_INTERVAL_SECONDS` while they stay stale.
+        """
+        assert self._loop is not None and self._source is not None
+        try:
+            while self.stale:
+                # The changes queued so far are all seen by the scan
+                self.process_pending()
+                self._window = []
+                rebuilt = CartAnalytics()
+                await self._loop.run_in_executor(None, rebuilt.load, self._source())
+
+                self.process_pending()
+                for change in self._window:
+                    rebuilt.apply(*change)
+                self.carts, self.units = rebuilt.carts, rebuilt.units
+                self.revenue, self.promoted = rebuilt.revenue, rebuilt.promoted
+                self.stale = bool(self._window)
+                self._window = None
+
+                if self.stale:
+                    await asyncio.sleep(RESYNC_INTERVAL_SECONDS)
+        finally:
+            self._resync = None
@@ -0,0 +1,166 @@
+"""
+Vectorized pricing of many carts at once. The pricing rules of the settings
+are compiled into NumPy array operations over a (carts x products) quantity
+matrix and give exactly the same results as :mod:`lana_store.core.pricing`,
+which validates the rules for both.
+"""
+from typing import Callable, Dict, List, Mapping, Sequence
+
+import numpy as np
+
+from lana_store.core.config import settings
+from lana_store.core.money import discount_factor
+from lana_store.core.pricing import rules_by_product
+from lana_store.models.cart import Cart
+from lana_store.models.pricing import BulkDiscountRule, BuyXPayYRule, PricingRule
+from lana_store.models.product import Product, PRODUCT_CODES, ProductCodes
+
+
+#: Prices a column of quantities of a product (money-as-integer format).
+VectorPricer = Callable[[np.ndarray], np.ndarray]
+
+
+def _compile_unit_price(price: int) -> VectorPricer:
+    """
+    Builds the vector pricer of a product without promotions.
+
+    :param price: Unit price of the product.
+    :return: Vector pricer of the product.
+    """
+
+    def pricer(counts: np.ndarray) -> np.ndarray:
+        return counts * price
+
+    return pricer
+
+
+def _compile_buy_x_pay_y(price: int, rule: BuyXPayYRule) -> VectorPricer:
+    """
+    Builds the vector pricer of a "buy X pay Y" promotion.
+
+    :param price: Unit price of the product.
+    :param rule: Rule definition.
+    :return: Vector pricer of the product.
+    """
+    buy, pay = rule["buy"], rule["pay"]
+
+    def pricer(counts: np.ndarray) -> np.ndarray:
+        groups, rest = np.divmod(counts, buy)
+        return (groups * pay + rest) * price
+
+    return pricer
+
+
+def _compile_bulk_discount(price: int, rule: BulkDiscountRule) -> VectorPricer:
+    """
+    Builds the vector pricer of a bulk discount promotion.
+
+    :param price: Unit price of the product.
+    :param rule: Rule definition.
+    :return: Vector pricer of the product.
+    """
+    min_quantity, factor = rule["min_quantity"], discount_factor(rule["discount"])
+
+    def pricer(counts: np.ndarray) -> np.ndarray:
+        subtotals = counts * price
+        discounted = subtotals * factor.numerator // factor.denominator
+        return np.where(counts < min_quantity, subtotals, discounted)
+
+    return pricer
+
+
+#: Rule compilers by rule kind.
+RULE_COMPILERS: Dict[str, Callable[[int, PricingRule], VectorPricer]] = {
+    "BUY_X_PAY_Y": _compile_buy_x_pay_y,  # type: ignore
+    "BULK_DISCOUNT": _compile_bulk_discount,  # type: ignore
+}
+
+
+def _cheapest(pricers: List[VectorPricer]) -> VectorPricer:
+    """
+    Combines the vector pricers of several rules over the same product.
+
+    :param pricers: Vector pricers of a single product.
+    :return: Combined vector pricer.
+    """
+    if len(pricers) == 1:
+        return pricers[0]
+
+    def pricer(counts: np.ndarray) -> np.ndarray:
+        return np.minimum.reduce([p(counts) for p in pricers])
+
+    return pricer
+
+
+def compile_rules(
+    product_table: Mapping[ProductCodes, Product], rules: Sequence[PricingRule]
+) -> List[VectorPricer]:
+    """
+    Compiles the pricing rules into vector pricers.
+
+    :param product_table: Products data.
+    :param rules: Pricing rules.
+    :raises ValueError: When a rule has an unknown kind or targets an unknown product.
+    :return: Vector pricer of every product in the `PRODUCT_CODES` order.
+    """
+    grouped = rules_by_product(product_table, rules)
+
+    pricers: List[VectorPricer] = []
+    for product in PRODUCT_CODES:
+        price = product_table[product]["price"]
+        if product in grouped:
+            pricers.append(
+                _cheapest([RULE_COMPILERS[rule["kind"]](price, rule) for rule in grouped[product]])
+            )
+        else:
+            pricers.append(_compile_unit_price(price))
+
+    return pricers
+
+
+#: Vector pricers built from the settings.
+vector_pricers = compile_rules(settings.PRODUCT_TABLE, settings.PRICING_RULES)
+
+
+def quantity_matrix(carts: Sequence[Cart]) -> np.ndarray:
+    """
+    Builds the quantity matrix of a set of carts.
+
+    :param carts: Carts to price.
+    :return: Matrix of shape (carts, products) with the units of every product
+        (columns in the `PRODUCT_CODES` order).
+    """
+    counts = b"".join([cart.counts.tobytes() for cart in carts])
+
+    return (
+        np.frombuffer(counts, dtype=np.uint32)
+        .reshape(len(carts), len(PRODUCT_CODES))
+        .astype(np.int64)
+    )
+
+
+def price_matrix(quantities: np.ndarray) -> np.ndarray:
+    """
+    Prices a quantity matrix.
+
+    :param quantities: Matrix of shape (carts, products).
+    :return: Total of every cart after discounts with the money-as-integer format.
+    """
+    totals = np.zeros(quantities.shape[0], dtype=np.int64)
+    for column, pricer in enumerate(vector_pricers):
+        totals += pricer(quantities[:, column])
+
+    return totals
+
+
+def batch_totals(carts: Sequence[Cart]) -> List[int]:
+    """
+    Calculates the totals of many carts at once. Same results as `Cart.total`.
+
+    :param carts: Carts to price.
+    :return: Total of every cart after discounts with the money-as-integer format.
+    """
+    if not carts:
+        return []
+
+    return price_matrix(quantity_matrix(carts)).tolist()
@@ -1,10 +1,11 @@
 """
 Application settings.
 """
-from typing import Dict, List, Union
+from typing import Dict, List, Literal, Optional, Union
 
 from pydantic import AnyHttpUrl, BaseSettings, validator
 
+from lana_store.models.pricing import PricingRule
 from lana_store.models.product import Product, ProductCodes
 
 
@@ -37,6 +38,83 @@ class Settings(BaseSettings):
             return value
         raise ValueError(value)
 
+    #: Carts storage backend: `memory` (per process) or `sqlite` (shared by processes).
+    CARTS_STORE: Literal["memory", "sqlite"] = "memory"
+    #: Number of shards (each one with its own lock) of the in-memory carts store.
+    CARTS_STORE_SHARDS: int = 16
+    #: Database file of the SQLite carts store.
+    SQLITE_PATH: str = "carts.sqlite3"
+    #: Max number of open connections of the SQLite carts store.
+    SQLITE_POOL_SIZE: int = 8
+
+    #: Seconds without access after which a cart is deleted. Carts never expire when unset.
+    CART_TTL_SECONDS: Optional[float] = None
+    #: Max number of carts, the least recently used ones are deleted beyond it.
+    MAX_CARTS: Optional[int] = None
+    #: Interval between runs of the expired carts reaper (seconds).
+    CART_REAPER_INTERVAL_SECONDS: float = 1.0
+
+    #: Keeps the secondary indexes of the carts (creation order and products) that
+    #: the carts listing needs, about 200 bytes per cart. The listing is disabled otherwise.
+    #: Only with a single worker and the `memory` store.
+    CARTS_INDEX_ENABLED: bool = True
+    #: Max number of carts scanned by a request of the carts listing, so filters
+    #: without an index (`min_total`) never scan all the carts at once.
+    CARTS_LIST_MAX_SCAN: int = 10_000
+
+    #: Keeps live aggregates of the carts (units per product, revenue and promotions) from
+    #: their changes, served by the carts stats endpoint. The endpoint is disabled otherwise.
+    #: Only with a single worker.
+    ANALYTICS_ENABLED: bool = True
+    #: Max changes of the carts queued for the aggregates. Changes are dropped when full.
+    ANALYTICS_QUEUE_SIZE: int = 10_000
+
+    #: Streams the changes of the carts (server-sent events). Only with a single worker.
+    EVENTS_ENABLED: bool = True
+    #: Interval between keep-alive comments of the cart events streams (seconds).
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+
+    #: Records the request latencies and exposes the metrics at `/metrics`.
+    METRICS_ENABLED: bool = True
+
+    #: Token of the admin endpoints (sent as `Authorization: Bearer <token>`). The
+    #: admin endpoints are disabled when unset.
+    ADMIN_TOKEN: Optional[str] = None
+
+    #: File of the OpenAPI schema, precomputed with `python -m lana_store.openapi` (e.g. when
+    #: building the image). The schema is generated on its first request when unset.
+    OPENAPI_SCHEMA_PATH: Optional[str] = None
+
+    #: Profiles a random `PROFILING_SAMPLE_RATE` fraction of the requests.
+    PROFILING_ENABLED: bool = False
+    #: Fraction of the requests profiled when profiling is enabled.
+    PROFILING_SAMPLE_RATE: float = 0.01
+    #: Request header (e.g. `X-Profile`) that gets a request profiled even with
+    #: profiling disabled. Ignored when unset.
+    PROFILING_HEADER: Optional[str] = None
+    #: Seconds between the stack samples of a profiled request.
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+    #: Directory of the collapsed-stack files of the profiled requests.
+    PROFILING_DIRECTORY: str = "profiles"
+
+    #: Capacity (max number of carts) of the shared-memory store of multi-worker mode.
+    SHM_CAPACITY: int = 100_000
+    #: Max number of products of a cart in the shared-memory store.
+    SHM_MAX_LINES: int = 256
+    #: Number of slot locks of the shared-memory store.
+    SHM_LOCK_STRIPES: int = 64
+
+    #: Directory of the carts write-ahead log and snapshots. Carts are not
+    #: persisted when unset.
+    WAL_DIRECTORY: Optional[str] = None
+    #: Fsync policy of the write-ahead log: `always`, `interval` or `never`. With
+    #: `interval`, a crash loses the changes of the last `WAL_SYNC_INTERVAL_MS`.
+    WAL_FSYNC: Literal["always", "interval", "never"] = "interval"
+    #: Interval between syncs of the write-ahead log (milliseconds).
+    WAL_SYNC_INTERVAL_MS: int = 10
+    #: Number of logged changes after which a new snapshot is written.
+    WAL_SNAPSHOT_EVERY: int = 100_000
+
     #: Money decimal precision.
     MONEY_DECIMALS: int = 2
 
@@ -47,6 +125,12 @@ class Settings(BaseSettings):
         "MUG": {"name": "Lana Coffee Mug", "price": 750},
     }
 
+    #: Promotions applied over the products of `PRODUCT_TABLE`.
+    PRICING_RULES: List[PricingRule] = [
+        {"kind": "BUY_X_PAY_Y", "product": "PEN", "buy": 2, "pay": 1},
+        {"kind": "BULK_DISCOUNT", "product": "TSHIRT", "min_quantity": 3, "discount": 25},
+    ]
+
     class Config:
         case_sensitive = True
 
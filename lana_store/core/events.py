@@ -0,0 +1,154 @@
+"""
+Fan-out of cart changes to streaming (server-sent events) subscribers.
+
+Every event is encoded once and the same bytes are queued to all the
+subscribers of the cart, without creating any task per event: each subscriber
+is served by its own streaming response, which just waits on its queue.
+Changes made outside of the event loop thread are handed over to it with a
+single callback per event.
+"""
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Optional, Set
+
+
+#: Max events queued to a subscriber. Slower subscribers are disconnected.
+MAX_PENDING_EVENTS = 100
+
+
+def encode_event(event: str, data: Dict[str, Any], id: Optional[int] = None) -> bytes:
+    """
+    Encodes a server-sent event.
+
+    :param event: Event type.
+    :param data: Event payload, sent as JSON.
+    :param id: Event Id (e.g. the cart version).
+    :return: Event message.
+    """
+    message = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n"
+    if id is not None:
+        message += f"id: {id}\n"
+
+    return f"{message}\n".encode()
+
+
+class Subscription:
+    """
+    Events stream of a single subscriber of a cart.
+    """
+
+    __slots__ = ("key", "queue", "closed")
+
+    def __init__(self, key: bytes, max_pending: int) -> None:
+        """
+        Class initialization.
+
+        :param key: Key of the cart.
+        :param max_pending: Max events queued.
+        """
+        self.key = key
+        #: Pending event messages, `None` once the stream ends.
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(max_pending + 1)
+        self.closed = False
+
+    def close(self) -> None:
+        """
+        Ends the stream after the events already queued.
+        """
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(None)
+
+
+class CartEventHub:
+    """
+    Registry of the subscribers of every cart.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_EVENTS) -> None:
+        """
+        Class initialization.
+
+        :param max_pending: Max events queued to a subscriber.
+        """
+        self.max_pending = max_pending
+
+        self._subscribers: Dict[bytes, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+    def __len__(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def watched(self, key: bytes) -> bool:
+        """
+        Checks whether a cart has subscribers, so events are only built when
+        someone listens.
+
+        :param key: Cart key.
+        """
+        return key in self._subscribers
+
+    def subscribe(self, key: bytes) -> Subscription:
+        """
+        Subscribes to the events of a cart. Must be called from the event loop.
+
+        :param key: Cart key.
+        :return: The subscription.
+        """
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread = threading.get_ident()
+
+        subscription = Subscription(key, self.max_pending)
+        self._subscribers.setdefault(key, set()).add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Cancels a subscription.
+
+        :param subscription: Subscription.
+        """
+        subscriptions = self._subscribers.get(subscription.key)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.key]
+
+    def publish(self, key: bytes, message: bytes, last: bool = False) -> None:
+        """
+        Sends an event to all the subscribers of a cart.
+
+        :param key: Cart key.
+        :param message: Encoded event.
+        :param last: Whether the stream ends after this event (e.g. the cart
+            was deleted).
+        """
+        if key not in self._subscribers or self._loop is None:
+            return
+
+        if threading.get_ident() == self._loop_thread:
+            self._fan_out(key, message, last)
+        else:
+            self._loop.call_soon_threadsafe(self._fan_out, key, message, last)
+
+    def _fan_out(self, key: bytes, message: bytes, last: bool) -> None:
+        """
+        Queues an event to the subscribers of a cart (event loop side).
+        """
+        for subscription in list(self._subscribers.get(key, ())):
+            if subscription.closed:
+                continue
+
+            if subscription.queue.qsize() >= self.max_pending:
+                # Too slow, the client must reconnect and start over
+                subscription.close()
+            else:
+                subscription.queue.put_nowait(message)
+                if last:
+                    subscription.close()
+
+        if last:
+            self._subscribers.pop(key, None)
@@ -0,0 +1,99 @@
+"""
+Tracking of the carts last access to expire abandoned carts (TTL) and to
+evict the least recently used ones when there are too many.
+
+Carts are kept in an ordered dict sorted by last access: every access moves
+the cart to the end, so the carts to expire or evict are always at the front
+and are found in O(1) without scanning the rest.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+
+class CartExpiry:
+    """
+    Access-ordered index of carts with their last access timestamps.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_carts: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Class initialization.
+
+        :param ttl: Seconds without access after which a cart expires, `None`
+            for no expiration.
+        :param max_carts: Max number of carts, `None` for no limit.
+        :param clock: Time source (seconds).
+        """
+        self.ttl = ttl
+        self.max_carts = max_carts
+        self.clock = clock
+
+        self._accessed: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._accessed)
+
+    def last_access(self, key: bytes) -> Optional[float]:
+        """
+        Last access timestamp of a cart.
+
+        :param key: Cart key.
+        :return: Timestamp (if the cart is tracked).
+        """
+        return self._accessed.get(key)
+
+    def touch(self, key: bytes) -> List[bytes]:
+        """
+        Records an access to a cart (tracking it if it is new).
+
+        :param key: Cart key.
+        :return: Keys of the least recently used carts to evict to honor `max_carts`.
+        """
+        with self._lock:
+            self._accessed[key] = self.clock()
+            self._accessed.move_to_end(key)
+
+            evicted = []
+            if self.max_carts is not None:
+                while len(self._accessed) > self.max_carts:
+                    evicted.append(self._accessed.popitem(last=False)[0])
+
+        return evicted
+
+    def forget(self, key: bytes) -> None:
+        """
+        Stops tracking a cart.
+
+        :param key: Cart key.
+        """
+        with self._lock:
+            self._accessed.pop(key, None)
+
+    def pop_expired(self) -> List[bytes]:
+        """
+        Stops tracking the expired carts.
+
+        :return: Keys of the expired carts.
+        """
+        if self.ttl is None:
+            return []
+
+        deadline = self.clock() - self.ttl
+        expired = []
+        with self._lock:
+            while self._accessed:
+                key, accessed = next(iter(self._accessed.items()))
+                if accessed > deadline:
+                    break
+                del self._accessed[key]
+                expired.append(key)
+
+        return expired
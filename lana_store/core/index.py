@@ -0,0 +1,195 @@
+"""
+Secondary indexes of the carts, to list them without scanning the store.
+
+* Creation order: the (creation timestamp, key) position of every cart in a
+  list sorted by creation, so the carts created after a time or after a
+  pagination cursor are found by bisection. Deleted carts are skipped and left
+  in the list until most of it is deleted carts, when it is compacted.
+* Products: the keys of the carts with units of every product (inverted
+  index).
+
+Carts are indexed by the process that creates them or finds them stored on
+startup, as the last accesses of :mod:`lana_store.core.expiry`. Creation times
+are not stored with the carts: they are the times the carts were indexed, so
+carts recovered on startup (e.g. from the journal) or imported count as created
+then. The indexes are process-local, and thus not kept with the stores shared
+by processes.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from lana_store.models.product import PRODUCT_CODES
+
+
+#: Position of a cart in the creation order: creation timestamp and key.
+CartPosition = Tuple[float, bytes]
+
+#: Greatest cart key, to position times after all the carts created then.
+_LAST_KEY = b"\xff" * 16
+
+
+class CartIndex:
+    """
+    Creation order and products of the carts.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        """
+        Class initialization.
+
+        :param clock: Time source (seconds since the epoch).
+        """
+        self.clock = clock
+
+        self._order: List[CartPosition] = []
+        self._created: Dict[bytes, float] = {}
+        self._products: List[Set[bytes]] = [set() for _ in PRODUCT_CODES]
+        #: Positions of deleted carts still in `_order`.
+        self._deleted = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._created)
+
+    def created(self, key: bytes) -> Optional[float]:
+        """
+        Creation timestamp of a cart.
+
+        :param key: Cart key.
+        :return: Timestamp (if the cart is indexed).
+        """
+        return self._created.get(key)
+
+    def add(self, key: bytes, counts: Sequence[int]) -> None:
+        """
+        Indexes a cart created now (in this process). Carts already indexed
+        keep their creation time and only get their products updated.
+
+        :param key: Cart key.
+        :param counts: Units of every product, by product ordinal.
+        """
+        with self._lock:
+            if key not in self._created:
+                created = self.clock()
+                if self._order and created < self._order[-1][0]:
+                    # Keeps the list sorted when the clock goes back
+                    created = self._order[-1][0]
+                self._created[key] = created
+                # At the end but for ties, sorted by key
+                bisect.insort(self._order, (created, key))
+
+            self._update(key, counts)
+
+    def update(self, key: bytes, counts: Sequence[int]) -> None:
+        """
+        Updates the products of an indexed cart.
+
+        :param key: Cart key.
+        :param counts: Units of every product, by product ordinal.
+        """
+        with self._lock:
+            if key in self._created:
+                self._update(key, counts)
+
+    def _update(self, key: bytes, counts: Sequence[int]) -> None:
+        """
+        Updates the products of a cart. The lock must be held.
+        """
+        for carts, count in zip(self._products, counts):
+            if count:
+                carts.add(key)
+            else:
+                carts.discard(key)
+
+    def remove(self, key: bytes) -> None:
+        """
+        Stops indexing a cart.
+
+        :param key: Cart key.
+        """
+        with self._lock:
+            if self._created.pop(key, None) is None:
+                return
+
+            for carts in self._products:
+                carts.discard(key)
+
+            self._deleted += 1
+            if self._deleted > len(self._created):
+                created = self._created
+                self._order = [
+                    position for position in self._order if created.get(position[1]) == position[0]
+                ]
+                self._deleted = 0
+
+    def clear(self) -> None:
+        """
+        Stops indexing all the carts.
+        """
+        with self._lock:
+            self._order = []
+            self._created.clear()
+            for carts in self._products:
+                carts.clear()
+            self._deleted = 0
+
+    def scan(
+        self,
+        after: Optional[CartPosition] = None,
+        created_after: Optional[float] = None,
+        product: Optional[int] = None,
+    ) -> Iterator[CartPosition]:
+        """
+        Iterates over the positions of the carts in creation order (ties sorted
+        by key).
+
+        :param after: Position to start after (e.g. a pagination cursor).
+        :param created_after: Only the carts created after this timestamp.
+        :param product: Only the carts with units of this product (ordinal).
+        :return: Iterator of the cart positions.
+        """
+        start: CartPosition = after or (float("-inf"), b"")
+        if created_after is not None:
+            start = max(start, (created_after, _LAST_KEY))
+
+        if product is None:
+            return self._scan_order(start, None)
+
+        carts = self._products[product]
+        # Scanning the creation order visits about (carts / matching carts)
+        # positions per match, sorting the matching carts costs about their
+        # number: the cheapest wins
+        if len(carts) ** 2 >= len(self._created):
+            return self._scan_order(start, carts)
+
+        return self._scan_members(start, carts)
+
+    def _scan_order(
+        self, start: CartPosition, members: Optional[Set[bytes]]
+    ) -> Iterator[CartPosition]:
+        """
+        Scans the creation order from a position, skipping the deleted carts
+        and the carts out of `members` (if given).
+        """
+        # Compactions replace the list, so this one only grows at its end
+        order = self._order
+        created = self._created
+        for i in range(bisect.bisect_right(order, start), len(order)):
+            position = order[i]
+            key = position[1]
+            if created.get(key) == position[0] and (members is None or key in members):
+                yield position
+
+    def _scan_members(self, start: CartPosition, members: Set[bytes]) -> Iterator[CartPosition]:
+        """
+        Sorts a few carts by creation and iterates over them from a position.
+        """
+        with self._lock:
+            positions = sorted((self._created[key], key) for key in members)
+
+        created = self._created
+        for position in positions[bisect.bisect_right(positions, start):]:
+            if created.get(position[1]) == position[0]:
+                yield position
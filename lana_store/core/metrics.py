@@ -0,0 +1,308 @@
+"""
+Low-overhead metrics exposed in the Prometheus text format.
+
+Counters and histograms take no lock: every thread updates its own copy of
+the values (one dict lookup and an addition per update) and the copies are
+only added up when the metrics are scraped. Gauges are computed at scrape
+time.
+"""
+import bisect
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+#: Label values of a series, in the order of the metric label names.
+LabelValues = Tuple[str, ...]
+
+#: Default buckets of the latency histograms (seconds).
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+#: Buckets of the pricing timers (seconds).
+PRICING_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Metric with values kept per thread.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        """
+        Class initialization.
+
+        :param name: Metric name.
+        :param help: Metric description.
+        :param labels: Label names.
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, List[float]]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[LabelValues, List[float]]:
+        """
+        Values of the current thread.
+        """
+        try:
+            return self._local.series
+        except AttributeError:
+            series: Dict[LabelValues, List[float]] = {}
+            with self._shards_lock:
+                self._shards.append(series)
+            self._local.series = series
+            return series
+
+    def _collect(self) -> Dict[LabelValues, List[float]]:
+        """
+        Adds up the values of all the threads.
+        """
+        totals: Dict[LabelValues, List[float]] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        for shard in shards:
+            for labels, values in list(shard.items()):
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        total[i] += value
+
+        return totals
+
+    def samples(self) -> Iterator[str]:
+        """
+        Lines of the metric values in the text format.
+        """
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """
+        Drops all the values.
+        """
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+    """
+
+    kind = "counter"
+
+    def inc(self, labels: LabelValues = (), amount: float = 1) -> None:
+        """
+        Increments the count.
+
+        :param labels: Label values.
+        :param amount: Increment.
+        """
+        series = self._shard()
+        values = series.get(labels)
+        if values is None:
+            series[labels] = [amount]
+        else:
+            values[0] += amount
+
+    def value(self, labels: LabelValues = ()) -> float:
+        """
+        Current count.
+
+        :param labels: Label values.
+        """
+        return self._collect().get(labels, [0])[0]
+
+    def samples(self) -> Iterator[str]:
+        for labels, values in sorted(self._collect().items()):
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(values[0])}"
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (e.g. latencies) over fixed buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        """
+        Class initialization.
+
+        :param name: Metric name.
+        :param help: Metric description.
+        :param labels: Label names.
+        :param buckets: Upper bounds of the buckets, in increasing order.
+        """
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        """
+        Records a value.
+
+        :param labels: Label values.
+        :param value: Observed value.
+        """
+        series = self._shard()
+        values = series.get(labels)
+        if values is None:
+            # Count per bucket (the last one is +Inf) and sum
+            values = series[labels] = [0] * (len(self.buckets) + 2)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def count(self, labels: LabelValues = ()) -> int:
+        """
+        Number of observed values.
+
+        :param labels: Label values.
+        """
+        values = self._collect().get(labels)
+        return int(sum(values[:-1])) if values else 0
+
+    def samples(self) -> Iterator[str]:
+        names = self.labels + ("le",)
+        for labels, values in sorted(self._collect().items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                bucket_labels = _format_labels(names, labels + (_format_value(bound),))
+                yield f"{self.name}_bucket{bucket_labels} {int(cumulative)}"
+            series_labels = _format_labels(self.labels, labels)
+            yield f"{self.name}_sum{series_labels} {_format_value(values[-1])}"
+            yield f"{self.name}_count{series_labels} {int(cumulative)}"
+
+
+class Gauge(_Metric):
+    """
+    Value computed when the metrics are scraped (e.g. the number of carts).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, function: Callable[[], Optional[float]]) -> None:
+        """
+        Class initialization.
+
+        :param name: Metric name.
+        :param help: Metric description.
+        :param function: Computes the value, `None` to skip it.
+        """
+        super().__init__(name, help)
+        self.function = function
+
+    def samples(self) -> Iterator[str]:
+        value = self.function()
+        if value is not None:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """
+    Set of metrics exposed together.
+    """
+
+    def __init__(self) -> None:
+        """
+        Class initialization.
+        """
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        Adds a metric, replacing any other metric with the same name.
+
+        :param metric: Metric.
+        :return: The same metric.
+        """
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))  # type: ignore
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))  # type: ignore
+
+    def gauge(self, name: str, help: str, function: Callable[[], Optional[float]]) -> Gauge:
+        return self.register(Gauge(name, help, function))  # type: ignore
+
+    def render(self) -> str:
+        """
+        Renders all the metrics in the Prometheus text format.
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        return "\n".join(lines) + "\n"
+
+
+#: Metrics of the application.
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "lana_http_request_duration_seconds",
+    "Time until the response starts, per route.",
+    ("method", "route", "status"),
+)
+carts_created = registry.counter("lana_carts_created_total", "Carts created.")
+carts_deleted = registry.counter(
+    "lana_carts_deleted_total", "Carts deleted, including the expired and evicted ones."
+)
+products_added = registry.counter(
+    "lana_products_added_total", "Units of products added to carts.", ("product",)
+)
+cart_pricing_duration = registry.histogram(
+    "lana_cart_pricing_seconds",
+    "Time spent updating the cart totals, per cart operation.",
+    ("operation",),
+    PRICING_BUCKETS,
+)
+analytics_events_processed = registry.counter(
+    "lana_analytics_events_total", "Cart changes added to the analytics aggregates."
+)
+analytics_events_dropped = registry.counter(
+    "lana_analytics_events_dropped_total",
+    "Cart changes dropped because the analytics queue was full.",
+)
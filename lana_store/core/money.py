@@ -0,0 +1,60 @@
+"""
+Money arithmetic in integer minor units (e.g. cents). Discounts are exact
+fractions and totals are formatted without going through floats, so no
+amount is ever off by a rounding error.
+"""
+from fractions import Fraction
+from numbers import Rational
+from typing import Union
+
+from lana_store.core.config import settings
+
+
+#: Minor units in a major unit (e.g. 100 cents in a euro).
+MINOR_UNITS = 10 ** settings.MONEY_DECIMALS
+#: Formatted decimal part of every amount of minor units (e.g. ".05").
+_DECIMALS = (
+    [f".{minor:0{settings.MONEY_DECIMALS}d}" for minor in range(MINOR_UNITS)]
+    if MINOR_UNITS > 1
+    else [""]
+)
+
+
+def discount_factor(percentage: Union[int, Rational]) -> Fraction:
+    """
+    Exact factor to apply a percentage discount.
+
+    :param percentage: Percentage discounted (e.g. `25` for 25%).
+    :raises ValueError: When the percentage is not within [0, 100].
+    :return: Fraction of the price paid (e.g. 3/4 for 25%).
+    """
+    factor = Fraction(percentage)
+    if not 0 <= factor <= 100:
+        raise ValueError(f"Invalid discount percentage {percentage}")
+
+    return 1 - factor / 100
+
+
+def apply_factor(amount: int, factor: Fraction) -> int:
+    """
+    Multiplies an amount by a fraction, truncating the result to minor units.
+
+    :param amount: Amount of money (non-negative).
+    :param factor: Fraction to apply.
+    :return: Resulting amount.
+    """
+    return amount * factor.numerator // factor.denominator
+
+
+def format_money(amount: int) -> str:
+    """
+    Formats a money-as-integer amount with `MONEY_DECIMALS` decimals.
+
+    :param amount: Amount of money.
+    :return: Formatted amount.
+    """
+    if amount < 0:
+        return f"-{format_money(-amount)}"
+
+    units, minor = divmod(amount, MINOR_UNITS)
+    return f"{units}{_DECIMALS[minor]}"
@@ -0,0 +1,175 @@
+"""
+Pricing engine. Compiles the declarative pricing rules of the settings into a
+dispatch table indexed by product code, so pricing a product costs the same no
+matter how many rules are loaded.
+"""
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence
+
+from lana_store.core.config import settings
+from lana_store.core.money import apply_factor, discount_factor
+from lana_store.models.pricing import BulkDiscountRule, BuyXPayYRule, PricingRule
+from lana_store.models.product import Product, PRODUCT_CODES, ProductCodes
+
+
+#: Prices a number of units of a product (money-as-integer format).
+LinePricer = Callable[[int], int]
+
+
+def _compile_unit_price(price: int) -> LinePricer:
+    """
+    Builds the pricer of a product without promotions.
+
+    :param price: Unit price of the product.
+    :return: Pricer of the product.
+    """
+
+    def pricer(count: int) -> int:
+        return price * count
+
+    return pricer
+
+
+def _compile_buy_x_pay_y(price: int, rule: BuyXPayYRule) -> LinePricer:
+    """
+    Builds the pricer of a "buy X pay Y" promotion.
+
+    :param price: Unit price of the product.
+    :param rule: Rule definition.
+    :return: Pricer of the product.
+    """
+    buy, pay = rule["buy"], rule["pay"]
+
+    def pricer(count: int) -> int:
+        groups, rest = divmod(count, buy)
+        return (groups * pay + rest) * price
+
+    return pricer
+
+
+def _compile_bulk_discount(price: int, rule: BulkDiscountRule) -> LinePricer:
+    """
+    Builds the pricer of a bulk discount promotion.
+
+    :param price: Unit price of the product.
+    :param rule: Rule definition.
+    :return: Pricer of the product.
+    """
+    min_quantity, factor = rule["min_quantity"], discount_factor(rule["discount"])
+
+    def pricer(count: int) -> int:
+        if count < min_quantity:
+            return price * count
+        return apply_factor(price * count, factor)
+
+    return pricer
+
+
+#: Rule compilers by rule kind.
+RULE_COMPILERS: Dict[str, Callable[[int, PricingRule], LinePricer]] = {
+    "BUY_X_PAY_Y": _compile_buy_x_pay_y,  # type: ignore
+    "BULK_DISCOUNT": _compile_bulk_discount,  # type: ignore
+}
+
+
+def _cheapest(pricers: List[LinePricer]) -> LinePricer:
+    """
+    Combines the pricers of several rules over the same product. The customer
+    always gets the best promotion.
+
+    :param pricers: Pricers of a single product.
+    :return: Combined pricer.
+    """
+    if len(pricers) == 1:
+        return pricers[0]
+
+    def pricer(count: int) -> int:
+        return min(p(count) for p in pricers)
+
+    return pricer
+
+
+def rules_by_product(
+    product_table: Mapping[ProductCodes, Product], rules: Iterable[PricingRule]
+) -> Dict[ProductCodes, List[PricingRule]]:
+    """
+    Validates the pricing rules and groups them by product. Every pricing
+    engine compiles the rules from here.
+
+    :param product_table: Products data.
+    :param rules: Pricing rules.
+    :raises ValueError: When a rule has an unknown kind or targets an unknown product.
+    :return: Rules of every product with promotions.
+    """
+    grouped: Dict[ProductCodes, List[PricingRule]] = {}
+    for rule in rules:
+        if rule["kind"] not in RULE_COMPILERS:
+            raise ValueError(f"Unknown pricing rule kind '{rule['kind']}'")
+        if rule["product"] not in product_table:
+            raise ValueError(f"Pricing rule over unknown product '{rule['product']}'")
+
+        grouped.setdefault(rule["product"], []).append(rule)
+
+    return grouped
+
+
+def compile_rules(
+    product_table: Mapping[ProductCodes, Product], rules: Iterable[PricingRule]
+) -> Dict[ProductCodes, LinePricer]:
+    """
+    Compiles the pricing rules into a dispatch table.
+
+    :param product_table: Products data.
+    :param rules: Pricing rules.
+    :raises ValueError: When a rule has an unknown kind or targets an unknown product.
+    :return: Pricer of every product indexed by product code.
+    """
+    grouped = rules_by_product(product_table, rules)
+
+    table: Dict[ProductCodes, LinePricer] = {}
+    for product, data in product_table.items():
+        price = data["price"]
+        if product in grouped:
+            table[product] = _cheapest(
+                [RULE_COMPILERS[rule["kind"]](price, rule) for rule in grouped[product]]
+            )
+        else:
+            table[product] = _compile_unit_price(price)
+
+    return table
+
+
+#: Dispatch table built from the settings.
+pricing_table = compile_rules(settings.PRODUCT_TABLE, settings.PRICING_RULES)
+#: Same dispatch table indexed by product ordinal.
+pricers_by_ordinal: List[LinePricer] = [pricing_table[product] for product in PRODUCT_CODES]
+
+
+def price_line(product: ProductCodes, count: int) -> int:
+    """
+    Calculates the price of `count` units of a product after discounts.
+
+    :param product: Product code.
+    :param count: Number of units of the product.
+    :return: Price with the money-as-integer format.
+    """
+    return pricing_table[product](count)
+
+
+def price_cart(quantities: Mapping[ProductCodes, int]) -> int:
+    """
+    Calculates the total price of a set of products after discounts.
+
+    :param quantities: Number of units of each product.
+    :return: Total price with the money-as-integer format.
+    """
+    return sum(pricing_table[product](count) for product, count in quantities.items())
+
+
+def price_counts(counts: Sequence[int]) -> int:
+    """
+    Calculates the total price of a set of products after discounts.
+
+    :param counts: Number of units of each product, indexed by product ordinal.
+    :return: Total price with the money-as-integer format.
+    """
+    return sum(pricer(count) for pricer, count in zip(pricers_by_ordinal, counts))
@@ -0,0 +1,135 @@
+"""
+Sampling profiler of requests.
+
+While a request is profiled, a wall-clock interval timer interrupts the main
+thread (where the event loop runs) every `interval` seconds and the signal
+handler records the stack it interrupted. Unlike a sampling thread, which
+only gets to run when the interpreter switches threads (every few
+milliseconds), the timer samples short requests too. The samples are written
+in the collapsed-stack format (one `frame;frame;... count` line per distinct
+stack, root first) read by flamegraph tools such as `flamegraph.pl`,
+speedscope or inferno.
+
+The event loop runs every request, so the samples of a request also include
+the work of the requests running concurrently with it. Work offloaded to
+other threads is not sampled.
+"""
+import os
+import signal
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Dict, Optional
+
+
+def frame_name(frame: FrameType) -> str:
+    """
+    Name of a stack frame: function and file (last two path components).
+    """
+    code = frame.f_code
+    filename = "/".join(code.co_filename.rsplit(os.sep, 2)[-2:])
+    return f"{code.co_name} ({filename})"
+
+
+def collapse(frame: Optional[FrameType]) -> str:
+    """
+    Collapses a stack into a single line, root frame first.
+
+    :param frame: Innermost frame.
+    """
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+
+    return ";".join(reversed(names))
+
+
+class Profile:
+    """
+    Stack samples of a request.
+    """
+
+    __slots__ = ("samples",)
+
+    def __init__(self) -> None:
+        """
+        Class initialization.
+        """
+        #: Number of samples of every collapsed stack.
+        self.samples: "Counter[str]" = Counter()
+
+    def write(self, path: str) -> None:
+        """
+        Writes the samples in the collapsed-stack format.
+
+        :param path: File path.
+        """
+        with open(path, "w") as file:
+            for stack, count in self.samples.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class StackSampler:
+    """
+    Takes stack samples of the main thread. The interval timer only runs while
+    there are active profiles.
+    """
+
+    def __init__(self, interval: float = 0.001) -> None:
+        """
+        Class initialization.
+
+        :param interval: Seconds between samples.
+        """
+        self.interval = interval
+
+        self._profiles: Dict[int, Profile] = {}
+
+    @staticmethod
+    def available() -> bool:
+        """
+        Whether samples can be taken from the current thread: the timer signal
+        is always handled by the main thread.
+        """
+        main_thread = threading.current_thread() is threading.main_thread()
+        return main_thread and hasattr(signal, "setitimer")
+
+    def start(self) -> Profile:
+        """
+        Starts profiling the main thread. Must be called from the main thread.
+
+        :raises RuntimeError: When called from another thread or on platforms
+            without interval timers.
+        :return: The profile, filled until it is stopped.
+        """
+        if not self.available():
+            raise RuntimeError("Stack samples can only be taken from the main thread")
+
+        profile = Profile()
+        if not self._profiles:
+            signal.signal(signal.SIGALRM, self._sample)
+            signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+        self._profiles[id(profile)] = profile
+
+        return profile
+
+    def stop(self, profile: Profile) -> None:
+        """
+        Stops filling a profile. Must be called from the main thread.
+
+        :param profile: Profile.
+        """
+        self._profiles.pop(id(profile), None)
+        if not self._profiles:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+    def _sample(self, signum: int, frame: Optional[FrameType]) -> None:
+        """
+        Timer signal handler: records the interrupted stack.
+        """
+        stack = collapse(frame)
+        if stack:
+            for profile in self._profiles.values():
+                profile.samples[stack] += 1
@@ -1,3 +1,45 @@
-from .cart import create_new_cart, get_cart_by_id, remove_cart, update_cart_with_product
+from .cart import (
+    CartOperation,
+    CartPage,
+    create_new_cart,
+    create_new_carts,
+    expire_carts,
+    get_all_carts,
+    get_cart_by_id,
+    get_carts_by_ids,
+    get_carts_stats,
+    import_carts,
+    iter_all_carts,
+    list_carts,
+    remove_cart,
+    remove_carts,
+    run_cart_operations,
+    run_change,
+    unwatch_cart,
+    update_cart_products,
+    update_cart_with_product,
+    watch_cart,
+)
 
-__all__ = ["create_new_cart", "get_cart_by_id", "remove_cart", "update_cart_with_product"]
+__all__ = [
+    "CartOperation",
+    "CartPage",
+    "create_new_cart",
+    "create_new_carts",
+    "expire_carts",
+    "get_all_carts",
+    "get_cart_by_id",
+    "get_carts_by_ids",
+    "get_carts_stats",
+    "import_carts",
+    "iter_all_carts",
+    "list_carts",
+    "remove_cart",
+    "remove_carts",
+    "run_cart_operations",
+    "run_change",
+    "unwatch_cart",
+    "update_cart_products",
+    "update_cart_with_product",
+    "watch_cart",
+]
@@ -1,11 +1,211 @@
 """
 CRUD operations on the Cart.
 """
-from typing import Optional
+import asyncio
+import functools
+import itertools
+import uuid
+from operator import itemgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
 import lana_store
-from lana_store.models.cart import Cart
-from lana_store.models.product import ProductCodes
+from lana_store.core import metrics
+from lana_store.core.analytics import CartAnalytics, CartChange
+from lana_store.core.events import encode_event, Subscription
+from lana_store.core.index import CartPosition
+from lana_store.core.money import format_money
+from lana_store.db.base import CartMutation
+from lana_store.db.journal import (
+    JournalRecord,
+    OP_ADD_PRODUCT,
+    OP_CREATE,
+    OP_REMOVE,
+    OP_REMOVE_PRODUCT,
+)
+from lana_store.models.cart import Cart, cart_key, VersionConflictError
+from lana_store.models.product import PRODUCT_ORDINALS, ProductCodes
+
+
+#: Operations of cart batches.
+CartOperation = Literal["create", "get", "delete"]
+
+#: Page of a carts listing: the carts and the position to continue after (if any).
+CartPage = Tuple[List[Cart], Optional[CartPosition]]
+
+ResultT = TypeVar("ResultT")
+
+
+def _journaled(
+    op: int, action: Callable[[], Optional[Cart]], product: Optional[ProductCodes] = None
+) -> Optional[Cart]:
+    """
+    Runs a change on the carts database, logging it in the journal (if enabled).
+
+    :param op: Journal operation code.
+    :param action: Change to run.
+    :param product: Product code of product additions.
+    :return: The result of the change.
+    """
+    if lana_store.journal is None:
+        return action()
+
+    return lana_store.journal.apply(op, action, product)
+
+
+async def run_change(change: Callable[..., ResultT], *args: Any, **kwargs: Any) -> ResultT:
+    """
+    Runs a change of the carts from the event loop. With the `always` fsync
+    policy of the journal, it runs in a thread instead, so the event loop is
+    not blocked until the change is synced to disk.
+
+    :param change: CRUD operation.
+    :param args: Positional arguments of the operation.
+    :param kwargs: Keyword arguments of the operation.
+    :return: The result of the operation.
+    """
+    journal = lana_store.journal
+    if journal is None or journal.fsync != "always":
+        return change(*args, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(change, *args, **kwargs))
+
+
+def _publish(cart: Optional[Cart], event: str, data: Dict[str, Any], last: bool = False) -> None:
+    """
+    Pushes a change of a cart to its subscribers (if any). Changes carry the
+    new version and total of the cart.
+
+    :param cart: Changed cart (if any).
+    :param event: Event type.
+    :param data: Change description.
+    :param last: Whether the cart is gone after this change.
+    """
+    if cart is None or not lana_store.events.watched(cart.key):
+        return
+
+    if not last:
+        data = {**data, "total": format_money(cart.total), "version": cart.version}
+    lana_store.events.publish(cart.key, encode_event(event, data, cart.version), last)
+
+
+def _analyzed(mutation: CartMutation) -> Tuple[CartMutation, List[CartChange]]:
+    """
+    Records the units of the cart before and after a change, for the analytics
+    (if enabled). They are taken within the atomic store update, so concurrent
+    changes of the same cart are recorded in the order they were applied.
+
+    :param mutation: Change of the cart.
+    :return: The recording change and where the change is recorded once applied.
+    """
+    if lana_store.analytics is None:
+        return mutation, []
+
+    changes: List[CartChange] = []
+
+    def analyzed(cart: Cart) -> None:
+        before = tuple(cart.counts)
+        mutation(cart)
+        changes[:] = [(before, tuple(cart.counts))]
+
+    return analyzed, changes
+
+
+def _analyze(changes: Sequence[CartChange]) -> None:
+    """
+    Publishes changes of carts to the analytics (if enabled).
+
+    :param changes: Units of every cart before and after its change.
+    """
+    if lana_store.analytics is not None:
+        for before, after in changes:
+            lana_store.analytics.publish(before, after)
+
+
+def _delete(id: str) -> Optional[Cart]:
+    """
+    Deletes a cart from the carts database.
+
+    :param id: Id of the cart to be deleted.
+    :return: The deleted cart (if any).
+    """
+    cart = _journaled(OP_REMOVE, lambda: lana_store.carts_db.pop(id))
+    if cart is not None:
+        metrics.carts_deleted.inc()
+        if lana_store.index is not None:
+            lana_store.index.remove(cart.key)
+        _analyze([(tuple(cart.counts), None)])
+    _publish(cart, "cart_deleted", {}, last=True)
+
+    return cart
+
+
+def _touch_key(key: bytes) -> None:
+    """
+    Records an access to a cart (if expiration is enabled), evicting the least
+    recently used carts when there are too many.
+
+    :param key: Key of the accessed cart.
+    """
+    if lana_store.expiry is not None:
+        for evicted in lana_store.expiry.touch(key):
+            _delete(str(uuid.UUID(bytes=evicted)))
+
+
+def _touch(cart: Optional[Cart]) -> Optional[Cart]:
+    """
+    Records an access to a cart (see `_touch_key`).
+
+    :param cart: Accessed cart (if any).
+    :return: The same cart.
+    """
+    if cart is not None:
+        _touch_key(cart.key)
+
+    return cart
+
+
+def _reindex(cart: Optional[Cart]) -> None:
+    """
+    Updates the products of a cart in the secondary indexes (if enabled).
+
+    :param cart: Changed cart (if any).
+    """
+    if cart is not None and lana_store.index is not None:
+        lana_store.index.update(cart.key, cart.counts)
+
+
+def _if_version(mutation: CartMutation, expected_version: Optional[int]) -> CartMutation:
+    """
+    Makes a change conditional on the version of the cart. The check and the
+    change run within the same atomic store update (compare-and-set), so only
+    the writers of the same cart contend.
+
+    :param mutation: Change of the cart.
+    :param expected_version: Version the cart must be at, `None` to always apply.
+    :return: The conditional change.
+    """
+    if expected_version is None:
+        return mutation
+
+    def conditional(cart: Cart) -> None:
+        if cart.version != expected_version:
+            raise VersionConflictError(cart.version)
+        mutation(cart)
+
+    return conditional
 
 
 def create_new_cart() -> Cart:
@@ -15,7 +215,17 @@ def create_new_cart() -> Cart:
     :return: The new cart object.
     """
     new_cart = Cart()
-    lana_store.carts_db[str(new_cart.id)] = new_cart
+
+    def add() -> Cart:
+        lana_store.carts_db.add(new_cart)
+        return new_cart
+
+    _journaled(OP_CREATE, add)
+    metrics.carts_created.inc()
+    if lana_store.index is not None:
+        lana_store.index.add(new_cart.key, new_cart.counts)
+    _analyze([(None, tuple(new_cart.counts))])
+    _touch(new_cart)
 
     return new_cart
 
@@ -27,29 +237,169 @@ def get_cart_by_id(id: str) -> Optional[Cart]:
     :param id: Cart Id to search for.
     :return: The correspondent cart object (if any).
     """
-    try:
-        return lana_store.carts_db[id]
-    except KeyError:
+    return _touch(lana_store.carts_db.get(id))
+
+
+def get_carts_by_ids(ids: Sequence[str]) -> List[Optional[Cart]]:
+    """
+    Fetches many carts by their Ids.
+
+    :param ids: Cart Ids to search for.
+    :return: The correspondent cart objects, `None` for the missing ones.
+    """
+    return lana_store.carts_db.get_many(ids)
+
+
+def get_all_carts() -> List[Cart]:
+    """
+    Fetches every cart.
+
+    :return: All the cart objects.
+    """
+    return list(lana_store.carts_db.values())
+
+
+def iter_all_carts() -> Iterator[Cart]:
+    """
+    Iterates over every cart, without holding all of them at once.
+
+    :return: Iterator of the cart objects.
+    """
+    return lana_store.carts_db.values()
+
+
+def get_carts_stats() -> Optional[CartAnalytics]:
+    """
+    Fetches the live aggregates of the carts, without scanning them.
+
+    :return: The aggregates, `None` when the analytics are disabled.
+    """
+    return lana_store.analytics
+
+
+def list_carts(
+    limit: int,
+    after: Optional[CartPosition] = None,
+    created_after: Optional[float] = None,
+    product: Optional[ProductCodes] = None,
+    min_total: Optional[int] = None,
+    max_scan: int = 10_000,
+) -> Optional[CartPage]:
+    """
+    Lists carts in creation order through the secondary indexes. Filters
+    without an index (`min_total`) are applied to the scanned carts, up to
+    `max_scan` of them: pages may then have less than `limit` carts and still
+    be followed by more.
+
+    :param limit: Max number of carts.
+    :param after: Position of the last cart of the previous page.
+    :param created_after: Only the carts created after this timestamp.
+    :param product: Only the carts with units of this product.
+    :param min_total: Only the carts with this total (money-as-integer) or more.
+    :param max_scan: Max number of carts scanned.
+    :return: The carts and the position to continue after (`None` at the end),
+        `None` when the indexes are disabled.
+    """
+    if lana_store.index is None:
         return None
 
+    positions = lana_store.index.scan(
+        after, created_after, PRODUCT_ORDINALS[product] if product else None
+    )
+    carts: List[Cart] = []
+    last: Optional[CartPosition] = None
+    scanned = 0
+    while len(carts) < limit and scanned < max_scan:
+        batch = list(itertools.islice(positions, min(limit - len(carts), max_scan - scanned)))
+        if not batch:
+            return carts, None
+
+        scanned += len(batch)
+        ids = [str(uuid.UUID(bytes=key)) for _, key in batch]
+        for cart in lana_store.carts_db.get_many(ids):
+            if cart is not None and (min_total is None or cart.total >= min_total):
+                carts.append(cart)
+        last = batch[-1]
+
+    return carts, last
+
 
-def update_cart_with_product(id: str, product: ProductCodes) -> Optional[Cart]:
+def update_cart_with_product(
+    id: str, product: ProductCodes, expected_version: Optional[int] = None
+) -> Optional[Cart]:
     """
     Adds a product to a cart.
 
     :param id: Id of the cart to update.
     :param product: Product code to be added.
     :type product: str
+    :param expected_version: Version the cart must be at, `None` to always apply.
+    :raises VersionConflictError: When the cart is at another version.
     :return: The updated cart object (if any).
     """
-    try:
-        cart = lana_store.carts_db[id]
-    except KeyError:
-        return None
+    mutation, changes = _analyzed(
+        _if_version(lambda cart: cart.add_product(product), expected_version)
+    )
+    cart = _journaled(OP_ADD_PRODUCT, lambda: lana_store.carts_db.update(id, mutation), product)
+    if cart is not None:
+        metrics.products_added.inc((product,))
+    _reindex(cart)
+    _analyze(changes)
+    _publish(cart, "product_added", {"product": product})
 
-    cart.products.append(product)
+    return _touch(cart)
 
-    return cart
+
+def update_cart_products(
+    id: str,
+    add: Sequence[Tuple[ProductCodes, int]] = (),
+    remove: Sequence[Tuple[ProductCodes, int]] = (),
+    expected_version: Optional[int] = None,
+) -> Optional[Cart]:
+    """
+    Adds and removes many units of products of a cart at once, atomically.
+
+    :param id: Id of the cart to update.
+    :param add: Product codes and number of units to add.
+    :param remove: Product codes and number of units to remove.
+    :param expected_version: Version the cart must be at, `None` to always apply.
+    :raises NotEnoughProductsError: When removing more units than the cart has.
+    :raises VersionConflictError: When the cart is at another version.
+    :return: The updated cart object (if any).
+    """
+    mutation, changes = _analyzed(
+        _if_version(lambda cart: cart.update_products(add, remove), expected_version)
+    )
+
+    def action() -> Optional[Cart]:
+        return lana_store.carts_db.update(id, mutation)
+
+    if lana_store.journal is None:
+        cart = action()
+    else:
+        records: List[JournalRecord] = [
+            (OP_ADD_PRODUCT, product) for product, quantity in add for _ in range(quantity)
+        ]
+        records += [
+            (OP_REMOVE_PRODUCT, product) for product, quantity in remove for _ in range(quantity)
+        ]
+        cart = lana_store.journal.apply_many(action, records)
+
+    if cart is not None:
+        for product, quantity in add:
+            metrics.products_added.inc((product,), quantity)
+    _reindex(cart)
+    _analyze(changes)
+    _publish(
+        cart,
+        "products_updated",
+        {
+            "added": [{"product": product, "quantity": quantity} for product, quantity in add],
+            "removed": [{"product": product, "quantity": quantity} for product, quantity in remove],
+        },
+    )
+
+    return _touch(cart)
 
 
 def remove_cart(id: str) -> Optional[Cart]:
@@ -59,11 +409,155 @@ def remove_cart(id: str) -> Optional[Cart]:
     :param id: Id of the cart to be deleted.
     :return: The deleted cart (if any).
     """
-    try:
-        cart = lana_store.carts_db[id]
-    except KeyError:
-        return None
+    cart = _delete(id)
 
-    del lana_store.carts_db[id]
+    if cart is not None and lana_store.expiry is not None:
+        lana_store.expiry.forget(cart.key)
 
     return cart
+
+
+def expire_carts() -> int:
+    """
+    Deletes the carts that have not been accessed for longer than the TTL.
+
+    :return: Number of deleted carts.
+    """
+    if lana_store.expiry is None:
+        return 0
+
+    expired = 0
+    for key in lana_store.expiry.pop_expired():
+        if _delete(str(uuid.UUID(bytes=key))):
+            expired += 1
+
+    return expired
+
+
+def watch_cart(id: str) -> Optional[Tuple[Cart, Subscription]]:
+    """
+    Subscribes to the changes of a cart. Must be called from the event loop.
+
+    :param id: Cart Id.
+    :return: The cart, as of the subscription time or later, and the
+        subscription to its changes (if the cart exists).
+    """
+    key = cart_key(id)
+    if key is None:
+        return None
+
+    # Subscribes first so no change after the cart is fetched is missed
+    subscription = lana_store.events.subscribe(key)
+    cart = get_cart_by_id(id)
+    if cart is None:
+        lana_store.events.unsubscribe(subscription)
+        return None
+
+    return cart, subscription
+
+
+def unwatch_cart(subscription: Subscription) -> None:
+    """
+    Cancels a subscription to the changes of a cart.
+
+    :param subscription: Subscription.
+    """
+    lana_store.events.unsubscribe(subscription)
+
+
+def _replace(cart: Cart) -> Optional[Cart]:
+    """
+    Replaces a stored cart with the products of another one with the same Id
+    (see `Cart.replace`), notifying the subscribers and the analytics.
+
+    :param cart: Cart replacing the stored one.
+    :return: The replaced cart, `None` when there is none.
+    """
+    mutation, changes = _analyzed(lambda stored: stored.replace(cart))
+    replaced = lana_store.carts_db.update(str(cart.id), mutation)
+    if replaced is not None:
+        _analyze(changes)
+        _publish(replaced, "cart", {"products": replaced.products})
+
+    return replaced
+
+
+def import_carts(carts: Iterable[Tuple[bytes, int, bytes]]) -> int:
+    """
+    Stores carts exported from another server. Carts with the same Ids are
+    replaced, taking a version after both the stored and the exported ones so
+    clients never mistake them for a version they have. Imports are not logged
+    record by record: a snapshot of the journal (if enabled) is written once
+    all the carts are stored.
+
+    :param carts: UUID bytes, cart version and product ordinals of every cart.
+    :return: Number of imported carts.
+    """
+    keys: List[bytes] = []
+
+    def created() -> Iterator[Cart]:
+        for key, version, lines in carts:
+            keys.append(key)
+            cart = Cart.from_lines(key, lines, version)
+            replaced = _replace(cart)
+            if lana_store.index is not None:
+                lana_store.index.add(key, (replaced or cart).counts)
+            if replaced is None:
+                _analyze([(None, tuple(cart.counts))])
+                yield cart
+
+    lana_store.carts_db.add_many(created())
+
+    for key in keys:
+        _touch_key(key)
+
+    if lana_store.journal is not None:
+        lana_store.journal.snapshot()
+
+    return len(keys)
+
+
+def create_new_carts(count: int) -> List[Cart]:
+    """
+    Creates many new (empty) carts.
+
+    :param count: Number of carts.
+    :return: The new carts.
+    """
+    return [create_new_cart() for _ in range(count)]
+
+
+def remove_carts(ids: Sequence[str]) -> List[Optional[Cart]]:
+    """
+    Deletes many carts.
+
+    :param ids: Ids of the carts to be deleted.
+    :return: The deleted carts, `None` for the ones not found.
+    """
+    return [remove_cart(id) for id in ids]
+
+
+def run_cart_operations(
+    operations: Sequence[Tuple[CartOperation, Optional[str]]]
+) -> List[Optional[Cart]]:
+    """
+    Runs a batch of cart operations in order. Consecutive operations of the same
+    kind are run together (e.g. consecutive gets with a single store lookup).
+
+    :param operations: Operation and cart Id (ignored by `create`) of every item.
+    :return: The created, fetched or deleted cart of every item, `None` when
+        the cart was not found.
+    """
+    results: List[Optional[Cart]] = []
+    for op, items in itertools.groupby(operations, key=itemgetter(0)):
+        ids = [id or "" for _, id in items]
+        if op == "create":
+            results.extend(create_new_carts(len(ids)))
+        elif op == "get":
+            results.extend(_touch(cart) for cart in get_carts_by_ids(ids))
+        elif op == "delete":
+            results.extend(remove_carts(ids))
+        else:
+            raise ValueError(f"Unknown cart operation '{op}'")
+
+    return results
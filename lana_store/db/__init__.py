@@ -0,0 +1,13 @@
+from .base import CartMutation, CartStore, StoreFullError
+from .factory import create_store
+from .journal import CartJournal
+from .memory import ShardedCartStore
+
+__all__ = [
+    "CartJournal",
+    "CartMutation",
+    "CartStore",
+    "ShardedCartStore",
+    "StoreFullError",
+    "create_store",
+]
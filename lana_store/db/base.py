@@ -0,0 +1,99 @@
+"""
+Interface of the carts storage backends.
+"""
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+from typing_extensions import Protocol
+
+from lana_store.models.cart import Cart
+
+
+#: In-place modification of a cart.
+CartMutation = Callable[[Cart], None]
+
+
+class StoreFullError(Exception):
+    """
+    The store has no room for more carts or for more products in a cart.
+    """
+
+
+class CartStore(Protocol):
+    """
+    Storage of carts indexed by their Id (as string). Backends are free to
+    choose how carts are laid out as long as every method is safe to call from
+    several threads.
+    """
+
+    def add(self, cart: Cart) -> None:
+        """
+        Stores a new cart.
+
+        :param cart: Cart to store.
+        """
+        ...
+
+    def add_many(self, carts: Iterable[Cart]) -> None:
+        """
+        Stores many carts (e.g. imported ones), replacing the stored carts with
+        the same Ids.
+
+        :param carts: Carts to store.
+        """
+        ...
+
+    def get(self, id: str) -> Optional[Cart]:
+        """
+        Fetches a cart.
+
+        :param id: Cart Id.
+        :return: The cart (if any).
+        """
+        ...
+
+    def get_many(self, ids: Sequence[str]) -> List[Optional[Cart]]:
+        """
+        Fetches many carts.
+
+        :param ids: Cart Ids.
+        :return: The carts, `None` for the missing ones.
+        """
+        ...
+
+    def update(self, id: str, mutation: CartMutation) -> Optional[Cart]:
+        """
+        Modifies a cart atomically: no other update of the same cart runs at
+        the same time.
+
+        :param id: Cart Id.
+        :param mutation: Function that modifies the cart in place.
+        :return: The updated cart (if any).
+        """
+        ...
+
+    def pop(self, id: str) -> Optional[Cart]:
+        """
+        Removes a cart.
+
+        :param id: Cart Id.
+        :return: The removed cart (if any).
+        """
+        ...
+
+    def values(self) -> Iterator[Cart]:
+        """
+        Iterates over all the stored carts.
+        """
+        ...
+
+    def clear(self) -> None:
+        """
+        Removes all the carts.
+        """
+        ...
+
+    def __len__(self) -> int:
+        """
+        Number of stored carts.
+        """
+        ...
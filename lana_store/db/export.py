@@ -0,0 +1,142 @@
+"""
+Compact binary export of carts, to move them between servers (e.g. warm
+restarts and migrations).
+
+Layout (little-endian)::
+
+    header:  magic "LCEX" | format version (u16) | product codes length (u16)
+             | product codes (ASCII, comma separated)
+    cart:    UUID (16 bytes) | cart version (u32) | units of every product (u32 each)
+
+Carts are fixed-width records, so an export is written as a stream (the number
+of carts follows from the file size) and read through a memory map without
+parsing nor buffering it. The header lists the product codes of the unit
+counts, so exports can be imported by servers that number products
+differently. Units are kept per product: the order products were added in is
+not exported.
+"""
+import mmap
+import os
+import struct
+from typing import IO, Iterable, Iterator, List, Tuple
+
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES, PRODUCT_ORDINALS
+
+
+MAGIC = b"LCEX"
+FORMAT_VERSION = 1
+
+#: Number of carts encoded together when exporting.
+CHUNK_CARTS = 1024
+
+#: Max units of a cart in an export, so a corrupted count cannot exhaust the memory.
+MAX_CART_UNITS = 1_000_000
+
+_HEADER = struct.Struct("<4sHH")
+
+
+class ExportError(Exception):
+    """
+    The export is corrupted, has an unsupported format or has unknown products.
+    """
+
+
+def _cart_struct(products: int) -> struct.Struct:
+    return struct.Struct(f"<16sI{products}I")
+
+
+def export_carts(carts: Iterable[Cart]) -> Iterator[bytes]:
+    """
+    Encodes carts as an export.
+
+    :param carts: Carts to export.
+    :return: Iterator of the export chunks, the header first.
+    """
+    codes = ",".join(PRODUCT_CODES).encode("ascii")
+    yield _HEADER.pack(MAGIC, FORMAT_VERSION, len(codes)) + codes
+
+    pack = _cart_struct(len(PRODUCT_CODES)).pack
+    chunk: List[bytes] = []
+    for cart in carts:
+        chunk.append(pack(cart.key, cart.version, *cart.counts))
+        if len(chunk) == CHUNK_CARTS:
+            yield b"".join(chunk)
+            chunk = []
+
+    if chunk:
+        yield b"".join(chunk)
+
+
+def read_export(file: IO[bytes]) -> Iterator[Tuple[bytes, int, bytes]]:
+    """
+    Reads an export through a memory map. The whole export is validated before
+    the first cart is returned.
+
+    :param file: Export file, open for reading at its start.
+    :raises ExportError: When the export is invalid, truncated or has products
+        unknown to this server.
+    :return: Iterator of (UUID bytes, cart version, product ordinals) per cart.
+    """
+    try:
+        magic, version, codes_size = _HEADER.unpack(file.read(_HEADER.size))
+    except struct.error:
+        raise ExportError("Invalid export header")
+
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ExportError("Unsupported export format")
+
+    try:
+        codes = file.read(codes_size).decode("ascii").split(",")
+    except UnicodeDecodeError:
+        raise ExportError("Invalid export header")
+
+    unknown = set(codes) - set(PRODUCT_ORDINALS)
+    if unknown:
+        raise ExportError(f"Unknown products: {', '.join(sorted(unknown))}")
+
+    cart_struct = _cart_struct(len(codes))
+    start = _HEADER.size + codes_size
+    size = os.fstat(file.fileno()).st_size
+    if size < start or (size - start) % cart_struct.size:
+        raise ExportError("Truncated export")
+
+    if size == start:
+        return iter(())
+
+    _check_units(file, cart_struct, start)
+    ordinals = [bytes((PRODUCT_ORDINALS[code],)) for code in codes]  # type: ignore
+    return _carts(file, cart_struct, start, ordinals)
+
+
+def _check_units(file: IO[bytes], cart_struct: struct.Struct, start: int) -> None:
+    """
+    Checks that no cart of an export has more than `MAX_CART_UNITS` units.
+    """
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        records = memoryview(data)[start:]
+        unpack = cart_struct.iter_unpack(records)
+        try:
+            for _, _, *units in unpack:
+                if sum(units) > MAX_CART_UNITS:
+                    raise ExportError(f"Carts cannot have more than {MAX_CART_UNITS} units")
+        finally:
+            # Lets the records be released
+            del unpack
+            records.release()
+
+
+def _carts(
+    file: IO[bytes], cart_struct: struct.Struct, start: int, ordinals: List[bytes]
+) -> Iterator[Tuple[bytes, int, bytes]]:
+    """
+    Decodes the carts of a validated export, as they are consumed.
+    """
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        records = memoryview(data)[start:]
+        try:
+            for key, version, *units in cart_struct.iter_unpack(records):
+                lines = b"".join([ordinal * count for ordinal, count in zip(ordinals, units)])
+                yield key, version, lines
+        finally:
+            records.release()
@@ -0,0 +1,26 @@
+"""
+Carts storage backend selection.
+"""
+from lana_store.core.config import Settings
+from lana_store.db.base import CartStore
+from lana_store.db.memory import ShardedCartStore
+
+
+def create_store(settings: Settings) -> CartStore:
+    """
+    Builds the carts store selected in the settings.
+
+    :param settings: Application settings.
+    :raises ValueError: On unknown backends.
+    :return: The carts store.
+    """
+    if settings.CARTS_STORE == "memory":
+        return ShardedCartStore(settings.CARTS_STORE_SHARDS)
+
+    elif settings.CARTS_STORE == "sqlite":
+        # Only imported when selected
+        from lana_store.db.sqlite import SQLiteCartStore
+
+        return SQLiteCartStore(settings.SQLITE_PATH, settings.SQLITE_POOL_SIZE)
+
+    raise ValueError(f"Unknown carts store '{settings.CARTS_STORE}'")
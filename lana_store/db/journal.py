@@ -0,0 +1,348 @@
+"""
+Durable append-only write-ahead log (journal) of the carts changes, with
+periodic snapshots to keep recovery fast.
+
+Every record has a fixed size (little-endian)::
+
+    seq (u64) | operation (u8) | cart UUID (16 bytes) | product ordinal (u8) | CRC32 (u32)
+
+Changes made of several records (e.g. bulk product updates) share the same
+seq and all but the last one have the `OP_CONTINUED` flag set, so they are
+replayed all or nothing.
+
+On startup the last snapshot is loaded and the records written after it are
+replayed. A torn record at the end of the log (crash in the middle of a write)
+is discarded along with the rest of its change.
+
+Snapshots copy the carts and switch to a new log file while operations are
+blocked, then write the copy while operations go on. The former log is only
+removed once the snapshot is on disk, and both logs are replayed if the
+process stops before.
+"""
+import os
+import struct
+import threading
+import uuid
+import zlib
+from typing import BinaryIO, Callable, List, Literal, Optional, Sequence, Tuple
+
+from lana_store.db.base import CartStore
+from lana_store.db.snapshot import read_snapshot, SnapshotCart, write_snapshot
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES, PRODUCT_ORDINALS, ProductCodes
+
+
+#: Fsync policies.
+#:
+#: * `always`: every record is synced to disk before the operation returns.
+#: * `interval`: a background thread syncs all the pending records every
+#:   `sync_interval_ms` (one fsync for many records). Operations return before
+#:   their records are synced, so a crash of the process or of the machine
+#:   loses the changes of the last interval (plus the time the fsync takes),
+#:   even though they were acknowledged.
+#: * `never`: flushing to disk is left to the OS.
+FsyncPolicy = Literal["always", "interval", "never"]
+
+OP_CREATE = 1
+OP_ADD_PRODUCT = 2
+OP_REMOVE = 3
+OP_REMOVE_PRODUCT = 4
+#: Flag of the records followed by more records of the same change.
+OP_CONTINUED = 0x80
+
+#: Operation code and product code (if any) of a record.
+JournalRecord = Tuple[int, Optional[ProductCodes]]
+
+_RECORD = struct.Struct("<QB16sB")
+_CRC = struct.Struct("<I")
+RECORD_SIZE = _RECORD.size + _CRC.size
+
+SNAPSHOT_FILE = "carts.snapshot"
+LOG_FILE = "carts.wal"
+#: Log of the records before the snapshot being written.
+PREVIOUS_LOG_FILE = "carts.wal.previous"
+
+
+class CartJournal:
+    """
+    Write-ahead log of a carts store.
+    """
+
+    def __init__(
+        self,
+        store: CartStore,
+        directory: str,
+        fsync: FsyncPolicy = "interval",
+        sync_interval_ms: int = 10,
+        snapshot_every: int = 100_000,
+    ) -> None:
+        """
+        Class initialization.
+
+        :param store: Journaled carts store.
+        :param directory: Directory of the log and snapshot files.
+        :param fsync: Fsync policy.
+        :param sync_interval_ms: Interval between syncs with the `interval`
+            policy, and between checks for snapshots.
+        :param snapshot_every: Number of records after which a new snapshot is
+            written and the log truncated.
+        :raises ValueError: On unknown fsync policies.
+        """
+        if fsync not in ("always", "interval", "never"):
+            raise ValueError(f"Unknown fsync policy '{fsync}'")
+
+        self.store = store
+        self.fsync = fsync
+        self.sync_interval_ms = sync_interval_ms
+        self.snapshot_every = snapshot_every
+
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.log_path = os.path.join(directory, LOG_FILE)
+        self.previous_log_path = os.path.join(directory, PREVIOUS_LOG_FILE)
+        os.makedirs(directory, exist_ok=True)
+
+        #: Sequence number of the last record written.
+        self.seq = 0
+        #: Sequence number of the last record synced to disk.
+        self.synced_seq = 0
+        #: Number of records written since the last snapshot.
+        self.pending_snapshot = 0
+        #: Whether there are records not synced to disk yet.
+        self.dirty = False
+
+        # Operations and the log file. When both are needed, taken after the sync lock
+        self._lock = threading.Lock()
+        # One fsync at a time, so waiting callers share the next one
+        self._sync_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._file: Optional[BinaryIO] = None
+        self._worker: Optional[threading.Thread] = None
+
+    def open(self) -> int:
+        """
+        Recovers the store contents (snapshot plus log tail) and opens the log
+        for appending.
+
+        :return: Number of recovered carts.
+        """
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            snapshot_seq, carts = read_snapshot(self.snapshot_path)
+            for key, version, lines in carts:
+                self.store.add(Cart.from_lines(key, lines, version))
+
+        self.seq = snapshot_seq
+        # Left by a snapshot that was not written
+        interrupted = os.path.exists(self.previous_log_path)
+        if interrupted:
+            self._replay(self.previous_log_path, snapshot_seq)
+        valid_size = (
+            self._replay(self.log_path, snapshot_seq) if os.path.exists(self.log_path) else 0
+        )
+
+        self._file = open(self.log_path, "ab")
+        # Drops a torn record at the end of the log
+        self._file.truncate(valid_size)
+        if interrupted:
+            write_snapshot(self.snapshot_path, self.store.values(), self.seq)
+            self._file.truncate(0)
+            os.remove(self.previous_log_path)
+            self.pending_snapshot = 0
+        self.synced_seq = self.seq
+
+        self._closed.clear()
+        self._worker = threading.Thread(target=self._background, name="cart-journal", daemon=True)
+        self._worker.start()
+
+        return len(self.store)
+
+    def _replay(self, path: str, snapshot_seq: int) -> int:
+        """
+        Applies the log records written after the snapshot.
+
+        :param path: Log file path.
+        :param snapshot_seq: Sequence number of the last record in the snapshot.
+        :return: Size of the valid part of the log.
+        """
+        valid_size = size = 0
+        change: List[Tuple[int, int]] = []
+        with open(path, "rb") as file:
+            while True:
+                data = file.read(RECORD_SIZE)
+                if len(data) < RECORD_SIZE:
+                    break
+                body = data[: _RECORD.size]
+                if zlib.crc32(body) != _CRC.unpack_from(data, _RECORD.size)[0]:
+                    break
+
+                size += RECORD_SIZE
+                seq, op, key, ordinal = _RECORD.unpack(body)
+                change.append((op & ~OP_CONTINUED, ordinal))
+                if op & OP_CONTINUED:
+                    continue
+
+                valid_size = size
+                if seq > snapshot_seq:
+                    self._replay_change(key, change)
+                    self.seq = seq
+                    self.pending_snapshot += len(change)
+                change = []
+
+        return valid_size
+
+    def _replay_change(self, key: bytes, change: Sequence[Tuple[int, int]]) -> None:
+        """
+        Applies the records of a single change.
+
+        :param key: Cart key.
+        :param change: Operation code and product ordinal of every record.
+        """
+        id = str(uuid.UUID(bytes=key))
+        op = change[0][0]
+        if op == OP_CREATE:
+            self.store.add(Cart.from_lines(key, b""))
+        elif op == OP_REMOVE:
+            self.store.pop(id)
+        elif len(change) == 1 and op == OP_ADD_PRODUCT:
+            product = PRODUCT_CODES[change[0][1]]
+            self.store.update(id, lambda cart: cart.add_product(product))
+        else:
+            add = [(PRODUCT_CODES[o], 1) for code, o in change if code == OP_ADD_PRODUCT]
+            remove = [(PRODUCT_CODES[o], 1) for code, o in change if code == OP_REMOVE_PRODUCT]
+            self.store.update(id, lambda cart: cart.update_products(add, remove))
+
+    def apply(
+        self,
+        op: int,
+        action: Callable[[], Optional[Cart]],
+        product: Optional[ProductCodes] = None,
+    ) -> Optional[Cart]:
+        """
+        Runs a store operation and logs it when it succeeds. Operations and
+        snapshots are serialized so the log order matches the store state. With
+        the `always` policy, returns once the record is synced to disk.
+
+        :param op: Operation code (`OP_*`).
+        :param action: Store operation, returns `None` when it did not apply.
+        :param product: Product code of `OP_ADD_PRODUCT` operations.
+        :return: The result of the action.
+        """
+        return self.apply_many(action, [(op, product)])
+
+    def apply_many(
+        self, action: Callable[[], Optional[Cart]], records: Sequence[JournalRecord]
+    ) -> Optional[Cart]:
+        """
+        Runs a store operation and logs it as several records when it succeeds.
+        The records are replayed all or nothing.
+
+        :param action: Store operation, returns `None` when it did not apply.
+        :param records: Operation code and product code of every record.
+        :return: The result of the action.
+        """
+        with self._lock:
+            cart = action()
+            if cart is None or not records:
+                return cart
+
+            self.seq += 1
+            data = bytearray()
+            last = len(records) - 1
+            for i, (op, product) in enumerate(records):
+                body = _RECORD.pack(
+                    self.seq,
+                    op if i == last else op | OP_CONTINUED,
+                    cart.key,
+                    PRODUCT_ORDINALS[product] if product else 0,
+                )
+                data += body + _CRC.pack(zlib.crc32(body))
+            self._file.write(data)  # type: ignore
+            self.pending_snapshot += len(records)
+            self.dirty = True
+            seq = self.seq
+
+        if self.fsync == "always":
+            self.sync(seq)
+
+        return cart
+
+    def sync(self, seq: Optional[int] = None) -> None:
+        """
+        Flushes the log to disk (the fsync is skipped with the `never` policy).
+        Operations are not blocked during the fsync, and the callers waiting
+        meanwhile share the next one.
+
+        :param seq: Sequence number of the last record to sync, `None` for all.
+        """
+        with self._sync_lock:
+            with self._lock:
+                if self._file is None or self.synced_seq >= (self.seq if seq is None else seq):
+                    return
+                self._file.flush()
+                synced, self.dirty = self.seq, False
+                fd = self._file.fileno()
+
+            if self.fsync != "never":
+                os.fsync(fd)
+            self.synced_seq = synced
+
+    def _switch_log(self) -> None:
+        """
+        Syncs and closes the log, and starts a new one. The former log is kept
+        until the snapshot of its records is written. Both locks must be held.
+        """
+        self._file.flush()  # type: ignore
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())  # type: ignore
+        self._file.close()  # type: ignore
+        os.replace(self.log_path, self.previous_log_path)
+        self._file = open(self.log_path, "ab")
+        self.synced_seq, self.dirty = self.seq, False
+
+    def snapshot(self) -> int:
+        """
+        Writes a snapshot of the store and truncates the log. Operations are
+        only blocked while the carts are copied, not while they are written.
+
+        :return: Number of carts written.
+        """
+        with self._snapshot_lock:
+            with self._sync_lock, self._lock:
+                # Carts change in place, the copy is what the snapshot is as of seq
+                carts = [
+                    SnapshotCart(cart.key, cart.version, bytes(cart.lines))
+                    for cart in self.store.values()
+                ]
+                seq = self.seq
+                self._switch_log()
+                self.pending_snapshot = 0
+
+            count = write_snapshot(self.snapshot_path, carts, seq)
+            os.remove(self.previous_log_path)
+
+        return count
+
+    def _background(self) -> None:
+        """
+        Interval syncs and periodic snapshots.
+        """
+        while not self._closed.wait(self.sync_interval_ms / 1000):
+            if self.pending_snapshot >= self.snapshot_every:
+                self.snapshot()
+            elif self.dirty:
+                self.sync()
+
+    def close(self) -> None:
+        """
+        Syncs and closes the log.
+        """
+        self._closed.set()
+        if self._worker:
+            self._worker.join()
+
+        self.sync()
+        with self._sync_lock, self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,146 @@
+"""
+In-memory carts storage.
+"""
+import itertools
+import sys
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from lana_store.db.base import CartMutation
+from lana_store.models.cart import Cart, cart_key
+
+
+#: Approximate bytes of a dictionary entry (hash, key and value pointers plus
+#: the index slot, at the usual dictionary load).
+DICT_ENTRY_BYTES = 40
+
+
+class _Shard:
+    """
+    A slice of the carts with its own lock.
+    """
+
+    __slots__ = ("carts", "lock")
+
+    def __init__(self) -> None:
+        """
+        Class initialization.
+        """
+        self.carts: Dict[bytes, Cart] = {}
+        self.lock = threading.Lock()
+
+
+class ShardedCartStore:
+    """
+    Stores carts across N dictionaries (shards) keyed by the 16-byte cart key
+    and selected by its hash. Writes take the lock of a single shard so threads working on
+    different shards do not contend. Reads rely on dictionary lookups being
+    atomic and take no lock.
+    """
+
+    def __init__(self, shards: int = 16) -> None:
+        """
+        Class initialization.
+
+        :param shards: Number of shards.
+        :raises ValueError: When the number of shards is not positive.
+        """
+        if shards < 1:
+            raise ValueError(f"Number of shards must be positive, got {shards}")
+
+        self._shards = tuple(_Shard() for _ in range(shards))
+
+    def _shard(self, key: bytes) -> _Shard:
+        """
+        Selects the shard of a cart.
+
+        :param key: Cart key.
+        :return: Shard that holds (or would hold) the cart.
+        """
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _get(self, key: Optional[bytes]) -> Optional[Cart]:
+        """
+        Fetches a cart by its key.
+        """
+        if key is None:
+            return None
+        return self._shard(key).carts.get(key)
+
+    def add(self, cart: Cart) -> None:
+        shard = self._shard(cart.key)
+        with shard.lock:
+            shard.carts[cart.key] = cart
+
+    def add_many(self, carts: Iterable[Cart]) -> None:
+        for cart in carts:
+            shard = self._shard(cart.key)
+            with shard.lock:
+                shard.carts[cart.key] = cart
+
+    def get(self, id: str) -> Optional[Cart]:
+        return self._get(cart_key(id))
+
+    def get_many(self, ids: Sequence[str]) -> List[Optional[Cart]]:
+        return [self._get(cart_key(id)) for id in ids]
+
+    def update(self, id: str, mutation: CartMutation) -> Optional[Cart]:
+        key = cart_key(id)
+        if key is None:
+            return None
+
+        shard = self._shard(key)
+        with shard.lock:
+            cart = shard.carts.get(key)
+            if cart is not None:
+                mutation(cart)
+
+        return cart
+
+    def pop(self, id: str) -> Optional[Cart]:
+        key = cart_key(id)
+        if key is None:
+            return None
+
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.carts.pop(key, None)
+
+    def values(self) -> Iterator[Cart]:
+        for shard in self._shards:
+            with shard.lock:
+                carts = list(shard.carts.values())
+            yield from carts
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.carts.clear()
+
+    def __len__(self) -> int:
+        return sum(len(shard.carts) for shard in self._shards)
+
+    def estimated_bytes(self, sample: int = 100) -> int:
+        """
+        Estimates the memory used by the carts from the average size of a few
+        of them, without going through all the carts.
+
+        :param sample: Max number of carts measured.
+        :return: Estimated bytes.
+        """
+        sizes: List[int] = []
+        for shard in self._shards:
+            with shard.lock:
+                carts = list(itertools.islice(shard.carts.values(), sample - len(sizes)))
+            sizes.extend(
+                sys.getsizeof(cart)
+                + sys.getsizeof(cart.key)
+                + sys.getsizeof(cart.lines)
+                + sys.getsizeof(cart.counts)
+                + DICT_ENTRY_BYTES
+                for cart in carts
+            )
+            if len(sizes) >= sample:
+                break
+
+        return len(self) * sum(sizes) // len(sizes) if sizes else 0
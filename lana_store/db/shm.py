@@ -0,0 +1,436 @@
+"""
+Shared-memory carts storage. Lets several worker processes forked from the
+same parent share the same carts.
+
+Carts live in a fixed-size, open-addressing hash table inside a
+`multiprocessing.shared_memory` block. Every slot has the layout
+(little-endian)::
+
+    seq (u32) | writer pid (u32) | state (u8) | padding (3 bytes) | UUID (16 bytes)
+    | cart version (u32) | quantity per product (u32 each) | number of products (u32)
+    | product ordinals (`max_lines` bytes)
+
+Readers take no lock: they use the per-slot sequence lock (`seq` is odd while
+a writer is modifying the slot) and retry when the slot changed under them.
+Writers of different slots take different locks (lock striping), while
+inserts and deletes, which modify the probing chains, take the table lock.
+
+Deletes leave no tombstones: the carts after the deleted one in its probing
+chain are shifted back (backward-shift deletion), so chains always end at an
+empty slot and misses stay short under churn. Shifts bump the table
+generation in the header, odd while they run: lookups missing a cart during a
+shift look it up again, as it may have moved.
+
+A writer killed while writing a slot leaves its sequence odd and its lock
+taken. Readers only spin on a slot for a while, then wait on its lock, every
+`WRITER_TIMEOUT_SECONDS` checking whether the process of the writer (its pid
+is in the slot) still exists. Slow writers are waited for, while the slots of
+dead ones are unlocked keeping what was written. The processes of the writers
+must be reaped (e.g. by the parent of the workers) to be found dead.
+"""
+import os
+import struct
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.synchronize import Lock
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from lana_store.db.base import CartMutation, StoreFullError
+from lana_store.models.cart import Cart, cart_key
+from lana_store.models.product import PRODUCT_CODES
+
+
+EMPTY, USED = 0, 1
+
+#: Spins on a slot being written before waiting on its lock.
+READ_SPINS = 1000
+#: Time between checks of whether the writer of a slot died (seconds).
+WRITER_TIMEOUT_SECONDS = 1.0
+#: Lookups retried during shifts before taking the table lock.
+FIND_RETRIES = 100
+
+#: Number of carts and table generation.
+_HEADER = struct.Struct("<QQ")
+_SEQ = struct.Struct("<I")
+#: Sequence and pid of the last writer of a slot.
+_OWNER = struct.Struct("<II")
+_SLOT_HEAD = struct.Struct(f"<IIB3x16sI{len(PRODUCT_CODES)}II")
+
+
+def _alive(pid: int) -> bool:
+    """
+    Whether a process exists.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by another user
+        pass
+    return True
+
+
+class SharedMemoryCartStore:
+    """
+    Stores carts in a shared-memory hash table. The store must be created
+    before forking the worker processes so all of them inherit the memory
+    mapping and the locks.
+    """
+
+    def __init__(self, capacity: int = 100_000, max_lines: int = 256, stripes: int = 64) -> None:
+        """
+        Class initialization. Allocates the shared memory block.
+
+        :param capacity: Max number of carts.
+        :param max_lines: Max number of products of a cart.
+        :param stripes: Number of slot locks.
+        """
+        self.capacity = capacity
+        self.max_lines = max_lines
+        self.slot_size = _SLOT_HEAD.size + max_lines
+
+        self._shm = SharedMemory(create=True, size=_HEADER.size + capacity * self.slot_size)
+        self._buf = self._shm.buf
+
+        ctx = get_context("fork")
+        self._table_lock = ctx.Lock()
+        self._stripes = [ctx.Lock() for _ in range(stripes)]
+        # Never held while writing, so never left taken by a dead writer
+        self._recovery_lock = ctx.Lock()
+
+    def close(self) -> None:
+        """
+        Releases the shared memory block (only once all the workers exited).
+        """
+        self._buf.release()
+        self._shm.close()
+        self._shm.unlink()
+
+    def _offset(self, slot: int) -> int:
+        """
+        Position of a slot in the shared memory block.
+        """
+        return _HEADER.size + slot * self.slot_size
+
+    def _home(self, key: bytes) -> int:
+        """
+        First slot of the probing chain of a key.
+        """
+        return int.from_bytes(key[:8], "little") % self.capacity
+
+    def _generation(self) -> int:
+        """
+        Table generation, odd while carts are shifted.
+        """
+        return _HEADER.unpack_from(self._buf)[1]
+
+    def _set_header(self, count: int, generation: int) -> None:
+        """
+        Writes the header. The table lock must be held.
+        """
+        _HEADER.pack_into(self._buf, 0, count, generation)
+
+    def _recover(self, slot: int) -> None:
+        """
+        Waits for the writer of a slot on its lock. When the lock is not released
+        in time and the process of the writer is gone, it died while writing:
+        the slot is unlocked, keeping what was written.
+        """
+        lock = self._stripe(slot)
+        if lock.acquire(timeout=WRITER_TIMEOUT_SECONDS):
+            lock.release()
+            return
+
+        buf, offset = self._buf, self._offset(slot)
+        owner = _OWNER.unpack_from(buf, offset)
+        if not owner[0] & 1 or _alive(owner[1]):
+            return
+
+        with self._recovery_lock:
+            # Recovered by another reader meanwhile
+            if _OWNER.unpack_from(buf, offset) != owner:
+                return
+            _SEQ.pack_into(buf, offset, owner[0] + 1)
+            lock.release()
+
+    def _read(self, slot: int) -> Tuple[int, bytes, bytes, int]:
+        """
+        Reads a slot consistently (sequence lock read side).
+
+        :return: Slot state, UUID bytes, product ordinals and cart version.
+        """
+        buf, offset = self._buf, self._offset(slot)
+        spins = 0
+        while True:
+            seq = _SEQ.unpack_from(buf, offset)[0]
+            if seq & 1:
+                spins += 1
+                if spins >= READ_SPINS:
+                    self._recover(slot)
+                    spins = 0
+                continue
+
+            head = _SLOT_HEAD.unpack_from(buf, offset)
+            start = offset + _SLOT_HEAD.size
+            end = start + head[-1]
+            state, key, version, lines = head[2], head[3], head[4], bytes(buf[start:end])
+
+            if _SEQ.unpack_from(buf, offset)[0] == seq:
+                return state, key, lines, version
+
+    def _write(self, slot: int, state: int, key: bytes, lines: bytes, version: int = 0) -> None:
+        """
+        Writes a slot (sequence lock write side). The lock of the slot must be held.
+        """
+        if len(lines) > self.max_lines:
+            raise StoreFullError(f"Carts cannot have more than {self.max_lines} products")
+
+        buf, offset = self._buf, self._offset(slot)
+        seq = _SEQ.unpack_from(buf, offset)[0]
+
+        counts = [0] * len(PRODUCT_CODES)
+        for ordinal in lines:
+            counts[ordinal] += 1
+
+        pid = os.getpid()
+        # The pid first, so readers never see the slot odd with another writer's pid
+        _SEQ.pack_into(buf, offset + _SEQ.size, pid)
+        _SEQ.pack_into(buf, offset, seq + 1)
+        _SLOT_HEAD.pack_into(buf, offset, seq + 1, pid, state, key, version, *counts, len(lines))
+        start = offset + _SLOT_HEAD.size
+        end = start + len(lines)
+        buf[start:end] = memoryview(lines)
+        _SEQ.pack_into(buf, offset, seq + 2)
+
+    def _probe(self, key: bytes) -> Optional[int]:
+        """
+        Looks up the slot of a key along its probing chain.
+
+        :return: Slot index (if any).
+        """
+        slot = self._home(key)
+        for _ in range(self.capacity):
+            state, slot_key, _lines, _version = self._read(slot)
+            if state == EMPTY:
+                return None
+            if slot_key == key:
+                return slot
+            slot = (slot + 1) % self.capacity
+
+        return None
+
+    def _find(self, key: bytes) -> Optional[int]:
+        """
+        Looks up the slot of a key, again when the carts were shifted meanwhile.
+
+        :return: Slot index (if any).
+        """
+        for _ in range(FIND_RETRIES):
+            generation = self._generation()
+            slot = self._probe(key)
+            if slot is not None or (not generation & 1 and self._generation() == generation):
+                return slot
+
+        # Shifts keep coming (or the deleter died): looks it up between them
+        acquired = self._table_lock.acquire(timeout=WRITER_TIMEOUT_SECONDS)
+        try:
+            return self._probe(key)
+        finally:
+            if acquired:
+                self._table_lock.release()
+
+    def _move(self, source: int, target: int) -> None:
+        """
+        Moves a cart to an empty slot. The table lock must be held.
+        """
+        stripes = sorted({source % len(self._stripes), target % len(self._stripes)})
+        locks = [self._stripes[stripe] for stripe in stripes]
+        for lock in locks:
+            lock.acquire()
+        try:
+            state, key, lines, version = self._read(source)
+            self._write(target, state, key, lines, version)
+            self._write(source, EMPTY, bytes(16), b"")
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _shift_back(self, hole: int) -> None:
+        """
+        Fills an emptied slot with the next carts of the probing chain that can
+        move back (backward-shift deletion). The table lock must be held.
+
+        :param hole: Emptied slot.
+        """
+        slot = hole
+        for _ in range(self.capacity - 1):
+            slot = (slot + 1) % self.capacity
+            state, key, _lines, _version = self._read(slot)
+            if state == EMPTY:
+                return
+
+            # Carts stay after their home slot: the ones with their home in
+            # (hole, slot] cannot move to the hole
+            home = self._home(key)
+            if (hole < home <= slot) if hole <= slot else (home > hole or home <= slot):
+                continue
+
+            self._move(slot, hole)
+            hole = slot
+
+    def _stripe(self, slot: int) -> Lock:
+        """
+        Lock of a slot.
+        """
+        return self._stripes[slot % len(self._stripes)]
+
+    def _get_by_key(self, key: Optional[bytes]) -> Optional[Cart]:
+        """
+        Fetches a cart by its key.
+        """
+        if key is None:
+            return None
+
+        slot = self._find(key)
+        while slot is not None:
+            state, slot_key, lines, version = self._read(slot)
+            if state == USED and slot_key == key:
+                return Cart.from_lines(key, lines, version)
+            # The slot was reused meanwhile, look it up again
+            slot = self._find(key)
+
+        return None
+
+    def add(self, cart: Cart) -> None:
+        key, lines, version = cart.key, bytes(cart.lines), cart.version
+        if len(lines) > self.max_lines:
+            raise StoreFullError(f"Carts cannot have more than {self.max_lines} products")
+
+        with self._table_lock:
+            slot = self._find(key)
+            if slot is None:
+                slot = self._home(key)
+                for _ in range(self.capacity):
+                    if self._read(slot)[0] != USED:
+                        break
+                    slot = (slot + 1) % self.capacity
+                else:
+                    raise StoreFullError(f"Carts store is full ({self.capacity} carts)")
+
+                count, generation = _HEADER.unpack_from(self._buf)
+                self._set_header(count + 1, generation)
+
+            with self._stripe(slot):
+                self._write(slot, USED, key, lines, version)
+
+    def add_many(self, carts: Iterable[Cart]) -> None:
+        for cart in carts:
+            self.add(cart)
+
+    def get(self, id: str) -> Optional[Cart]:
+        return self._get_by_key(cart_key(id))
+
+    def get_many(self, ids: Sequence[str]) -> List[Optional[Cart]]:
+        return [self._get_by_key(cart_key(id)) for id in ids]
+
+    def update(self, id: str, mutation: CartMutation) -> Optional[Cart]:
+        key = cart_key(id)
+        if key is None:
+            return None
+
+        while True:
+            slot = self._find(key)
+            if slot is None:
+                return None
+
+            with self._stripe(slot):
+                state, slot_key, lines, version = self._read(slot)
+                if state != USED or slot_key != key:
+                    # Removed or moved meanwhile
+                    continue
+
+                cart = Cart.from_lines(key, lines, version)
+                mutation(cart)
+                self._write(slot, USED, key, bytes(cart.lines), cart.version)
+
+            return cart
+
+    def pop(self, id: str) -> Optional[Cart]:
+        key = cart_key(id)
+        if key is None:
+            return None
+
+        with self._table_lock:
+            slot = self._find(key)
+            if slot is None:
+                return None
+
+            count, generation = _HEADER.unpack_from(self._buf)
+            self._set_header(count, generation + 1)
+            try:
+                with self._stripe(slot):
+                    _state, _key, lines, version = self._read(slot)
+                    self._write(slot, EMPTY, bytes(16), b"")
+                self._shift_back(slot)
+            finally:
+                self._set_header(count - 1, generation + 2)
+
+        return Cart.from_lines(key, lines, version)
+
+    def _cluster(self, start: int) -> Tuple[List[Tuple[bytes, bytes, int]], int]:
+        """
+        Reads the carts of a run of used slots, again when carts were shifted
+        meanwhile (carts are only shifted within their run).
+
+        :param start: First slot of the run.
+        :return: Key, product ordinals and version of the carts, and the empty
+            slot ending the run.
+        """
+        while True:
+            generation = self._generation()
+            carts = []
+            slot = start
+            for _ in range(self.capacity):
+                state, key, lines, version = self._read(slot)
+                if state == EMPTY:
+                    break
+                carts.append((key, lines, version))
+                slot = (slot + 1) % self.capacity
+
+            if not generation & 1 and self._generation() == generation:
+                return carts, slot
+
+    def values(self) -> Iterator[Cart]:
+        # Starts at an empty slot so no run is split
+        start = 0
+        for slot in range(self.capacity):
+            if self._read(slot)[0] == EMPTY:
+                start = slot
+                break
+
+        slot, covered = start, 0
+        while covered < self.capacity:
+            step = 1
+            if self._read(slot)[0] != EMPTY:
+                carts, end = self._cluster(slot)
+                for key, lines, version in carts:
+                    yield Cart.from_lines(key, lines, version)
+                # A run over the whole table ends where it starts
+                step = (end - slot) % self.capacity or self.capacity
+            covered += step
+            slot = (slot + step) % self.capacity
+
+    def clear(self) -> None:
+        with self._table_lock:
+            count, generation = _HEADER.unpack_from(self._buf)
+            self._set_header(count, generation + 1)
+            for slot in range(self.capacity):
+                if self._read(slot)[0] != EMPTY:
+                    with self._stripe(slot):
+                        self._write(slot, EMPTY, bytes(16), b"")
+
+            self._set_header(0, generation + 2)
+
+    def __len__(self) -> int:
+        return _HEADER.unpack_from(self._buf)[0]
@@ -0,0 +1,114 @@
+"""
+Compact binary snapshots of the carts store.
+
+Layout (little-endian)::
+
+    header:  magic "LCSN" | format version (u16) | last journal seq (u64) | carts (u64)
+    cart:    UUID (16 bytes) | cart version (u32) | number of products (u32)
+             | product ordinals (1 byte each)
+
+Product ordinals are the positions of the product codes in
+:data:`lana_store.models.product.PRODUCT_CODES`. Snapshots of format version 1
+(without the cart versions) are still readable.
+"""
+import os
+import struct
+from typing import Iterable, Iterator, NamedTuple, Tuple, Union
+
+from lana_store.models.cart import Cart
+
+
+MAGIC = b"LCSN"
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<4sHQQ")
+_CART = struct.Struct("<16sII")
+_CART_V1 = struct.Struct("<16sI")
+
+
+class SnapshotError(Exception):
+    """
+    The snapshot file is corrupted or has an unsupported format.
+    """
+
+
+class SnapshotCart(NamedTuple):
+    """
+    Copy of the parts of a cart written to snapshots, which does not change
+    along with the cart.
+    """
+
+    key: bytes
+    version: int
+    lines: bytes
+
+
+def write_snapshot(path: str, carts: Iterable[Union[Cart, SnapshotCart]], seq: int) -> int:
+    """
+    Writes a snapshot atomically: the file is only replaced once the new one
+    is fully written and synced to disk.
+
+    :param path: Snapshot file path.
+    :param carts: Carts to dump.
+    :param seq: Sequence number of the last journal record included.
+    :return: Number of carts written.
+    """
+    tmp_path = f"{path}.tmp"
+    count = 0
+
+    with open(tmp_path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, seq, 0))
+        for cart in carts:
+            file.write(_CART.pack(cart.key, cart.version, len(cart.lines)))
+            file.write(cart.lines)
+            count += 1
+
+        # The number of carts is only known at the end
+        file.seek(0)
+        file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, seq, count))
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(tmp_path, path)
+
+    return count
+
+
+def read_snapshot(path: str) -> Tuple[int, Iterator[Tuple[bytes, int, bytes]]]:
+    """
+    Reads a snapshot.
+
+    :param path: Snapshot file path.
+    :raises SnapshotError: When the file is invalid or truncated.
+    :return: Sequence number of the last journal record included and an
+        iterator of (UUID bytes, cart version, product ordinals) per cart.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+
+    try:
+        magic, version, seq, count = _HEADER.unpack_from(data)
+    except struct.error:
+        raise SnapshotError(f"Invalid snapshot header in '{path}'")
+
+    if magic != MAGIC or version not in (1, FORMAT_VERSION):
+        raise SnapshotError(f"Unsupported snapshot format in '{path}'")
+
+    def carts() -> Iterator[Tuple[bytes, int, bytes]]:
+        offset = _HEADER.size
+        cart_struct = _CART if version == FORMAT_VERSION else _CART_V1
+        unpack_cart, cart_size = cart_struct.unpack_from, cart_struct.size
+        try:
+            for _ in range(count):
+                if version == FORMAT_VERSION:
+                    key, cart_version, lines = unpack_cart(data, offset)
+                else:
+                    (key, lines), cart_version = unpack_cart(data, offset), 0
+                start, offset = offset + cart_size, offset + cart_size + lines
+                if offset > len(data):
+                    raise SnapshotError(f"Truncated snapshot '{path}'")
+                yield key, cart_version, data[start:offset]
+        except struct.error:
+            raise SnapshotError(f"Truncated snapshot '{path}'")
+
+    return seq, carts()
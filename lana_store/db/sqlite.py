@@ -0,0 +1,497 @@
+"""
+SQLite carts storage. Lets several server processes share the same carts.
+
+Carts live in two tables: `carts`, with one quantity column per product, and
+`cart_lines` with the products of every cart in the order they were added.
+Carts are loaded from `carts` only (counts, total and version), their lines
+being read on first use (e.g. to list the products in order): totals, entity
+tags and product additions never read `cart_lines`.
+
+Connections are never used across `fork()`: a process forked after the store
+was created (e.g. a worker) opens its own connections, leaving the inherited
+ones untouched.
+"""
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from lana_store.core.metrics import cart_pricing_duration
+from lana_store.core.pricing import price_counts
+from lana_store.db.base import CartMutation
+from lana_store.models.cart import Cart, cart_key
+from lana_store.models.product import PRODUCT_CODES
+
+
+#: Quantity column of every product.
+QUANTITY_COLUMNS = tuple(f"qty_{product.lower()}" for product in PRODUCT_CODES)
+
+#: Number of carts stored per transaction by `add_many`, so other writers are
+#: not blocked for the whole import.
+ADD_MANY_BATCH = 1000
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS carts (
+    id BLOB PRIMARY KEY,
+    {", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in QUANTITY_COLUMNS)},
+    line_count INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cart_lines (
+    cart_id BLOB NOT NULL REFERENCES carts (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    product INTEGER NOT NULL,
+    PRIMARY KEY (cart_id, position)
+) WITHOUT ROWID;
+"""
+
+#: Columns added after the first schema version, created on existing databases.
+MIGRATIONS = {"version": "ALTER TABLE carts ADD COLUMN version INTEGER NOT NULL DEFAULT 0"}
+
+# Statements are module constants so every connection compiles them once and
+# reuses the prepared statement from its cache afterwards.
+SQL_INSERT_CART = "INSERT INTO carts (id) VALUES (?)"
+SQL_INSERT_LINE = "INSERT INTO cart_lines (cart_id, position, product) VALUES (?, ?, ?)"
+SQL_SELECT_CART = (
+    f"SELECT {', '.join(QUANTITY_COLUMNS)}, line_count, version FROM carts WHERE id = ?"
+)
+SQL_SELECT_VERSION_LINES = (
+    "SELECT version, product FROM carts LEFT JOIN cart_lines ON cart_id = id "
+    "WHERE id = ? ORDER BY position"
+)
+SQL_SELECT_ALL_LINES = "SELECT cart_id, product FROM cart_lines ORDER BY cart_id, position"
+SQL_SELECT_ALL_IDS = "SELECT id, version FROM carts ORDER BY id"
+SQL_UPDATE_CART = (
+    f"UPDATE carts SET {', '.join(f'{column} = ?' for column in QUANTITY_COLUMNS)}, "
+    "line_count = ?, version = ? WHERE id = ?"
+)
+SQL_DELETE_LINES_FROM = "DELETE FROM cart_lines WHERE cart_id = ? AND position >= ?"
+SQL_DELETE_CART = "DELETE FROM carts WHERE id = ?"
+SQL_DELETE_ALL = "DELETE FROM carts"
+SQL_COUNT = "SELECT COUNT(*) FROM carts"
+
+
+#: Slot of the lines of `Cart`, bypassing the lazy `SQLiteCart.lines`.
+_LINES = Cart.__dict__["lines"]
+
+
+class SQLiteCart(Cart):
+    """
+    Cart loaded from its row of `carts`. Its lines are read from `cart_lines`
+    on first use, within the transaction it was loaded in while it lasts, and
+    products added before keep apart so adding products never reads them.
+
+    Lines read after the transaction come from the stored cart: when it changed
+    meanwhile the cart takes its new state, and when it was deleted the lines
+    follow the product order.
+    """
+
+    __slots__ = ("_store", "_conn", "_line_count", "_appended", "_stored", "_stored_version")
+
+    _store: "SQLiteCartStore"
+    #: Connection of the transaction the cart was loaded in, while it lasts.
+    _conn: Optional[sqlite3.Connection]
+    #: Number of lines stored.
+    _line_count: int
+    #: Lines added since loaded, while the stored ones are not read.
+    _appended: bytearray
+    #: Lines as stored, `None` until read.
+    _stored: Optional[bytes]
+    #: Version of the cart as stored.
+    _stored_version: int
+
+    @classmethod
+    def from_row(
+        cls, store: "SQLiteCartStore", conn: sqlite3.Connection, key: bytes, row: Sequence[int]
+    ) -> "SQLiteCart":
+        """
+        Builds a cart from its row, counting and pricing it.
+
+        :param store: Store the cart comes from.
+        :param conn: Connection of the running transaction.
+        :param key: Cart key.
+        :param row: Quantity columns, line count and version.
+        :return: The cart.
+        """
+        cart = cls.__new__(cls)
+        counts = array("I", row[: len(PRODUCT_CODES)])
+        start = perf_counter()
+        cart.total = price_counts(counts)
+        cart_pricing_duration.observe(("load",), perf_counter() - start)
+
+        cart.key = key
+        cart.counts = counts
+        cart.version = row[-1]
+        _LINES.__set__(cart, bytearray())
+        cart._store = store
+        cart._conn = conn
+        cart._line_count = row[-2]
+        cart._appended = bytearray()
+        cart._stored = None
+        cart._stored_version = row[-1]
+
+        return cart
+
+    @property  # type: ignore
+    def lines(self) -> bytearray:  # type: ignore
+        if self._stored is None:
+            self._read_lines()
+        return _LINES.__get__(self, Cart)
+
+    @lines.setter
+    def lines(self, lines: bytearray) -> None:
+        if self._stored is None:
+            self._read_lines()
+        _LINES.__set__(self, lines)
+
+    def _read_lines(self) -> None:
+        """
+        Reads the stored lines, followed by the ones added since.
+        """
+        if self._conn is not None:
+            stored = self._store._select_lines(self._conn, self.key)
+        else:
+            # A single statement reads a consistent snapshot on its own
+            with self._store._connection() as conn:
+                stored = self._store._select_lines(conn, self.key)
+
+        if stored is None:
+            lines = bytes(
+                ordinal for ordinal, count in enumerate(self.counts) for _ in range(count)
+            )
+            self._stored = lines
+            _LINES.__set__(self, bytearray(lines))
+        elif stored[1] != self._stored_version:
+            self._stored, self._stored_version = stored
+            self._load(self.key, bytearray(stored[0]), stored[1])
+        else:
+            self._stored = stored[0]
+            _LINES.__set__(self, bytearray(stored[0]) + self._appended)
+        self._appended = bytearray()
+
+    def _add_lines(self, ordinals: bytes) -> None:
+        if self._stored is None:
+            self._appended += ordinals
+        else:
+            super()._add_lines(ordinals)
+
+    def _saved(self) -> None:
+        """
+        Marks the cart as stored, once its changes are written.
+        """
+        if self._stored is None:
+            self._line_count += len(self._appended)
+            self._appended = bytearray()
+        else:
+            self._stored = bytes(self.lines)
+            self._line_count = len(self._stored)
+        self._stored_version = self.version
+
+    def _detach(self) -> None:
+        """
+        Stops reading the lines within the transaction, once it is over.
+        """
+        self._conn = None
+
+
+class SQLiteCartStore:
+    """
+    Stores carts in a SQLite database (WAL mode) through a bounded pool of
+    connections.
+    """
+
+    def __init__(self, path: str, pool_size: int = 8, busy_timeout_ms: int = 5000) -> None:
+        """
+        Class initialization. Creates the schema if needed.
+
+        :param path: Database file path.
+        :param pool_size: Max number of open connections.
+        :param busy_timeout_ms: Time to wait for locks held by other processes.
+        """
+        self.path = path
+        self.pool_size = pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._reset_pool()
+        #: Connections inherited from the parent process, never used nor closed.
+        self._inherited: List[sqlite3.Connection] = []
+
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(carts)")}
+            for column, migration in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(migration)
+        finally:
+            conn.close()
+
+    def _reset_pool(self) -> None:
+        """
+        Starts an empty pool of connections owned by the current process.
+        """
+        self._pid = os.getpid()
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(
+            maxsize=self.pool_size
+        )
+        self._available = threading.BoundedSemaphore(self.pool_size)
+
+    def _after_fork(self) -> None:
+        """
+        Drops the connections of the parent process from the pool. They are
+        kept referenced so they are not closed (finalized) by this process.
+        """
+        while True:
+            try:
+                self._inherited.append(self._pool.get_nowait())
+            except queue.Empty:
+                break
+        self._reset_pool()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Opens a new connection.
+        """
+        conn = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False, cached_statements=64
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrows a connection from the pool, blocking while all are in use.
+        """
+        if self._pid != os.getpid():
+            self._after_fork()
+
+        # Returned to the pool it was borrowed from, even if reset meanwhile
+        pool, available = self._pool, self._available
+        available.acquire()
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                # Left in a transaction that could not be ended: never reused
+                conn.close()
+            else:
+                pool.put_nowait(conn)
+            available.release()
+
+    @contextmanager
+    def _transaction(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Borrows a connection and runs a transaction on it.
+
+        :param immediate: `True` to take the write lock from the start.
+        """
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                # Also when the commit fails (e.g. the database is busy)
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def _load(self, conn: sqlite3.Connection, key: bytes) -> Optional[SQLiteCart]:
+        """
+        Loads a cart from its row only (see `SQLiteCart`).
+
+        :param conn: Connection in use.
+        :param key: Cart primary key.
+        :return: The cart (if any).
+        """
+        row = conn.execute(SQL_SELECT_CART, (key,)).fetchone()
+        if row is None:
+            return None
+
+        return SQLiteCart.from_row(self, conn, key, row)
+
+    @staticmethod
+    def _select_lines(conn: sqlite3.Connection, key: bytes) -> Optional[Tuple[bytes, int]]:
+        """
+        Reads the lines of a cart.
+
+        :param conn: Connection in use.
+        :param key: Cart primary key.
+        :return: Product ordinals and cart version (if the cart exists).
+        """
+        rows = conn.execute(SQL_SELECT_VERSION_LINES, (key,)).fetchall()
+        if not rows:
+            return None
+
+        return bytes(row[1] for row in rows if row[1] is not None), rows[0][0]
+
+    def close(self) -> None:
+        """
+        Closes all the pooled connections.
+        """
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def add(self, cart: Cart) -> None:
+        key = cart.key
+        with self._transaction(immediate=True) as conn:
+            conn.execute(SQL_INSERT_CART, (key,))
+            self._save(conn, key, b"", cart)
+
+    def add_many(self, carts: Iterable[Cart]) -> None:
+        iterator = iter(carts)
+        while True:
+            batch = list(itertools.islice(iterator, ADD_MANY_BATCH))
+            if not batch:
+                break
+
+            with self._transaction(immediate=True) as conn:
+                for cart in batch:
+                    conn.execute(SQL_DELETE_CART, (cart.key,))
+                    conn.execute(SQL_INSERT_CART, (cart.key,))
+                    self._save(conn, cart.key, b"", cart)
+
+    def get(self, id: str) -> Optional[Cart]:
+        key = cart_key(id)
+        if key is None:
+            return None
+
+        with self._transaction() as conn:
+            cart = self._load(conn, key)
+
+        if cart is not None:
+            cart._detach()
+        return cart
+
+    def get_many(self, ids: Sequence[str]) -> List[Optional[Cart]]:
+        with self._transaction() as conn:
+            carts = [
+                self._load(conn, key) if key is not None else None for key in map(cart_key, ids)
+            ]
+
+        for cart in carts:
+            if cart is not None:
+                cart._detach()
+        return carts  # type: ignore
+
+    @staticmethod
+    def _save(
+        conn: sqlite3.Connection, key: bytes, old_lines: bytes, cart: Cart
+    ) -> None:
+        """
+        Writes the changes of a cart: only the lines after the common prefix of
+        the old and new products are rewritten.
+
+        :param conn: Connection in use.
+        :param key: Cart primary key.
+        :param old_lines: Product ordinals stored so far.
+        :param cart: Cart with the new products.
+        """
+        lines = cart.lines
+        common = 0
+        for old, new in zip(old_lines, lines):
+            if old != new:
+                break
+            common += 1
+
+        if common < len(old_lines):
+            conn.execute(SQL_DELETE_LINES_FROM, (key, common))
+        if common < len(lines):
+            conn.executemany(
+                SQL_INSERT_LINE,
+                ((key, position, lines[position]) for position in range(common, len(lines))),
+            )
+
+        conn.execute(SQL_UPDATE_CART, (*cart.counts, len(lines), cart.version, key))
+
+    @classmethod
+    def _save_loaded(cls, conn: sqlite3.Connection, cart: SQLiteCart) -> None:
+        """
+        Writes the changes of a loaded cart: when its lines were not read, the
+        added ones are inserted after the stored ones.
+
+        :param conn: Connection in use.
+        :param cart: Changed cart.
+        """
+        if cart._stored is not None:
+            cls._save(conn, cart.key, cart._stored, cart)
+        else:
+            position = cart._line_count
+            conn.executemany(
+                SQL_INSERT_LINE,
+                ((cart.key, position + i, ordinal) for i, ordinal in enumerate(cart._appended)),
+            )
+            conn.execute(
+                SQL_UPDATE_CART,
+                (*cart.counts, position + len(cart._appended), cart.version, cart.key),
+            )
+
+        cart._saved()
+
+    def update(self, id: str, mutation: CartMutation) -> Optional[Cart]:
+        key = cart_key(id)
+        if key is None:
+            return None
+
+        with self._transaction(immediate=True) as conn:
+            cart = self._load(conn, key)
+            if cart is None:
+                return None
+
+            mutation(cart)
+            self._save_loaded(conn, cart)
+
+        cart._detach()
+        return cart
+
+    def pop(self, id: str) -> Optional[Cart]:
+        key = cart_key(id)
+        if key is None:
+            return None
+
+        with self._transaction(immediate=True) as conn:
+            cart = self._load(conn, key)
+            if cart is not None:
+                # Read before they are gone
+                cart.lines
+                conn.execute(SQL_DELETE_CART, (key,))
+
+        if cart is not None:
+            cart._detach()
+        return cart
+
+    def values(self) -> Iterator[Cart]:
+        with self._transaction() as conn:
+            lines: Dict[bytes, bytearray] = {}
+            for key, product in conn.execute(SQL_SELECT_ALL_LINES):
+                lines.setdefault(key, bytearray()).append(product)
+            keys: List[Tuple[bytes, int]] = conn.execute(SQL_SELECT_ALL_IDS).fetchall()
+
+        for key, version in keys:
+            yield Cart.from_lines(key, lines.get(key, b""), version)
+
+    def clear(self) -> None:
+        with self._transaction(immediate=True) as conn:
+            conn.execute(SQL_DELETE_ALL)
+
+    def __len__(self) -> int:
+        with self._connection() as conn:
+            return conn.execute(SQL_COUNT).fetchone()[0]
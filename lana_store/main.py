@@ -1,14 +1,37 @@
 """
 Application's main entrypoint.
 """
-from fastapi import FastAPI
+import asyncio
+import functools
+import logging
+from typing import Iterator, Optional, Tuple
+
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
 
+import lana_store
+from lana_store import crud
+from lana_store.api.middleware import MetricsMiddleware, ProfilingMiddleware
 from lana_store.api.v1.api import api_router
+from lana_store.core import metrics
 from lana_store.core.config import settings
+from lana_store.db import CartJournal, ShardedCartStore, StoreFullError
+from lana_store.openapi import encode_schema
+
+
+logger = logging.getLogger(__name__)
 
+#: Path of the OpenAPI schema.
+OPENAPI_URL = f"{settings.API_V1_STR}/openapi.json"
 
-app = FastAPI(title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json")
+app = FastAPI(title=settings.PROJECT_NAME, openapi_url=OPENAPI_URL)
+
+# The default schema route encodes the schema on every request, replaced by
+# `get_openapi` (below) that serves it as cached bytes
+app.router.routes = [
+    route for route in app.router.routes if getattr(route, "path", None) != OPENAPI_URL
+]
 
 # Set all CORS enabled origins
 if settings.CORS_ORIGINS:
@@ -20,5 +43,195 @@ if settings.CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+if settings.PROFILING_ENABLED or settings.PROFILING_HEADER:
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=settings.PROFILING_DIRECTORY,
+        sample_rate=settings.PROFILING_SAMPLE_RATE if settings.PROFILING_ENABLED else 0.0,
+        header=settings.PROFILING_HEADER,
+        interval=settings.PROFILING_INTERVAL_SECONDS,
+    )
+
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+
+def estimated_carts_bytes() -> Optional[int]:
+    """
+    Estimated memory of the carts (only for the in-memory store).
+    """
+    if isinstance(lana_store.carts_db, ShardedCartStore):
+        return lana_store.carts_db.estimated_bytes()
+    return None
+
+
+metrics.registry.gauge("lana_carts", "Carts stored.", lambda: len(lana_store.carts_db))
+metrics.registry.gauge(
+    "lana_carts_estimated_bytes", "Estimated memory used by the carts.", estimated_carts_bytes
+)
+metrics.registry.gauge(
+    "lana_analytics_queue_depth",
+    "Cart changes queued for the analytics aggregates.",
+    lambda: lana_store.analytics.pending if lana_store.analytics else None,
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Exposes the metrics in the Prometheus text format.
+    """
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("Not Found", status_code=status.HTTP_404_NOT_FOUND)
+
+    return PlainTextResponse(
+        metrics.registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def openapi_schema() -> bytes:
+    """
+    OpenAPI schema of the app: read from `OPENAPI_SCHEMA_PATH` when set,
+    generated otherwise. Loaded only once.
+    """
+    if settings.OPENAPI_SCHEMA_PATH:
+        with open(settings.OPENAPI_SCHEMA_PATH, "rb") as file:
+            return file.read()
+
+    return encode_schema(app)
+
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def get_openapi() -> Response:
+    """
+    Serves the OpenAPI schema.
+    """
+    return Response(openapi_schema(), media_type="application/json")
+
+
+@app.exception_handler(StoreFullError)
+async def store_full_handler(request: Request, exc: StoreFullError) -> JSONResponse:
+    """
+    Reports that the carts store ran out of room.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_507_INSUFFICIENT_STORAGE, content={"detail": str(exc)}
+    )
+
+
+@app.on_event("startup")
+def load_openapi_schema() -> None:
+    """
+    Loads the precomputed OpenAPI schema (when there is one), so a missing
+    schema file stops the server from starting.
+    """
+    if settings.OPENAPI_SCHEMA_PATH:
+        openapi_schema()
+
+
+@app.on_event("startup")
+def open_journal() -> None:
+    """
+    Recovers the carts from disk and starts logging changes (when persistence
+    is enabled).
+    """
+    if settings.WAL_DIRECTORY:
+        lana_store.journal = CartJournal(
+            lana_store.carts_db,
+            settings.WAL_DIRECTORY,
+            fsync=settings.WAL_FSYNC,
+            sync_interval_ms=settings.WAL_SYNC_INTERVAL_MS,
+            snapshot_every=settings.WAL_SNAPSHOT_EVERY,
+        )
+        lana_store.journal.open()
+
+
+async def reap_expired_carts() -> None:
+    """
+    Periodically deletes the carts that expired.
+    """
+    while True:
+        await asyncio.sleep(settings.CART_REAPER_INTERVAL_SECONDS)
+        try:
+            await crud.run_change(crud.expire_carts)
+        except Exception:
+            logger.exception("Failed to delete expired carts")
+
+
+@app.on_event("startup")
+def start_expiry() -> None:
+    """
+    Tracks the carts already stored and starts the reaper of expired carts
+    (when carts expire).
+    """
+    if lana_store.expiry is None:
+        return
+
+    for cart in lana_store.carts_db.values():
+        lana_store.expiry.touch(cart.key)
+
+    if lana_store.expiry.ttl is not None:
+        app.state.reaper = asyncio.get_event_loop().create_task(reap_expired_carts())
+
+
+@app.on_event("startup")
+def build_index() -> None:
+    """
+    Indexes the carts already stored (when the indexes are enabled), as
+    created at startup.
+    """
+    if lana_store.index is None:
+        return
+
+    for cart in lana_store.carts_db.values():
+        lana_store.index.add(cart.key, cart.counts)
+
+
+@app.on_event("startup")
+def start_analytics() -> None:
+    """
+    Adds the carts already stored to the analytics aggregates and starts their
+    consumer of cart changes (when the analytics are enabled), rebuilding the
+    aggregates from the stored carts when changes are dropped.
+    """
+    if lana_store.analytics is None:
+        return
+
+    def stored_counts() -> Iterator[Tuple[int, ...]]:
+        return (tuple(cart.counts) for cart in lana_store.carts_db.values())
+
+    lana_store.analytics.load(stored_counts())
+    lana_store.analytics.start(stored_counts)
+
+
+@app.on_event("shutdown")
+def stop_analytics() -> None:
+    """
+    Stops the consumer of cart changes of the analytics.
+    """
+    if lana_store.analytics is not None:
+        lana_store.analytics.stop()
+
+
+@app.on_event("shutdown")
+def stop_expiry() -> None:
+    """
+    Stops the reaper of expired carts.
+    """
+    reaper = getattr(app.state, "reaper", None)
+    if reaper:
+        reaper.cancel()
+
+
+@app.on_event("shutdown")
+def close_journal() -> None:
+    """
+    Syncs and closes the carts journal.
+    """
+    if lana_store.journal:
+        lana_store.journal.close()
+        lana_store.journal = None
@@ -2,49 +2,239 @@
 Definition of Cart for in-memory storage.
 """
 import uuid
-from collections import Counter
-from typing import List
+from array import array
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from pydantic import BaseModel, Field, UUID4
+from lana_store.core.metrics import cart_pricing_duration
+from lana_store.core.pricing import price_counts, pricers_by_ordinal
+from lana_store.models.product import PRODUCT_CODES, PRODUCT_ORDINALS, ProductCodes
 
-from lana_store.core.config import settings
-from lana_store.models.product import ProductCodes
 
+def cart_key(id: str) -> Optional[bytes]:
+    """
+    Converts a cart Id into the 16-byte key carts are stored with.
+
+    :param id: Cart Id (UUID string).
+    :return: The key, `None` for invalid Ids.
+    """
+    try:
+        return uuid.UUID(id).bytes
+    except ValueError:
+        return None
+
+
+#: Single-byte line of every product ordinal.
+_ORDINAL_BYTES = [bytes((ordinal,)) for ordinal in range(len(PRODUCT_CODES))]
+
+
+class NotEnoughProductsError(Exception):
+    """
+    More units of a product were removed than the cart has.
+    """
+
+
+class VersionConflictError(Exception):
+    """
+    The cart changed since the version a conditional change expected.
+    """
+
+    def __init__(self, version: int) -> None:
+        """
+        Class initialization.
 
-class Cart(BaseModel):
+        :param version: Current version of the cart.
+        """
+        super().__init__(f"The cart is at version {version}")
+        self.version = version
+
+
+class Cart:
     """
-    Representation of a shopping cart for the database.
+    Compact representation of a shopping cart for the database. Products are
+    kept as ordinals of :data:`lana_store.models.product.PRODUCT_CODES` (1 byte
+    each) along with the number of units of each product, the cached total and
+    a version number bumped on every change.
+    The API (de)serialization is done by the schemes of
+    :mod:`lana_store.schemas.cart`.
     """
 
-    #: UUIDv4 that uniquely identifies the Cart.
-    id: UUID4 = Field(default_factory=uuid.uuid4)
-    #: List of checked-out products.
-    products: List[ProductCodes] = []
+    __slots__ = ("key", "lines", "counts", "total", "version")
+
+    #: 16-byte UUIDv4 that uniquely identifies the Cart.
+    key: bytes
+    #: Ordinals of the checked-out products, in the order they were added.
+    lines: bytearray
+    #: Number of units of each product, indexed by product ordinal.
+    counts: "array[int]"
+    #: Total value of products in the cart after discounts with the
+    #: money-as-integer format. Kept up to date on every change.
+    total: int
+    #: Number of changes of the cart (monotonically increasing).
+    version: int
+
+    def __init__(
+        self, id: Optional[uuid.UUID] = None, products: Iterable[ProductCodes] = ()
+    ) -> None:
+        """
+        Class initialization.
+
+        :param id: Cart Id, a random UUIDv4 by default.
+        :param products: Initial products.
+        """
+        self._load((id or uuid.uuid4()).bytes, bytearray(PRODUCT_ORDINALS[p] for p in products))
+
+    def _load(self, key: bytes, lines: bytearray, version: int = 0) -> None:
+        """
+        Sets the key and products, counting and pricing them.
+
+        :param key: Cart key.
+        :param lines: Product ordinals.
+        :param version: Cart version.
+        """
+        counts = array("I", bytes(4 * len(PRODUCT_CODES)))
+        for ordinal in lines:
+            counts[ordinal] += 1
+
+        start = perf_counter()
+        self.total = price_counts(counts)
+        cart_pricing_duration.observe(("load",), perf_counter() - start)
+
+        self.key = key
+        self.lines = lines
+        self.counts = counts
+        self.version = version
+
+    @classmethod
+    def from_lines(cls, key: bytes, lines: bytes, version: int = 0) -> "Cart":
+        """
+        Builds a cart from its stored representation (e.g. loaded from disk).
+
+        :param key: Cart key.
+        :param lines: Product ordinals.
+        :param version: Cart version.
+        :return: The cart.
+        """
+        cart = cls.__new__(cls)
+        cart._load(key, bytearray(lines), version)
+
+        return cart
+
+    @property
+    def id(self) -> uuid.UUID:
+        """
+        UUIDv4 that uniquely identifies the Cart.
+        """
+        return uuid.UUID(bytes=self.key)
 
     @property
-    def total(self) -> int:
+    def products(self) -> List[ProductCodes]:
+        """
+        List of checked-out products, in the order they were added.
+        """
+        return [PRODUCT_CODES[ordinal] for ordinal in self.lines]
+
+    @property
+    def quantities(self) -> Dict[ProductCodes, int]:
+        """
+        Number of units of each product in the cart.
+        """
+        return {PRODUCT_CODES[ordinal]: count for ordinal, count in enumerate(self.counts) if count}
+
+    def _add_lines(self, ordinals: bytes) -> None:
         """
-        Calculates the cart's `total` amount of money. Applies the correspondent
-        promotional discounts over Pens and T-Shirts (if any).
+        Appends product ordinals, without re-counting or re-pricing them.
 
-        :return: Total value of products in the cart after discounts with the
-            money-as-integer format.
+        :param ordinals: Product ordinals.
         """
-        p_counter = Counter(self.products)
+        self.lines.extend(ordinals)
 
-        total = 0
-        for product, count in p_counter.items():
-            if product == "PEN":
-                total += (count // 2) * settings.PRODUCT_TABLE[product]["price"]
-                total += settings.PRODUCT_TABLE[product]["price"] if count % 2 != 0 else 0
+    def add_product(self, product: ProductCodes) -> None:
+        """
+        Adds a product to the cart. Only the subtotal of the given product is
+        re-priced.
+
+        :param product: Product code to be added.
+        """
+        ordinal = PRODUCT_ORDINALS[product]
+        count = self.counts[ordinal]
+        pricer = pricers_by_ordinal[ordinal]
+
+        self._add_lines(_ORDINAL_BYTES[ordinal])
+        self.counts[ordinal] = count + 1
+        start = perf_counter()
+        self.total += pricer(count + 1) - pricer(count)
+        cart_pricing_duration.observe(("add_product",), perf_counter() - start)
+        self.version += 1
+
+    def update_products(
+        self,
+        add: Iterable[Tuple[ProductCodes, int]] = (),
+        remove: Iterable[Tuple[ProductCodes, int]] = (),
+    ) -> None:
+        """
+        Adds and removes many units of products at once. Additions go first, and
+        the most recently added units of a product are the ones removed. Only
+        the subtotals of the changed products are re-priced.
+
+        :param add: Product codes and number of units to add.
+        :param remove: Product codes and number of units to remove.
+        :raises NotEnoughProductsError: When removing more units than the cart
+            has (the cart is left untouched).
+        """
+        counts = list(self.counts)
+        added = bytearray()
+        for product, quantity in add:
+            ordinal = PRODUCT_ORDINALS[product]
+            counts[ordinal] += quantity
+            added.extend(bytes((ordinal,)) * quantity)
 
-            elif product == "TSHIRT":
-                if count < 3:
-                    total += settings.PRODUCT_TABLE[product]["price"] * count
+        removed = [0] * len(PRODUCT_CODES)
+        for product, quantity in remove:
+            removed[PRODUCT_ORDINALS[product]] += quantity
+
+        for ordinal, quantity in enumerate(removed):
+            if quantity > counts[ordinal]:
+                raise NotEnoughProductsError(
+                    f"Cannot remove {quantity} units of '{PRODUCT_CODES[ordinal]}', "
+                    f"the cart has {counts[ordinal]}"
+                )
+            counts[ordinal] -= quantity
+
+        self._add_lines(added)
+        if any(removed):
+            kept = bytearray()
+            for ordinal in reversed(self.lines):
+                if removed[ordinal]:
+                    removed[ordinal] -= 1
                 else:
-                    total += int((settings.PRODUCT_TABLE[product]["price"] * count) * (1 - 0.25))
+                    kept.append(ordinal)
+            kept.reverse()
+            self.lines = kept
+
+        start = perf_counter()
+        for ordinal, count in enumerate(counts):
+            old_count = self.counts[ordinal]
+            if count != old_count:
+                pricer = pricers_by_ordinal[ordinal]
+                self.counts[ordinal] = count
+                self.total += pricer(count) - pricer(old_count)
+        cart_pricing_duration.observe(("update_products",), perf_counter() - start)
+        self.version += 1
+
+    def replace(self, other: "Cart") -> None:
+        """
+        Takes the products of another cart with the same Id (e.g. imported), at
+        a version after the ones of both carts.
+
+        :param other: Cart to take the products of.
+        """
+        self._load(self.key, bytearray(other.lines), max(self.version, other.version) + 1)
 
-            else:
-                total += settings.PRODUCT_TABLE[product]["price"] * count
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Cart):
+            return NotImplemented
+        return self.key == other.key and self.lines == other.lines
 
-        return total
+    def __repr__(self) -> str:
+        return f"Cart(id={self.id!r}, products={self.products!r})"
@@ -0,0 +1,43 @@
+"""
+Definition of the pricing rules (promotions) applied over products.
+"""
+from typing import Literal, Union
+
+from typing_extensions import TypedDict
+
+from lana_store.models.product import ProductCodes
+
+
+class BuyXPayYRule(TypedDict):
+    """
+    Promotion where every group of `buy` units of a product costs `pay` units
+    (e.g. 2-for-1).
+    """
+
+    #: Rule discriminator.
+    kind: Literal["BUY_X_PAY_Y"]
+    #: Product code the rule applies to.
+    product: ProductCodes
+    #: Units in a promotional group.
+    buy: int
+    #: Units charged for each promotional group.
+    pay: int
+
+
+class BulkDiscountRule(TypedDict):
+    """
+    Promotion where buying `min_quantity` units or more of a product discounts
+    a `discount` percentage over all of them.
+    """
+
+    #: Rule discriminator.
+    kind: Literal["BULK_DISCOUNT"]
+    #: Product code the rule applies to.
+    product: ProductCodes
+    #: Units required to apply the discount.
+    min_quantity: int
+    #: Percentage discounted from the price.
+    discount: int
+
+
+PricingRule = Union[BuyXPayYRule, BulkDiscountRule]
@@ -2,13 +2,21 @@
 Definition of Product for in-memory storage.
 """
 
-from typing import Literal
+from typing import Dict, get_args, Literal, Tuple
 
 from typing_extensions import TypedDict
 
 
 ProductCodes = Literal["PEN", "TSHIRT", "MUG"]
 
+#: Product codes in their ordinal order.
+PRODUCT_CODES: Tuple[ProductCodes, ...] = get_args(ProductCodes)
+
+#: Product ordinal by product code.
+PRODUCT_ORDINALS: Dict[ProductCodes, int] = {
+    product: ordinal for ordinal, product in enumerate(PRODUCT_CODES)
+}
+
 
 class Product(TypedDict):
     """
@@ -0,0 +1,42 @@
+"""
+Precomputes the OpenAPI schema of the API, so the servers read it from a file
+instead of generating it (see `OPENAPI_SCHEMA_PATH`).
+
+Usage::
+
+    $ python -m lana_store.openapi openapi.json
+"""
+import argparse
+import json
+from typing import Optional, Sequence
+
+from fastapi import FastAPI
+
+
+def encode_schema(app: FastAPI) -> bytes:
+    """
+    Generates the OpenAPI schema of an app, encoded as the default schema route
+    of FastAPI does.
+
+    :param app: Application.
+    :return: JSON document.
+    """
+    return json.dumps(
+        app.openapi(), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Writes the OpenAPI schema of the Lana Store API.")
+    parser.add_argument("path", help="Output file.")
+    args = parser.parse_args(argv)
+
+    # Imported here: the app imports this module
+    from lana_store.main import app
+
+    with open(args.path, "wb") as file:
+        file.write(encode_schema(app))
+
+
+if __name__ == "__main__":
+    main()
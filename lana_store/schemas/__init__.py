@@ -1,4 +1,40 @@
-from .cart import CartCreateOutput, CartOutput, CartUpdateInput, CartUpdateOutput
+from .cart import (
+    CartBatchInput,
+    CartBatchOperation,
+    CartBatchOutput,
+    CartBatchResult,
+    CartCreateOutput,
+    CartImportOutput,
+    CartListOutput,
+    CartOutput,
+    CartProductsInput,
+    CartStatsOutput,
+    CartTotal,
+    CartTotalsInput,
+    CartTotalsOutput,
+    CartUpdateInput,
+    CartUpdateOutput,
+    ProductQuantity,
+    PromotionStats,
+)
 
 
-__all__ = ["CartCreateOutput", "CartOutput", "CartUpdateInput", "CartUpdateOutput"]
+__all__ = [
+    "CartBatchInput",
+    "CartBatchOperation",
+    "CartBatchOutput",
+    "CartBatchResult",
+    "CartCreateOutput",
+    "CartImportOutput",
+    "CartListOutput",
+    "CartOutput",
+    "CartProductsInput",
+    "CartStatsOutput",
+    "CartTotal",
+    "CartTotalsInput",
+    "CartTotalsOutput",
+    "CartUpdateInput",
+    "CartUpdateOutput",
+    "ProductQuantity",
+    "PromotionStats",
+]
@@ -1,9 +1,9 @@
 """
 API (de)serialization schemes for the `Cart` resource.
 """
-from typing import List
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field, UUID4
+from pydantic import BaseModel, Field, root_validator, UUID4
 
 from lana_store.models.product import ProductCodes
 
@@ -16,6 +16,10 @@ class CartBase(BaseModel):
     id: UUID4 = Field(example="e44fd23b-f8a5-4285-8b04-e0334315f26e")
     products: List[ProductCodes] = Field(example=["PEN", "MUG"])
 
+    class Config:
+        # Built from the attributes of `lana_store.models.cart.Cart`
+        orm_mode = True
+
 
 class CartOutput(CartBase):
     """
@@ -33,6 +37,19 @@ class CartCreateOutput(CartBase):
     pass
 
 
+class CartListOutput(BaseModel):
+    """
+    Response scheme of the carts listing endpoint.
+    """
+
+    carts: List[CartOutput]
+    next_cursor: Optional[str] = Field(
+        None,
+        example="MwE8SiC12kGKBuohzXlCuI4xl0hKj0R1",
+        description="Cursor of the next page, `null` on the last one.",
+    )
+
+
 class CartUpdateInput(BaseModel):
     """
     Input scheme of the cart update endpoint.
@@ -47,3 +64,162 @@ class CartUpdateOutput(CartBase):
     """
 
     pass
+
+
+class ProductQuantity(BaseModel):
+    """
+    Number of units of a product.
+    """
+
+    product: ProductCodes = Field(..., example="MUG")
+    quantity: int = Field(..., gt=0, le=1000, example=50)
+
+
+class CartProductsInput(BaseModel):
+    """
+    Input scheme of the cart bulk products update endpoint.
+    """
+
+    add: List[ProductQuantity] = Field([], max_items=100, description="Products to add.")
+    remove: List[ProductQuantity] = Field(
+        [],
+        max_items=100,
+        example=[],
+        description="Products to remove, the most recently added units first.",
+    )
+
+    @root_validator(skip_on_failure=True)
+    def check_not_empty(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Requires products to add or remove, an empty update changing nothing.
+        """
+        if not values["add"] and not values["remove"]:
+            raise ValueError("at least one product to 'add' or 'remove' is required")
+        return values
+
+
+class CartTotalsInput(BaseModel):
+    """
+    Input scheme of the carts totals endpoint.
+    """
+
+    ids: Optional[List[str]] = Field(
+        None,
+        example=["e44fd23b-f8a5-4285-8b04-e0334315f26e"],
+        description="Cart Ids to price, all the carts when missing.",
+    )
+
+
+class CartTotal(BaseModel):
+    """
+    Total of a single cart.
+    """
+
+    id: UUID4 = Field(example="e44fd23b-f8a5-4285-8b04-e0334315f26e")
+    total: str = Field(example="22.05")
+
+
+class CartTotalsOutput(BaseModel):
+    """
+    Response scheme of the carts totals endpoint.
+    """
+
+    totals: List[CartTotal]
+    missing: List[str] = Field(example=["5b1b3a4e-b0bb-4d5b-a9a4-35b5e8a5d7f1"])
+
+
+class CartBatchOperation(BaseModel):
+    """
+    Single operation of a carts batch.
+    """
+
+    op: Literal["create", "get", "delete"] = Field(..., example="get")
+    id: Optional[str] = Field(
+        None,
+        example="e44fd23b-f8a5-4285-8b04-e0334315f26e",
+        description="Cart Id, required by `get` and `delete`.",
+    )
+
+    @root_validator(skip_on_failure=True)
+    def check_id(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Requires the cart Id on operations over existing carts.
+        """
+        if values["op"] != "create" and not values.get("id"):
+            raise ValueError(f"'{values['op']}' operations require the cart 'id'")
+        return values
+
+
+class CartBatchInput(BaseModel):
+    """
+    Input scheme of the carts batch endpoint.
+    """
+
+    operations: List[CartBatchOperation] = Field(..., max_items=1000)
+
+
+class CartBatchResult(BaseModel):
+    """
+    Result of a single operation of a carts batch.
+    """
+
+    status: int = Field(..., example=200, description="HTTP status of the operation.")
+    id: Optional[str] = Field(None, example="e44fd23b-f8a5-4285-8b04-e0334315f26e")
+    cart: Optional[CartOutput] = Field(None, description="Created or fetched cart.")
+    detail: Optional[str] = Field(None, example="Cart not found")
+
+
+class CartBatchOutput(BaseModel):
+    """
+    Response scheme of the carts batch endpoint.
+    """
+
+    results: List[CartBatchResult]
+
+
+class CartImportOutput(BaseModel):
+    """
+    Response scheme of the carts import endpoint.
+    """
+
+    imported: int = Field(..., example=1000, description="Number of imported carts.")
+
+
+class PromotionStats(BaseModel):
+    """
+    Carts getting the promotion of a product.
+    """
+
+    carts: int = Field(..., example=12)
+    share: float = Field(..., example=0.25, description="Fraction of all the carts.")
+
+
+class CartStatsOutput(BaseModel):
+    """
+    Response scheme of the carts stats endpoint.
+    """
+
+    carts: int = Field(..., example=48)
+    units: Dict[ProductCodes, int] = Field(
+        ..., example={"PEN": 60, "TSHIRT": 31, "MUG": 12}, description="Units of every product."
+    )
+    revenue: str = Field(
+        ..., example="1042.50", description="Sum of the cart totals after discounts."
+    )
+    promotions: Dict[ProductCodes, PromotionStats] = Field(
+        ..., description="Carts getting the promotion of every product with pricing rules."
+    )
+    pending_changes: int = Field(
+        ..., example=0, description="Cart changes not added to the stats yet."
+    )
+    dropped_changes: int = Field(
+        ...,
+        example=0,
+        description="Cart changes left out of the stats because they came too fast.",
+    )
+    stale: bool = Field(
+        ...,
+        example=False,
+        description="Whether changes were left out since the stats were last rebuilt from "
+        "the carts, which happens in the background.",
+    )
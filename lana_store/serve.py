@@ -0,0 +1,128 @@
+"""
+Production server: runs N worker processes that share the carts.
+
+Workers are forked from this process after binding the listening socket, so
+all of them accept connections on the same port. With the default in-memory
+store the carts are moved to a shared-memory store created before forking;
+the SQLite store is shared through its database file.
+
+Features keeping their state in every process (see `PER_PROCESS_SETTINGS`)
+would only see the carts accessed through their own worker, so they are
+refused with several workers, or turned off when they are on by default.
+
+Usage::
+
+    $ python -m lana_store.serve --workers 4 --host 0.0.0.0 --port 8000
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+from typing import List, Optional, Sequence
+
+import uvicorn
+
+import lana_store
+from lana_store.core.config import settings
+from lana_store.db.shm import SharedMemoryCartStore
+
+
+#: Settings of the features keeping their state in every process, by feature.
+PER_PROCESS_SETTINGS = {
+    "WAL_DIRECTORY": "the write-ahead log",
+    "CART_TTL_SECONDS": "carts expiration",
+    "MAX_CARTS": "carts eviction",
+    "CARTS_INDEX_ENABLED": "the carts listing",
+    "ANALYTICS_ENABLED": "the carts stats",
+    "EVENTS_ENABLED": "the cart events streams",
+}
+
+
+def per_process_settings() -> List[str]:
+    """
+    Finds the per-process features explicitly enabled (e.g. by env-vars).
+
+    :return: Names of their settings.
+    """
+    enabled = []
+    for name in PER_PROCESS_SETTINGS:
+        value = getattr(settings, name)
+        # Identity checks: a TTL of 0 is enabled
+        if name in settings.__fields_set__ and value is not None and value is not False:
+            enabled.append(name)
+
+    return enabled
+
+
+def disable_per_process_state() -> None:
+    """
+    Turns off the per-process features enabled by default, before forking.
+    """
+    lana_store.index = None
+    lana_store.analytics = None
+    settings.EVENTS_ENABLED = False
+
+
+def run_worker(sock: socket.socket) -> None:
+    """
+    Worker process entrypoint.
+
+    :param sock: Listening socket.
+    """
+    config = uvicorn.Config("lana_store.main:app", log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Runs the Lana Store API with N workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        enabled = per_process_settings()
+        if enabled:
+            features = ", ".join(f"{PER_PROCESS_SETTINGS[name]} ({name})" for name in enabled)
+            parser.error(f"Only supported with a single worker: {features}")
+        disable_per_process_state()
+
+    shm_store = None
+    if settings.CARTS_STORE == "memory":
+        shm_store = SharedMemoryCartStore(
+            settings.SHM_CAPACITY, settings.SHM_MAX_LINES, settings.SHM_LOCK_STRIPES
+        )
+        lana_store.carts_db = shm_store
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.set_inheritable(True)
+
+    ctx = multiprocessing.get_context("fork")
+    workers: List[multiprocessing.process.BaseProcess] = [
+        ctx.Process(target=run_worker, args=(sock,), name=f"lana-store-worker-{index}")
+        for index in range(args.workers)
+    ]
+
+    def stop(signum: int, frame: object) -> None:
+        for worker in workers:
+            worker.terminate()
+
+    for worker in workers:
+        worker.start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        for worker in workers:
+            worker.join()
+    finally:
+        sock.close()
+        if shm_store:
+            shm_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List
+
+from starlette.types import Receive, Scope, Send
+
+from lana_store.api.middleware import ProfilingMiddleware
+
+
+async def slow_app(scope: Scope, receive: Receive, send: Send) -> None:
+    end = time.perf_counter() + 0.02
+    while time.perf_counter() < end:
+        pass
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def request(app: Any, headers: List[Any]) -> None:
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: Dict[str, Any]) -> None:
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/carts/", "headers": headers}
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(app(scope, receive, send))
+    finally:
+        loop.close()
+
+
+def test_profiling_header(tmp_path: Any) -> None:
+    """
+    Test that :class:`lana_store.api.middleware.ProfilingMiddleware` only
+    profiles the requests with the profiling header (no sampling) and writes
+    their collapsed stacks.
+    """
+    app = ProfilingMiddleware(slow_app, str(tmp_path), header="X-Profile")
+
+    request(app, [])
+    assert os.listdir(tmp_path) == []
+
+    request(app, [(b"x-profile", b"1")])
+    (filename,) = os.listdir(tmp_path)
+    assert filename.endswith("-GET-api_v1_carts-200.collapsed")
+
+    with open(tmp_path / filename) as file:
+        lines = file.read().splitlines()
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("slow_app (api/test_middleware.py)" in line for line in lines)
@@ -0,0 +1,84 @@
+import pytest
+import requests
+from _pytest.monkeypatch import MonkeyPatch
+
+from lana_store.core.config import settings
+from lana_store.db import CartStore
+from lana_store.models.cart import Cart
+
+
+EXPORT_URL = f"{settings.API_V1_STR}/admin/carts/export"
+IMPORT_URL = f"{settings.API_V1_STR}/admin/carts/import"
+HEADERS = {"Authorization": "Bearer secret"}
+
+
+@pytest.fixture
+def admin_token(monkeypatch: MonkeyPatch) -> str:
+    """
+    Enables the admin endpoints.
+    """
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    return "secret"
+
+
+def test_admin_disabled(client: requests.Session) -> None:
+    """
+    Test that the admin endpoints are not found without an admin token.
+    """
+    resp = client.get(EXPORT_URL, headers=HEADERS)
+
+    assert resp.status_code == 404
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "Basic secret"])
+def test_admin_unauthorized(client: requests.Session, admin_token: str, authorization: str) -> None:
+    """
+    Test that the admin endpoints require the admin token.
+    """
+    headers = {"Authorization": authorization} if authorization else {}
+
+    resp = client.get(EXPORT_URL, headers=headers)
+
+    assert resp.status_code == 401
+    assert resp.headers["www-authenticate"] == "Bearer"
+
+
+def test_export_import_carts(
+    client: requests.Session, admin_token: str, carts_db: CartStore, cart_with_pen: Cart
+) -> None:
+    """
+    Test that exported carts are imported back, replacing the existing ones.
+    """
+    other = Cart(products=["MUG", "TSHIRT", "MUG"])
+    carts_db.add(other)
+
+    export = client.get(EXPORT_URL, headers=HEADERS)
+
+    assert export.status_code == 200
+    assert export.headers["content-type"] == "application/vnd.lana.carts-export"
+
+    carts_db.clear()
+    carts_db.add(Cart(id=cart_with_pen.id))
+
+    resp = client.post(IMPORT_URL, headers=HEADERS, data=export.content)
+
+    assert resp.status_code == 200
+    assert resp.json() == {"imported": 2}
+    assert len(carts_db) == 2
+    assert carts_db.get(str(cart_with_pen.id)).products == ["PEN"]  # type: ignore
+    imported = carts_db.get(str(other.id))
+    assert imported.quantities == other.quantities  # type: ignore
+    assert imported.total == other.total  # type: ignore
+
+
+def test_import_invalid_export(
+    client: requests.Session, admin_token: str, carts_db: CartStore
+) -> None:
+    """
+    Test that invalid exports are rejected.
+    """
+    resp = client.post(IMPORT_URL, headers=HEADERS, data=b"LCEX\x01\x00\x03\x00PEN\x00")
+
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "Truncated export"}
+    assert len(carts_db) == 0
@@ -1,6 +1,15 @@
+import json
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
 from fastapi import status
 from fastapi.testclient import TestClient
 
+import lana_store
+from lana_store import crud
 from lana_store.api.v1.api import api_router
 from lana_store.core.config import settings
 from lana_store.models.cart import Cart
@@ -52,6 +61,338 @@ class TestGetCart:
         assert "detail" in content
 
 
+class TestConditionalGetCart:
+    """
+    Set of tests for the conditional requests of
+    :func:`lana_store.api.v1.endpoints.get_cart`.
+    """
+
+    def test_not_modified(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test that the cart is not sent again while its version does not change.
+        """
+        url = (
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('get_cart', cart_id=str(cart_with_pen.id))}"
+        )
+        etag = client.get(url).headers["ETag"]
+        resp = client.get(url, headers={"If-None-Match": etag})
+
+        assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+        assert resp.headers["ETag"] == etag
+        assert not resp.content
+
+    def test_modified(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test that the cart is sent again after a change.
+        """
+        url = (
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('get_cart', cart_id=str(cart_with_pen.id))}"
+        )
+        etag = client.get(url).headers["ETag"]
+        client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('partial_update_cart', cart_id=str(cart_with_pen.id))}",
+            json={"product": "MUG"},
+        )
+        resp = client.get(url, headers={"If-None-Match": etag})
+
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.headers["ETag"] != etag
+        assert resp.json()["products"] == ["PEN", "MUG"]
+
+
+class TestStreamCartEvents:
+    """
+    Set of tests for the view that streams the changes of a cart
+    :func:`lana_store.api.v1.endpoints.stream_cart_events`.
+    """
+
+    def test_with_valid_cart(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test that the stream starts with the cart and pushes its changes until
+        it is deleted.
+        """
+        id = str(cart_with_pen.id)
+
+        def change_cart() -> None:
+            while not lana_store.events.watched(cart_with_pen.key):
+                time.sleep(0.01)
+            crud.update_cart_with_product(id, "PEN")
+            crud.update_cart_products(id, add=[("MUG", 2)])
+            crud.remove_cart(id)
+
+        writer = threading.Thread(target=change_cart)
+        writer.start()
+        resp = client.get(
+            f"{settings.API_V1_STR}{api_router.url_path_for('stream_cart_events', cart_id=id)}"
+        )
+        writer.join()
+
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events: List[Dict[str, str]] = [
+            {
+                field: value
+                for field, value in (line.split(": ", 1) for line in message.splitlines())
+            }
+            for message in resp.text.strip().split("\n\n")
+        ]
+        assert [event["event"] for event in events] == [
+            "cart",
+            "product_added",
+            "products_updated",
+            "cart_deleted",
+        ]
+        assert json.loads(events[0]["data"])["products"] == ["PEN"]
+        assert json.loads(events[1]["data"]) == {"product": "PEN", "total": "5.00", "version": 1}
+        assert json.loads(events[2]["data"])["total"] == "20.00"
+        assert not lana_store.events.watched(cart_with_pen.key)
+
+    def test_with_invalid_cart(self, client: TestClient) -> None:
+        """
+        Test when the cart does not exists.
+        """
+        resp = client.get(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('stream_cart_events', cart_id='invalid-id')}"
+        )
+
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_when_disabled(
+        self, client: TestClient, cart_with_pen: Cart, monkeypatch: MonkeyPatch
+    ) -> None:
+        """
+        Test when the cart events are disabled (e.g. with several workers).
+        """
+        monkeypatch.setattr(settings, "EVENTS_ENABLED", False)
+
+        resp = client.get(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('stream_cart_events', cart_id=str(cart_with_pen.id))}"
+        )
+
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestListCarts:
+    """
+    Set of tests for the view that lists the carts
+    :func:`lana_store.api.v1.endpoints.list_carts`.
+    """
+
+    def list(self, client: TestClient, **params: Any) -> Any:
+        resp = client.get(
+            f"{settings.API_V1_STR}{api_router.url_path_for('list_carts')}", params=params
+        )
+        assert resp.status_code == status.HTTP_200_OK
+        return resp.json()
+
+    def test_pagination(self, client: TestClient) -> None:
+        """
+        Test that the pages follow each other in creation order.
+        """
+        ids = [str(crud.create_new_cart().id) for _ in range(5)]
+
+        first = self.list(client, limit=3)
+        second = self.list(client, limit=3, cursor=first["next_cursor"])
+
+        assert [cart["id"] for cart in first["carts"] + second["carts"]] == ids
+        assert first["carts"][0] == {"id": ids[0], "products": [], "total": "0.00"}
+        assert second["next_cursor"] is None
+
+    def test_filters(self, client: TestClient) -> None:
+        """
+        Test the product, total and creation time filters.
+        """
+        pens = crud.create_new_cart()
+        crud.update_cart_products(str(pens.id), add=[("PEN", 4)])
+        mug = crud.create_new_cart()
+        crud.update_cart_with_product(str(mug.id), "MUG")
+
+        assert [cart["id"] for cart in self.list(client, contains_product="MUG")["carts"]] == [
+            str(mug.id)
+        ]
+        assert [cart["id"] for cart in self.list(client, min_total="10")["carts"]] == [
+            str(pens.id)
+        ]
+        assert self.list(client, created_after="2000-01-01T00:00:00")["carts"]
+        assert not self.list(client, created_after="2100-01-01T00:00:00Z")["carts"]
+
+    def test_deleted_carts(self, client: TestClient) -> None:
+        """
+        Test that deleted carts are not listed.
+        """
+        cart = crud.create_new_cart()
+        crud.remove_cart(str(cart.id))
+
+        assert self.list(client) == {"carts": [], "next_cursor": None}
+
+    def test_with_invalid_cursor(self, client: TestClient) -> None:
+        """
+        Test when the cursor is not one of a previous page.
+        """
+        resp = client.get(
+            f"{settings.API_V1_STR}{api_router.url_path_for('list_carts')}",
+            params={"cursor": "invalid"},
+        )
+
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_when_disabled(self, client: TestClient, monkeypatch: MonkeyPatch) -> None:
+        """
+        Test when the carts indexes are disabled.
+        """
+        monkeypatch.setattr(lana_store, "index", None)
+
+        resp = client.get(f"{settings.API_V1_STR}{api_router.url_path_for('list_carts')}")
+
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestGetCartsStats:
+    """
+    Set of tests for the view of the carts stats
+    :func:`lana_store.api.v1.endpoints.get_carts_stats`.
+    """
+
+    def stats(self, client: TestClient) -> Any:
+        # Changes are added by the consumer while the requests run
+        for _ in range(10):
+            resp = client.get(f"{settings.API_V1_STR}{api_router.url_path_for('get_carts_stats')}")
+            assert resp.status_code == status.HTTP_200_OK
+            if not resp.json()["pending_changes"]:
+                break
+        return resp.json()
+
+    def test_with_cart_changes(self, client: TestClient) -> None:
+        """
+        Test that the stats follow the carts created, updated and deleted.
+        """
+        url = f"{settings.API_V1_STR}{api_router.url_path_for('create_cart')}"
+        pens, tshirts = client.post(url).json()["id"], client.post(url).json()["id"]
+        client.patch(
+            f"{settings.API_V1_STR}{api_router.url_path_for('update_cart_products', cart_id=pens)}",
+            json={"add": [{"product": "PEN", "quantity": 3}]},
+        )
+        client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('update_cart_products', cart_id=tshirts)}",
+            json={"add": [{"product": "TSHIRT", "quantity": 3}]},
+        )
+        client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('partial_update_cart', cart_id=tshirts)}",
+            json={"product": "MUG"},
+        )
+
+        assert self.stats(client) == {
+            "carts": 2,
+            "units": {"PEN": 3, "TSHIRT": 3, "MUG": 1},
+            "revenue": "62.50",
+            "promotions": {"PEN": {"carts": 1, "share": 0.5}, "TSHIRT": {"carts": 1, "share": 0.5}},
+            "pending_changes": 0,
+            "dropped_changes": 0,
+            "stale": False,
+        }
+
+        client.delete(
+            f"{settings.API_V1_STR}{api_router.url_path_for('delete_cart', cart_id=pens)}"
+        )
+        stats = self.stats(client)
+
+        assert stats["carts"] == 1
+        assert stats["units"]["PEN"] == 0
+        assert stats["promotions"]["PEN"] == {"carts": 0, "share": 0.0}
+
+    def test_when_disabled(self, client: TestClient, monkeypatch: MonkeyPatch) -> None:
+        """
+        Test when the carts analytics are disabled.
+        """
+        monkeypatch.setattr(lana_store, "analytics", None)
+
+        resp = client.get(f"{settings.API_V1_STR}{api_router.url_path_for('get_carts_stats')}")
+
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestGetCartsTotals:
+    """
+    Set of tests for the view that prices many carts
+    :func:`lana_store.api.v1.endpoints.get_carts_totals`.
+    """
+
+    def test_with_cart_ids(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test when pricing the given carts.
+        """
+        payload = {"ids": [str(cart_with_pen.id), "invalid-id"]}
+        resp = client.post(
+            f"{settings.API_V1_STR}{api_router.url_path_for('get_carts_totals')}", json=payload
+        )
+
+        assert resp.status_code == status.HTTP_200_OK
+        content = resp.json()
+        assert content["totals"] == [{"id": str(cart_with_pen.id), "total": "5.00"}]
+        assert content["missing"] == ["invalid-id"]
+
+    def test_without_cart_ids(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test when pricing all the carts.
+        """
+        resp = client.post(
+            f"{settings.API_V1_STR}{api_router.url_path_for('get_carts_totals')}", json={}
+        )
+
+        assert resp.status_code == status.HTTP_200_OK
+        content = resp.json()
+        assert content["totals"] == [{"id": str(cart_with_pen.id), "total": "5.00"}]
+        assert content["missing"] == []
+
+
+class TestRunCartsBatch:
+    """
+    Set of tests for the view that runs many cart operations at once
+    :func:`lana_store.api.v1.endpoints.run_carts_batch`.
+    """
+
+    def test_with_valid_operations(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test that every operation gets its own result.
+        """
+        id = str(cart_with_pen.id)
+        payload = {
+            "operations": [
+                {"op": "create"},
+                {"op": "get", "id": id},
+                {"op": "delete", "id": id},
+                {"op": "delete", "id": id},
+            ]
+        }
+        resp = client.post(
+            f"{settings.API_V1_STR}{api_router.url_path_for('run_carts_batch')}", json=payload
+        )
+
+        assert resp.status_code == status.HTTP_200_OK
+        results = resp.json()["results"]
+        assert [result["status"] for result in results] == [201, 200, 204, 404]
+        assert results[0]["cart"]["products"] == []
+        assert results[1]["cart"] == {"id": id, "products": ["PEN"], "total": "5.00"}
+
+    def test_without_cart_id(self, client: TestClient) -> None:
+        """
+        Test that operations over existing carts require the cart Id.
+        """
+        payload = {"operations": [{"op": "get"}]}
+        resp = client.post(
+            f"{settings.API_V1_STR}{api_router.url_path_for('run_carts_batch')}", json=payload
+        )
+
+        assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 class TestPartialUpdateCart:
     """
     Set of tests for the view that add products to carts
@@ -105,6 +446,131 @@ class TestPartialUpdateCart:
         assert "detail" in content
 
 
+class TestUpdateCartProducts:
+    """
+    Set of tests for the view that adds and removes many products at once
+    :func:`lana_store.api.v1.endpoints.update_cart_products`.
+    """
+
+    def test_with_valid_products(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test adding and removing several units.
+        """
+        payload = {
+            "add": [{"product": "MUG", "quantity": 2}, {"product": "PEN", "quantity": 1}],
+            "remove": [{"product": "PEN", "quantity": 1}],
+        }
+        resp = client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('update_cart_products', cart_id=str(cart_with_pen.id))}",
+            json=payload,
+        )
+
+        assert resp.status_code == status.HTTP_200_OK
+        content = resp.json()
+        assert content["products"] == ["PEN", "MUG", "MUG"]
+
+    def test_with_not_enough_units(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test removing more units than the cart has, nothing is changed.
+        """
+        payload = {
+            "add": [{"product": "MUG", "quantity": 2}],
+            "remove": [{"product": "PEN", "quantity": 2}],
+        }
+        resp = client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('update_cart_products', cart_id=str(cart_with_pen.id))}",
+            json=payload,
+        )
+
+        assert resp.status_code == status.HTTP_409_CONFLICT
+        assert cart_with_pen.products == ["PEN"]
+
+    def test_with_invalid_quantity(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test with a non-positive quantity.
+        """
+        payload = {"add": [{"product": "MUG", "quantity": 0}]}
+        resp = client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('update_cart_products', cart_id=str(cart_with_pen.id))}",
+            json=payload,
+        )
+
+        assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    @pytest.mark.parametrize(
+        "payload",
+        [{}, {"add": [], "remove": []}, {"add": [{"product": "MUG", "quantity": 1}] * 101}],
+    )
+    def test_with_invalid_items(
+        self, client: TestClient, cart_with_pen: Cart, payload: Dict[str, Any]
+    ) -> None:
+        """
+        Test with no products to add nor remove, or too many, the cart is left
+        untouched (same version).
+        """
+        version = cart_with_pen.version
+        resp = client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('update_cart_products', cart_id=str(cart_with_pen.id))}",
+            json=payload,
+        )
+
+        assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert crud.get_cart_by_id(str(cart_with_pen.id)).version == version  # type: ignore
+
+    def test_with_invalid_cart(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test when the cart does not exists.
+        """
+        payload = {"add": [{"product": "MUG", "quantity": 1}]}
+        resp = client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('update_cart_products', cart_id='invalid-id')}",
+            json=payload,
+        )
+
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestConditionalUpdate:
+    """
+    Set of tests for the `If-Match` conditional updates of
+    :func:`lana_store.api.v1.endpoints.partial_update_cart`.
+    """
+
+    def test_with_current_etag(self, client: TestClient, cart_with_pen: Cart) -> None:
+        """
+        Test that the cart is updated while it is at the version of the `ETag`.
+        """
+        resp = client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('partial_update_cart', cart_id=str(cart_with_pen.id))}",
+            json={"product": "MUG"},
+            headers={"If-Match": '"0"'},
+        )
+
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.headers["ETag"] == '"1"'
+
+    @pytest.mark.parametrize("etag", ['"5"', 'W/"0"', "invalid"])
+    def test_with_stale_etag(self, client: TestClient, cart_with_pen: Cart, etag: str) -> None:
+        """
+        Test that the update is rejected when the `ETag` does not match.
+        """
+        resp = client.patch(
+            f"{settings.API_V1_STR}"
+            f"{api_router.url_path_for('partial_update_cart', cart_id=str(cart_with_pen.id))}",
+            json={"product": "MUG"},
+            headers={"If-Match": etag},
+        )
+
+        assert resp.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert cart_with_pen.products == ["PEN"]
+
+
 class TestDeleteCart:
     """
     Set of tests for the view that removes carts
@@ -134,3 +600,16 @@ class TestDeleteCart:
         assert resp.status_code == status.HTTP_404_NOT_FOUND
         content = resp.json()
         assert "detail" in content
+
+
+def test_openapi_documents_responses(client: TestClient) -> None:
+    """
+    Test that the endpoints serialized with the fast encoder still document
+    their response schemes.
+    """
+    paths = client.get(f"{settings.API_V1_STR}/openapi.json").json()["paths"]
+    get_cart = paths[f"{settings.API_V1_STR}/carts/{{cart_id}}"]["get"]
+
+    assert get_cart["responses"]["200"]["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/CartOutput"
+    }
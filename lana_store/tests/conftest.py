@@ -1,5 +1,5 @@
 import uuid
-from typing import Dict, Generator
+from typing import Generator
 
 import pytest
 import requests
@@ -7,6 +7,7 @@ from faker import Faker
 from fastapi.testclient import TestClient
 
 import lana_store
+from lana_store.db import CartStore
 from lana_store.main import app
 from lana_store.models.cart import Cart
 
@@ -25,11 +26,15 @@ def reset_carts_db() -> None:
     """
     Resets the database to isolate tests.
     """
-    lana_store.carts_db = dict()
+    lana_store.carts_db.clear()
+    if lana_store.index is not None:
+        lana_store.index.clear()
+    if lana_store.analytics is not None:
+        lana_store.analytics.clear()
 
 
 @pytest.fixture(scope="session")
-def carts_db() -> Dict[str, Cart]:
+def carts_db() -> CartStore:
     """
     Provides access to the global in-memory carts database object.
     """
@@ -45,6 +50,6 @@ def cart_with_pen() -> Cart:
     Faker.seed(4321)
 
     cart = Cart(id=uuid.UUID(faker.uuid4()), products=["PEN"])
-    lana_store.carts_db[str(cart.id)] = cart
+    lana_store.carts_db.add(cart)
 
     return cart
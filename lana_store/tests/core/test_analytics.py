@@ -0,0 +1,143 @@
+import asyncio
+import threading
+from typing import Iterator, Tuple
+
+from lana_store.core.analytics import CartAnalytics
+from lana_store.tests.core.test_events import run_in_new_loop
+
+
+#: Units of the carts by product ordinal (`PEN`, `TSHIRT`, `MUG`).
+EMPTY = (0, 0, 0)
+TWO_PENS = (2, 0, 0)
+THREE_TSHIRTS_AND_MUG = (0, 3, 1)
+
+
+class TestCartAnalytics:
+    """
+    Set of tests for the carts aggregates :class:`lana_store.core.analytics.CartAnalytics`.
+    """
+
+    def test_apply(self) -> None:
+        """
+        Test that created, changed and deleted carts update all the aggregates.
+        """
+        analytics = CartAnalytics()
+        analytics.load([THREE_TSHIRTS_AND_MUG])
+        analytics.apply(None, EMPTY)
+        analytics.apply(EMPTY, TWO_PENS)
+
+        assert analytics.carts == 2
+        assert analytics.units == [2, 3, 1]
+        # 1 PEN (2x1) + 3 TSHIRTs (25% off) + 1 MUG
+        assert analytics.revenue == 500 + 4500 + 750
+        assert analytics.promoted == {0: 1, 1: 1}
+
+        analytics.apply(TWO_PENS, None)
+
+        assert analytics.carts == 1
+        assert analytics.units == [0, 3, 1]
+        assert analytics.revenue == 4500 + 750
+        assert analytics.promoted == {0: 0, 1: 1}
+
+    def test_consumer(self) -> None:
+        """
+        Test that the changes published from any thread reach the aggregates,
+        and that the ones published before the consumer starts are ignored.
+        """
+        analytics = CartAnalytics()
+        analytics.publish(None, TWO_PENS)
+
+        async def run() -> None:
+            analytics.start()
+            analytics.publish(None, TWO_PENS)
+            thread = threading.Thread(target=analytics.publish, args=(None, EMPTY))
+            thread.start()
+            thread.join()
+
+            while analytics.carts < 2:
+                await asyncio.sleep(0)
+            analytics.stop()
+
+        run_in_new_loop(run())
+
+        assert analytics.carts == 2
+        assert analytics.units == [2, 0, 0]
+        assert analytics.pending == 0
+
+    def test_full_queue(self) -> None:
+        """
+        Test that the changes beyond the queue capacity are dropped and counted,
+        and that the ones queued are added on stop.
+        """
+        analytics = CartAnalytics(max_pending=2)
+
+        async def run() -> None:
+            analytics.start()
+            for _ in range(5):
+                analytics.publish(None, EMPTY)
+
+            assert analytics.pending == 2
+            analytics.stop()
+
+        run_in_new_loop(run())
+
+        assert analytics.carts == 2
+        assert analytics.dropped == 3
+        assert analytics.stale
+
+    def test_rebuild(self) -> None:
+        """
+        Test that dropped changes have the aggregates rebuilt from the stored
+        carts off the event loop, and that they stay stale while the carts
+        change during the rebuild.
+        """
+        analytics = CartAnalytics(max_pending=1)
+        stored = [TWO_PENS, THREE_TSHIRTS_AND_MUG]
+        scanning = threading.Event()
+        scanned = threading.Event()
+
+        def source() -> Iterator[Tuple[int, ...]]:
+            assert threading.current_thread() is not threading.main_thread()
+            scanning.set()
+            scanned.wait(5)
+            yield from stored
+
+        async def run() -> None:
+            analytics.start(source)
+            for _ in range(3):
+                analytics.publish(None, TWO_PENS)
+            while not scanning.is_set():
+                await asyncio.sleep(0)
+
+            assert analytics.stale
+            # Changed during the scan
+            stored[0] = EMPTY
+            analytics.publish(TWO_PENS, EMPTY)
+            scanned.set()
+            while analytics.carts != 2:
+                await asyncio.sleep(0.01)
+
+            # The change is both seen by the scan and published
+            assert analytics.units == [-2, 3, 1]
+            assert analytics.stale
+            analytics.stop()
+
+        run_in_new_loop(run())
+
+        assert analytics.dropped == 2
+        scanning.clear()
+        scanned.set()
+        analytics.clear()
+
+        async def quiet() -> None:
+            analytics.start(source)
+            analytics.publish(None, EMPTY)
+            analytics.publish(None, EMPTY)
+            while analytics.stale:
+                await asyncio.sleep(0.01)
+            analytics.stop()
+
+        run_in_new_loop(quiet())
+
+        assert analytics.carts == 2
+        assert analytics.units == [0, 3, 1]
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from lana_store.core.batch_pricing import batch_totals, compile_rules, quantity_matrix
+from lana_store.core.config import settings
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES
+
+
+def test_quantity_matrix() -> None:
+    """
+    Test the quantity matrix layout :func:`lana_store.core.batch_pricing.quantity_matrix`.
+    """
+    carts = [Cart(products=["PEN", "MUG", "PEN"]), Cart(), Cart(products=["TSHIRT"])]
+
+    assert quantity_matrix(carts).tolist() == [[2, 0, 1], [0, 0, 0], [0, 1, 0]]
+
+
+class TestBatchTotals:
+    """
+    Set of tests for the vectorized pricing :func:`lana_store.core.batch_pricing.batch_totals`.
+    """
+
+    def test_without_carts(self) -> None:
+        """
+        Test with an empty batch.
+        """
+        assert batch_totals([]) == []
+
+    def test_matches_cart_total(self) -> None:
+        """
+        Test that the totals match the scalar `Cart.total` over random carts.
+        """
+        rand = random.Random(4321)
+        carts = [
+            Cart(products=rand.choices(PRODUCT_CODES, k=rand.randint(0, 40))) for _ in range(500)
+        ]
+
+        assert batch_totals(carts) == [cart.total for cart in carts]
+
+
+def test_compile_rules_with_unknown_product() -> None:
+    """
+    Test that rules over unknown products are rejected, as by the scalar
+    pricing :func:`lana_store.core.batch_pricing.compile_rules`.
+    """
+    rules = [{"kind": "BUY_X_PAY_Y", "product": "HAT", "buy": 2, "pay": 1}]
+
+    with pytest.raises(ValueError, match="unknown product 'HAT'"):
+        compile_rules(settings.PRODUCT_TABLE, rules)  # type: ignore
@@ -0,0 +1,31 @@
+import json
+
+from lana_store import schemas
+from lana_store.core.encoding import encode_cart
+from lana_store.core.money import format_money
+from lana_store.models.cart import Cart
+
+
+class TestEncodeCart:
+    """
+    Set of tests for the fast cart encoder :func:`lana_store.core.encoding.encode_cart`.
+    """
+
+    def test_matches_schema(self) -> None:
+        """
+        Test that the output matches the serialization of the pydantic scheme.
+        """
+        cart = Cart(products=["PEN", "TSHIRT", "PEN", "MUG"])
+        expected = schemas.CartOutput(
+            id=cart.id, products=cart.products, total=format_money(cart.total)
+        )
+
+        assert json.loads(encode_cart(cart, with_total=True)) == json.loads(expected.json())
+
+    def test_without_total(self) -> None:
+        """
+        Test the output of an empty cart without the total.
+        """
+        cart = Cart()
+
+        assert json.loads(encode_cart(cart)) == {"id": str(cart.id), "products": []}
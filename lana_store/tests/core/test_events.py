@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from typing import Any, Coroutine
+
+from lana_store.core.events import CartEventHub, encode_event
+
+
+def run_in_new_loop(coroutine: Coroutine[Any, Any, None]) -> None:
+    """
+    Runs a coroutine in its own event loop, leaving the current one (used by
+    the testing client) untouched, unlike `asyncio.run`.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_encode_event() -> None:
+    """
+    Test of the server-sent events format :func:`lana_store.core.events.encode_event`.
+    """
+    assert encode_event("product_added", {"product": "PEN"}, 3) == (
+        b'event: product_added\ndata: {"product":"PEN"}\nid: 3\n\n'
+    )
+
+
+class TestCartEventHub:
+    """
+    Set of tests for the events fan-out :class:`lana_store.core.events.CartEventHub`.
+    """
+
+    def test_fan_out(self) -> None:
+        """
+        Test that events reach all the subscribers of the cart only.
+        """
+
+        async def run() -> None:
+            hub = CartEventHub()
+            subscriptions = [hub.subscribe(b"a") for _ in range(1000)]
+            other = hub.subscribe(b"b")
+
+            hub.publish(b"a", b"first")
+            hub.publish(b"a", b"last", last=True)
+
+            for subscription in subscriptions:
+                assert subscription.queue.get_nowait() == b"first"
+                assert subscription.queue.get_nowait() == b"last"
+                assert subscription.queue.get_nowait() is None
+            assert other.queue.empty()
+            assert not hub.watched(b"a")
+            assert len(hub) == 1
+
+        run_in_new_loop(run())
+
+    def test_slow_subscriber_is_disconnected(self) -> None:
+        """
+        Test that subscribers falling behind are closed instead of queuing forever.
+        """
+
+        async def run() -> None:
+            hub = CartEventHub(max_pending=2)
+            subscription = hub.subscribe(b"a")
+            for _ in range(3):
+                hub.publish(b"a", b"event")
+
+            assert subscription.closed
+            assert [subscription.queue.get_nowait() for _ in range(3)] == [b"event", b"event", None]
+
+        run_in_new_loop(run())
+
+    def test_publish_from_other_threads(self) -> None:
+        """
+        Test that events published outside of the event loop are delivered.
+        """
+
+        async def run() -> None:
+            hub = CartEventHub()
+            subscription = hub.subscribe(b"a")
+            thread = threading.Thread(target=hub.publish, args=(b"a", b"event"))
+            thread.start()
+
+            assert await asyncio.wait_for(subscription.queue.get(), 1) == b"event"
+            thread.join()
+
+        run_in_new_loop(run())
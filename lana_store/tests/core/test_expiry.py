@@ -0,0 +1,81 @@
+from typing import List
+
+from lana_store.core.expiry import CartExpiry
+
+
+class FakeClock:
+    """
+    Manually advanced time source.
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCartExpiry:
+    """
+    Tests the last access tracking :class:`lana_store.core.expiry.CartExpiry`.
+    """
+
+    def test_pop_expired(self) -> None:
+        """
+        Only the carts not accessed within the TTL expire.
+        """
+        clock = FakeClock()
+        expiry = CartExpiry(ttl=10, clock=clock)
+
+        expiry.touch(b"a")
+        clock.now = 5
+        expiry.touch(b"b")
+        clock.now = 12
+        expired: List[bytes] = expiry.pop_expired()
+
+        assert expired == [b"a"]
+        assert len(expiry) == 1
+        assert expiry.last_access(b"b") == 5
+
+    def test_touch_refreshes_access(self) -> None:
+        """
+        Accessing a cart postpones its expiration.
+        """
+        clock = FakeClock()
+        expiry = CartExpiry(ttl=10, clock=clock)
+
+        expiry.touch(b"a")
+        expiry.touch(b"b")
+        clock.now = 8
+        expiry.touch(b"a")
+        clock.now = 15
+
+        assert expiry.pop_expired() == [b"b"]
+        assert expiry.pop_expired() == []
+
+    def test_max_carts_evicts_least_recently_used(self) -> None:
+        """
+        The least recently used carts are evicted beyond the cap.
+        """
+        expiry = CartExpiry(max_carts=2)
+
+        assert expiry.touch(b"a") == []
+        assert expiry.touch(b"b") == []
+        expiry.touch(b"a")
+
+        assert expiry.touch(b"c") == [b"b"]
+        assert len(expiry) == 2
+
+    def test_forget(self) -> None:
+        """
+        Forgotten carts do not expire.
+        """
+        clock = FakeClock()
+        expiry = CartExpiry(ttl=1, clock=clock)
+
+        expiry.touch(b"a")
+        expiry.forget(b"a")
+        clock.now = 2
+
+        assert expiry.pop_expired() == []
+        assert expiry.last_access(b"a") is None
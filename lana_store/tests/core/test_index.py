@@ -0,0 +1,107 @@
+from typing import List
+
+from lana_store.core.index import CartIndex, CartPosition
+
+
+class FakeClock:
+    """
+    Manually advanced time source.
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def keys(positions: List[CartPosition]) -> List[bytes]:
+    return [key for _, key in positions]
+
+
+class TestCartIndex:
+    """
+    Tests the secondary indexes of the carts :class:`lana_store.core.index.CartIndex`.
+    """
+
+    def test_creation_order(self) -> None:
+        """
+        Carts are scanned in creation order, ties by key, from any position.
+        """
+        clock = FakeClock()
+        index = CartIndex(clock=clock)
+        for key, now in ((b"c", 1), (b"b", 2), (b"a", 2), (b"d", 3)):
+            clock.now = now
+            index.add(key, (0, 0, 0))
+
+        positions = list(index.scan())
+
+        assert keys(positions) == [b"c", b"a", b"b", b"d"]
+        assert keys(list(index.scan(after=positions[1]))) == [b"b", b"d"]
+        assert keys(list(index.scan(created_after=2))) == [b"d"]
+        assert index.created(b"b") == 2
+
+    def test_clock_going_back(self) -> None:
+        """
+        Carts created while the clock goes back keep the creation order.
+        """
+        clock = FakeClock()
+        index = CartIndex(clock=clock)
+        clock.now = 10
+        index.add(b"a", (0, 0, 0))
+        clock.now = 5
+        index.add(b"b", (0, 0, 0))
+
+        assert keys(list(index.scan())) == [b"a", b"b"]
+        assert index.created(b"b") == 10
+
+    def test_products(self) -> None:
+        """
+        Carts are found by product, whether the matching carts are scanned
+        from the creation order or sorted.
+        """
+        index = CartIndex(clock=FakeClock())
+        index.add(b"a", (1, 0, 0))
+        index.add(b"b", (0, 0, 1))
+        index.add(b"c", (2, 0, 1))
+        index.update(b"a", (0, 0, 1))
+        # Not indexed
+        index.update(b"x", (1, 0, 0))
+
+        assert keys(list(index.scan(product=0))) == [b"c"]
+        assert keys(list(index.scan(product=1))) == []
+        assert keys(list(index.scan(product=2))) == [b"a", b"b", b"c"]
+
+    def test_remove(self) -> None:
+        """
+        Removed carts are no longer scanned, and the creation order is
+        compacted once most of it are removed carts.
+        """
+        index = CartIndex(clock=FakeClock())
+        for key in (b"a", b"b", b"c"):
+            index.add(key, (1, 0, 0))
+
+        index.remove(b"a")
+        index.remove(b"missing")
+
+        assert keys(list(index.scan())) == [b"b", b"c"]
+        assert keys(list(index.scan(product=0))) == [b"b", b"c"]
+
+        index.remove(b"b")
+
+        assert keys(index._order) == [b"c"]
+        assert len(index) == 1
+
+    def test_readded_cart(self) -> None:
+        """
+        Carts added again (e.g. imported over) keep their creation time.
+        """
+        clock = FakeClock()
+        index = CartIndex(clock=clock)
+        index.add(b"a", (0, 0, 0))
+        clock.now = 5
+        index.add(b"b", (0, 0, 0))
+        index.add(b"a", (1, 0, 0))
+
+        assert keys(list(index.scan())) == [b"a", b"b"]
+        assert keys(list(index.scan(product=0))) == [b"a"]
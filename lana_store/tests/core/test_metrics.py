@@ -0,0 +1,75 @@
+import threading
+
+from lana_store.core.metrics import Counter, Histogram, MetricsRegistry
+
+
+class TestCounter:
+    """
+    Set of tests for :class:`lana_store.core.metrics.Counter`.
+    """
+
+    def test_no_lost_updates_across_threads(self) -> None:
+        """
+        Test that increments from several threads (each with its own values)
+        are all added up.
+        """
+        counter = Counter("requests_total", "Requests.", ("product",))
+
+        def work() -> None:
+            for _ in range(10_000):
+                counter.inc(("PEN",))
+            counter.inc(("MUG",), 5)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value(("PEN",)) == 80_000
+        assert counter.value(("MUG",)) == 40
+        assert counter.value(("TSHIRT",)) == 0
+
+
+class TestHistogram:
+    """
+    Set of tests for :class:`lana_store.core.metrics.Histogram`.
+    """
+
+    def test_buckets_are_cumulative(self) -> None:
+        """
+        Test the text format of the buckets: cumulative counts, bounds included.
+        """
+        histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(("/carts",), value)
+
+        assert list(histogram.samples()) == [
+            'latency_seconds_bucket{route="/carts",le="0.1"} 2',
+            'latency_seconds_bucket{route="/carts",le="1.0"} 3',
+            'latency_seconds_bucket{route="/carts",le="+Inf"} 4',
+            'latency_seconds_sum{route="/carts"} 3.65',
+            'latency_seconds_count{route="/carts"} 4',
+        ]
+        assert histogram.count(("/carts",)) == 4
+
+
+def test_render() -> None:
+    """
+    Test the Prometheus text format of :class:`lana_store.core.metrics.MetricsRegistry`.
+    """
+    registry = MetricsRegistry()
+    registry.counter("errors_total", "Errors.", ("detail",)).inc(('Bad "id"\n',))
+    registry.gauge("carts", "Carts.", lambda: 3)
+    registry.gauge("skipped", "Not available.", lambda: None)
+
+    assert registry.render() == (
+        "# HELP errors_total Errors.\n"
+        "# TYPE errors_total counter\n"
+        'errors_total{detail="Bad \\"id\\"\\n"} 1\n'
+        "# HELP carts Carts.\n"
+        "# TYPE carts gauge\n"
+        "carts 3\n"
+        "# HELP skipped Not available.\n"
+        "# TYPE skipped gauge\n"
+    )
@@ -0,0 +1,80 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from lana_store.core.money import apply_factor, discount_factor, format_money
+
+
+#: Random samples of every property checked.
+SAMPLES = 10_000
+
+
+def test_format_money() -> None:
+    """
+    Test of money-as-integer formatting :func:`lana_store.core.money.format_money`.
+    """
+    assert format_money(0) == "0.00"
+    assert format_money(5) == "0.05"
+    assert format_money(2205) == "22.05"
+    assert format_money(-150) == "-1.50"
+
+
+def test_format_money_matches_float_formatting() -> None:
+    """
+    Property: formatting matches the former float formatting on every amount
+    floats represent exactly.
+    """
+    rand = random.Random(1234)
+    amounts = [rand.randrange(0, 2 ** 50) for _ in range(SAMPLES)] + list(range(1000))
+
+    for amount in amounts:
+        assert format_money(amount) == f"{amount / 100:.2f}"
+
+
+class TestDiscounts:
+    """
+    Set of tests for the exact discounts of :mod:`lana_store.core.money`.
+    """
+
+    def test_discount_factor(self) -> None:
+        """
+        Test that factors are exact fractions.
+        """
+        assert discount_factor(25) == Fraction(3, 4)
+        assert discount_factor(Fraction(25, 2)) == Fraction(7, 8)
+        assert discount_factor(0) == 1
+
+    @pytest.mark.parametrize("percentage", [-1, 101])
+    def test_invalid_percentage(self, percentage: int) -> None:
+        """
+        Test that percentages out of [0, 100] are rejected.
+        """
+        with pytest.raises(ValueError):
+            discount_factor(percentage)
+
+    def test_matches_float_discount(self) -> None:
+        """
+        Property: a 25% discount (exact in binary) gives the same results as the
+        former float arithmetic.
+        """
+        rand = random.Random(1234)
+        factor = discount_factor(25)
+
+        for _ in range(SAMPLES):
+            amount = rand.randrange(0, 2 ** 40)
+            assert apply_factor(amount, factor) == int(amount * (1 - 25 / 100))
+
+    def test_is_exact(self) -> None:
+        """
+        Property: discounts are truncated exact products, even when floats are
+        off (e.g. 30% off 90 is 63, while `int(90 * (1 - 30 / 100))` gives 62).
+        """
+        rand = random.Random(1234)
+
+        assert apply_factor(90, discount_factor(30)) == 63
+        for _ in range(SAMPLES):
+            amount, percentage = rand.randrange(0, 2 ** 40), rand.randrange(0, 101)
+            discounted = apply_factor(amount, discount_factor(percentage))
+
+            assert discounted * 100 <= amount * (100 - percentage) < (discounted + 1) * 100
@@ -0,0 +1,84 @@
+import pytest
+
+from lana_store.core.pricing import compile_rules, price_cart
+
+
+PRODUCT_TABLE = {
+    "PEN": {"name": "Lana Pen", "price": 500},
+    "TSHIRT": {"name": "Lana T-Shirt", "price": 2000},
+    "MUG": {"name": "Lana Coffee Mug", "price": 750},
+}
+
+
+class TestCompileRules:
+    """
+    Set of tests for the pricing rules compilation
+    :func:`lana_store.core.pricing.compile_rules`.
+    """
+
+    def test_without_rules(self) -> None:
+        """
+        Test that products without rules are charged at unit price.
+        """
+        table = compile_rules(PRODUCT_TABLE, [])  # type: ignore
+
+        assert table["PEN"](3) == 1500
+        assert table["MUG"](0) == 0
+
+    def test_buy_x_pay_y(self) -> None:
+        """
+        Test a 3-for-2 promotion.
+        """
+        rules = [{"kind": "BUY_X_PAY_Y", "product": "MUG", "buy": 3, "pay": 2}]
+        table = compile_rules(PRODUCT_TABLE, rules)  # type: ignore
+
+        assert table["MUG"](2) == 1500
+        assert table["MUG"](3) == 1500
+        assert table["MUG"](7) == 3750
+
+    def test_bulk_discount(self) -> None:
+        """
+        Test a 10% discount from 2 units on.
+        """
+        rules = [{"kind": "BULK_DISCOUNT", "product": "PEN", "min_quantity": 2, "discount": 10}]
+        table = compile_rules(PRODUCT_TABLE, rules)  # type: ignore
+
+        assert table["PEN"](1) == 500
+        assert table["PEN"](2) == 900
+
+    def test_several_rules_over_a_product(self) -> None:
+        """
+        Test that the cheapest promotion is applied.
+        """
+        rules = [
+            {"kind": "BUY_X_PAY_Y", "product": "PEN", "buy": 2, "pay": 1},
+            {"kind": "BULK_DISCOUNT", "product": "PEN", "min_quantity": 3, "discount": 60},
+        ]
+        table = compile_rules(PRODUCT_TABLE, rules)  # type: ignore
+
+        assert table["PEN"](2) == 500
+        assert table["PEN"](3) == 600
+
+    def test_with_unknown_kind(self) -> None:
+        """
+        Test that unknown rule kinds are rejected.
+        """
+        with pytest.raises(ValueError):
+            compile_rules(PRODUCT_TABLE, [{"kind": "FREEBIE", "product": "PEN"}])  # type: ignore
+
+    def test_with_unknown_product(self) -> None:
+        """
+        Test that rules over unknown products are rejected.
+        """
+        rules = [{"kind": "BUY_X_PAY_Y", "product": "HAT", "buy": 2, "pay": 1}]
+
+        with pytest.raises(ValueError):
+            compile_rules(PRODUCT_TABLE, rules)  # type: ignore
+
+
+def test_price_cart() -> None:
+    """
+    Test the pricing of a set of products with the default rules
+    :func:`lana_store.core.pricing.price_cart`.
+    """
+    assert price_cart({"PEN": 3, "TSHIRT": 3, "MUG": 1}) == 6250
@@ -0,0 +1,40 @@
+import signal
+import sys
+import time
+
+from lana_store.core.profiling import collapse, StackSampler
+
+
+def test_collapse() -> None:
+    """
+    Test that :func:`lana_store.core.profiling.collapse` lists the frames root first.
+    """
+
+    def inner() -> str:
+        return collapse(sys._getframe())
+
+    stack = collapse(sys._getframe()).split(";")
+
+    assert inner().split(";") == stack + ["inner (core/test_profiling.py)"]
+    assert stack[-1] == "test_collapse (core/test_profiling.py)"
+
+
+def test_stack_sampler() -> None:
+    """
+    Test that :class:`lana_store.core.profiling.StackSampler` samples the busy
+    code and stops the timer with the last profile.
+    """
+
+    def busy() -> None:
+        end = time.perf_counter() + 0.05
+        while time.perf_counter() < end:
+            pass
+
+    sampler = StackSampler(interval=0.001)
+    profile = sampler.start()
+    busy()
+    sampler.stop(profile)
+
+    assert sum(profile.samples.values()) >= 10
+    assert any(stack.endswith(";busy (core/test_profiling.py)") for stack in profile.samples)
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
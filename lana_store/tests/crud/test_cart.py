@@ -1,7 +1,20 @@
-from typing import Dict
+import asyncio
+import os
+import threading
+from pathlib import Path
+from typing import List
 
+import pytest
+
+from _pytest.monkeypatch import MonkeyPatch
+
+import lana_store
 from lana_store import crud
-from lana_store.models.cart import Cart
+from lana_store.core.analytics import CartAnalytics
+from lana_store.core.expiry import CartExpiry
+from lana_store.db import CartJournal, CartStore
+from lana_store.db.journal import LOG_FILE, RECORD_SIZE
+from lana_store.models.cart import Cart, VersionConflictError
 
 
 def test_create_cart() -> None:
@@ -39,6 +52,48 @@ class TestGetCartById:
         assert not cart
 
 
+def test_get_carts_by_ids(cart_with_pen: Cart) -> None:
+    """
+    Test of many carts retrieval :func:`lana_store.crud.cart.get_carts_by_ids`.
+    """
+    carts = crud.get_carts_by_ids(
+        ["eb1167b3-67a9-c378-7c65-c1e582e2e662", "cc733c92-6853-45f6-8e49-bec741188ebb"]
+    )
+
+    assert carts == [None, cart_with_pen]
+
+
+def test_get_all_carts(cart_with_pen: Cart) -> None:
+    """
+    Test of all carts retrieval :func:`lana_store.crud.cart.get_all_carts`.
+    """
+    new_cart = crud.create_new_cart()
+
+    carts = crud.get_all_carts()
+
+    assert len(carts) == 2
+    assert cart_with_pen in carts
+    assert new_cart in carts
+
+
+def test_list_carts_max_scan() -> None:
+    """
+    Test that filters without an index scan at most `max_scan` carts per page
+    :func:`lana_store.crud.cart.list_carts`.
+    """
+    carts = crud.create_new_carts(5)
+    crud.update_cart_with_product(str(carts[3].id), "TSHIRT")
+
+    page, last = crud.list_carts(10, min_total=2000, max_scan=2)  # type: ignore
+
+    assert page == []
+    assert last is not None
+    page, last = crud.list_carts(10, after=last, min_total=2000)  # type: ignore
+
+    assert page == [carts[3]]
+    assert last is None
+
+
 class TestUpdateCartWithProduct:
     """
     Tests cart update by Id :func:`lana_store.crud.cart.update_cart_with_product`.
@@ -62,12 +117,109 @@ class TestUpdateCartWithProduct:
         assert not cart
 
 
+class TestConditionalUpdates:
+    """
+    Tests the compare-and-set of cart updates with an expected version.
+    """
+
+    def test_with_current_version(self, cart_with_pen: Cart) -> None:
+        """
+        Test that the change applies when the cart is at the expected version.
+        """
+        cart = crud.update_cart_with_product(str(cart_with_pen.id), "MUG", expected_version=0)
+
+        assert cart and cart.products == ["PEN", "MUG"]
+        assert cart.version == 1
+
+    def test_with_stale_version(self, carts_db: CartStore, cart_with_pen: Cart) -> None:
+        """
+        Test that the change is rejected when the cart changed meanwhile.
+        """
+        crud.update_cart_with_product(str(cart_with_pen.id), "MUG")
+
+        with pytest.raises(VersionConflictError) as exc_info:
+            crud.update_cart_products(str(cart_with_pen.id), [("PEN", 1)], expected_version=0)
+
+        assert exc_info.value.version == 1
+        assert carts_db.get(str(cart_with_pen.id)).products == ["PEN", "MUG"]  # type: ignore
+
+    def test_no_lost_updates(self, carts_db: CartStore, cart_with_pen: Cart) -> None:
+        """
+        Test that concurrent writers retrying on conflicts never lose an update.
+        """
+        id, writers, writes = str(cart_with_pen.id), 8, 50
+
+        def write() -> None:
+            for _ in range(writes):
+                while True:
+                    version = crud.get_cart_by_id(id).version  # type: ignore
+                    try:
+                        crud.update_cart_with_product(id, "MUG", expected_version=version)
+                        break
+                    except VersionConflictError:
+                        pass
+
+        threads = [threading.Thread(target=write) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        cart = carts_db.get(id)
+        assert cart and cart.quantities == {"PEN": 1, "MUG": writers * writes}
+        assert cart.version == writers * writes
+
+
+class TestUpdateCartProducts:
+    """
+    Tests bulk cart updates :func:`lana_store.crud.cart.update_cart_products`.
+    """
+
+    def test_when_cart_exists(self, cart_with_pen: Cart) -> None:
+        """
+        Test adding and removing many products at once.
+        """
+        cart = crud.update_cart_products(
+            str(cart_with_pen.id), add=[("MUG", 50), ("PEN", 1)], remove=[("PEN", 2)]
+        )
+
+        assert cart
+        assert cart.quantities == {"MUG": 50}
+        assert cart.total == 50 * 750
+
+    def test_when_cart_does_not_exist(self) -> None:
+        """
+        Test updating a nonexistent cart.
+        """
+        assert crud.update_cart_products("invalid-id", add=[("MUG", 1)]) is None
+
+
+def test_run_cart_operations(cart_with_pen: Cart, carts_db: CartStore) -> None:
+    """
+    Tests batches of operations :func:`lana_store.crud.cart.run_cart_operations`
+    run in order.
+    """
+    id = str(cart_with_pen.id)
+    results = crud.run_cart_operations(
+        [("create", None), ("create", None), ("get", id), ("delete", id), ("get", id)]
+    )
+
+    assert len(results) == 5
+    first, second = results[0], results[1]
+    assert first is not None and second is not None
+    assert first.id != second.id
+    assert results[2] == cart_with_pen
+    assert results[3] == cart_with_pen
+    assert results[4] is None
+    assert len(carts_db) == 2
+
+
 class TestRemoveCart:
     """
     Tests cart removal :func:`lana_store.crud.cart.remove_cart`.
     """
 
-    def test_when_cart_exists(self, carts_db: Dict[str, Cart], cart_with_pen: Cart) -> None:
+    def test_when_cart_exists(self, carts_db: CartStore, cart_with_pen: Cart) -> None:
         """
         The when deleting an existent cart.
         """
@@ -84,3 +236,169 @@ class TestRemoveCart:
         cart = crud.remove_cart("eb1167b3-67a9-c378-7c65-c1e582e2e662")
 
         assert not cart
+
+
+def test_changes_are_journaled(
+    tmp_path: Path, monkeypatch: MonkeyPatch, carts_db: CartStore
+) -> None:
+    """
+    Test that the CRUD changes are logged when the journal is enabled.
+    """
+    journal = CartJournal(carts_db, str(tmp_path), fsync="always")
+    journal.open()
+    monkeypatch.setattr(lana_store, "journal", journal)
+
+    cart = crud.create_new_cart()
+    crud.update_cart_with_product(str(cart.id), "MUG")
+    crud.remove_cart(str(crud.create_new_cart().id))
+    journal.close()
+
+    assert journal.seq == 4
+    assert os.path.getsize(tmp_path / LOG_FILE) == 4 * RECORD_SIZE
+
+
+def test_import_carts_is_snapshotted(
+    tmp_path: Path, monkeypatch: MonkeyPatch, carts_db: CartStore, cart_with_pen: Cart
+) -> None:
+    """
+    Test that imported carts replace the existing ones and survive a restart
+    when the journal is enabled :func:`lana_store.crud.cart.import_carts`.
+    """
+    journal = CartJournal(carts_db, str(tmp_path), fsync="always")
+    journal.open()
+    monkeypatch.setattr(lana_store, "journal", journal)
+    other = Cart()
+
+    imported = crud.import_carts([(cart_with_pen.key, 3, b"\x02"), (other.key, 0, b"")])
+    journal.close()
+
+    assert imported == 2
+    assert carts_db.get(str(cart_with_pen.id)).products == ["MUG"]  # type: ignore
+    carts_db.clear()
+    recovered = CartJournal(carts_db, str(tmp_path))
+    recovered.open()
+    recovered.close()
+    assert len(carts_db) == 2
+    assert carts_db.get(str(cart_with_pen.id)).version == 4  # type: ignore
+
+
+def test_import_carts_replaced(
+    monkeypatch: MonkeyPatch, carts_db: CartStore, cart_with_pen: Cart
+) -> None:
+    """
+    Test that replaced carts take a version after both the stored and the
+    imported ones, and that their subscribers get the whole cart.
+    """
+    events: List[bytes] = []
+    monkeypatch.setattr(lana_store.events, "watched", lambda key: True)
+    monkeypatch.setattr(
+        lana_store.events, "publish", lambda key, message, last: events.append(message)
+    )
+    id = str(cart_with_pen.id)
+    crud.update_cart_with_product(id, "MUG")
+    crud.update_cart_with_product(id, "MUG")
+
+    crud.import_carts([(cart_with_pen.key, 1, b"\x01")])
+
+    cart = carts_db.get(id)
+    assert cart.products == ["TSHIRT"]  # type: ignore
+    assert cart.version == 3  # type: ignore
+    assert events[-1] == (
+        b'event: cart\ndata: {"products":["TSHIRT"],"total":"20.00","version":3}\nid: 3\n\n'
+    )
+
+    crud.import_carts([(cart_with_pen.key, 7, b"")])
+
+    assert carts_db.get(id).version == 8  # type: ignore
+
+
+def test_changes_are_analyzed(monkeypatch: MonkeyPatch, cart_with_pen: Cart) -> None:
+    """
+    Test that applied changes reach the carts analytics, including the carts
+    replaced by imports, and that rejected changes do not.
+    """
+    analytics = CartAnalytics()
+    analytics.load([tuple(cart_with_pen.counts)])
+    # Added right away instead of by the consumer
+    monkeypatch.setattr(analytics, "publish", analytics.apply)
+    monkeypatch.setattr(lana_store, "analytics", analytics)
+
+    cart = crud.create_new_cart()
+    crud.update_cart_with_product(str(cart.id), "PEN")
+    with pytest.raises(VersionConflictError):
+        crud.update_cart_products(str(cart.id), add=[("MUG", 1)], expected_version=0)
+    crud.import_carts([(cart_with_pen.key, 3, b"\x01")])
+
+    assert analytics.carts == 2
+    assert analytics.units == [1, 1, 0]
+
+    crud.remove_cart(str(cart.id))
+
+    assert analytics.carts == 1
+    assert analytics.units == [0, 1, 0]
+    assert analytics.revenue == 2000
+
+
+def test_expire_carts(monkeypatch: MonkeyPatch, carts_db: CartStore) -> None:
+    """
+    Tests :func:`lana_store.crud.cart.expire_carts` deletes the carts not
+    accessed within the TTL.
+    """
+    now = [0.0]
+    monkeypatch.setattr(lana_store, "expiry", CartExpiry(ttl=10, clock=lambda: now[0]))
+
+    abandoned = crud.create_new_cart()
+    active = crud.create_new_cart()
+    now[0] = 8
+    crud.get_cart_by_id(str(active.id))
+    now[0] = 12
+
+    assert crud.expire_carts() == 1
+    assert carts_db.get(str(abandoned.id)) is None
+    assert carts_db.get(str(active.id)) is not None
+
+
+def test_max_carts_evicts_least_recently_used(
+    monkeypatch: MonkeyPatch, carts_db: CartStore
+) -> None:
+    """
+    Tests creating carts beyond the cap deletes the least recently used ones.
+    """
+    monkeypatch.setattr(lana_store, "expiry", CartExpiry(max_carts=2))
+
+    first = crud.create_new_cart()
+    second = crud.create_new_cart()
+    crud.update_cart_with_product(str(first.id), "PEN")
+    crud.create_new_cart()
+
+    assert len(carts_db) == 2
+    assert carts_db.get(str(first.id)) is not None
+    assert carts_db.get(str(second.id)) is None
+
+
+@pytest.mark.parametrize("fsync", ["always", "interval"])
+def test_run_change(
+    tmp_path: Path, monkeypatch: MonkeyPatch, carts_db: CartStore, fsync: str
+) -> None:
+    """
+    Test that changes run from the event loop only run in a thread with the
+    `always` fsync policy :func:`lana_store.crud.cart.run_change`.
+    """
+    journal = CartJournal(carts_db, str(tmp_path), fsync=fsync)  # type: ignore
+    journal.open()
+    monkeypatch.setattr(lana_store, "journal", journal)
+
+    def create_cart() -> int:
+        crud.create_new_cart()
+        return threading.get_ident()
+
+    loop = asyncio.new_event_loop()
+    try:
+        thread = loop.run_until_complete(crud.run_change(create_cart))
+    finally:
+        loop.close()
+        journal.close()
+
+    assert (thread != threading.get_ident()) == (fsync == "always")
+    assert journal.synced_seq == 1
+    assert len(carts_db) == 1
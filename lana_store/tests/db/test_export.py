@@ -0,0 +1,83 @@
+import struct
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from lana_store.db.export import export_carts, ExportError, MAGIC, read_export
+from lana_store.models.cart import Cart
+
+
+def write_export(path: Path, carts: List[Cart]) -> None:
+    path.write_bytes(b"".join(export_carts(carts)))
+
+
+def test_export_roundtrip(tmp_path: Path) -> None:
+    """
+    Test that exported carts are read back with their units per product and version.
+    """
+    carts = [Cart(products=["PEN", "MUG", "PEN"]), Cart(), Cart(products=["TSHIRT"])]
+    carts[0].version = 7
+    path = tmp_path / "carts.lcex"
+    write_export(path, carts)
+
+    with open(path, "rb") as file:
+        read = list(read_export(file))
+
+    assert [key for key, _, _ in read] == [cart.key for cart in carts]
+    assert [version for _, version, _ in read] == [7, 0, 0]
+    # Units are grouped per product
+    assert [Cart.from_lines(key, lines).products for key, _, lines in read] == [
+        ["PEN", "PEN", "MUG"],
+        [],
+        ["TSHIRT"],
+    ]
+
+
+def test_export_empty(tmp_path: Path) -> None:
+    """
+    Test that an export without carts is valid.
+    """
+    path = tmp_path / "carts.lcex"
+    write_export(path, [])
+
+    with open(path, "rb") as file:
+        assert list(read_export(file)) == []
+
+
+def test_export_other_product_order(tmp_path: Path) -> None:
+    """
+    Test that the units are mapped to the products by code.
+    """
+    cart = Cart()
+    codes = b"MUG,PEN"
+    path = tmp_path / "carts.lcex"
+    header = struct.pack("<4sHH", MAGIC, 1, len(codes)) + codes
+    path.write_bytes(header + struct.pack("<16sIII", cart.key, 1, 2, 1))
+
+    with open(path, "rb") as file:
+        ((key, version, lines),) = read_export(file)
+
+    assert Cart.from_lines(key, lines, version).quantities == {"MUG": 2, "PEN": 1}
+
+
+@pytest.mark.parametrize(
+    "data, error",
+    [
+        (b"", "Invalid export header"),
+        (b"LCSN\x01\x00\x00\x00", "Unsupported export format"),
+        (b"LCEX\x01\x00\x06\x00PENCIL", "Unknown products: PENCIL"),
+        (b"LCEX\x01\x00\x03\x00P\xe9N", "Invalid export header"),
+        (b"LCEX\x01\x00\x03\x00PEN" + bytes(23), "Truncated export"),
+        (b"LCEX\x01\x00\x03\x00PEN" + bytes(20) + b"\xff" * 4, "more than 1000000 units"),
+    ],
+)
+def test_export_invalid(tmp_path: Path, data: bytes, error: str) -> None:
+    """
+    Test that invalid exports are rejected before reading any cart.
+    """
+    path = tmp_path / "carts.lcex"
+    path.write_bytes(data)
+
+    with open(path, "rb") as file, pytest.raises(ExportError, match=error):
+        read_export(file)
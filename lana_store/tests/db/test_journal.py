@@ -0,0 +1,254 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
+from lana_store.db.journal import (
+    CartJournal,
+    LOG_FILE,
+    OP_ADD_PRODUCT,
+    OP_CREATE,
+    OP_REMOVE,
+    OP_REMOVE_PRODUCT,
+    PREVIOUS_LOG_FILE,
+    RECORD_SIZE,
+    SNAPSHOT_FILE,
+)
+from lana_store.db.memory import ShardedCartStore
+from lana_store.db.snapshot import SnapshotError, write_snapshot
+from lana_store.models.cart import Cart
+
+
+def run_changes(journal: CartJournal) -> Cart:
+    """
+    Creates 2 carts, adds products to both and removes the second one.
+
+    :return: The remaining cart.
+    """
+    store = journal.store
+    first, second = Cart(), Cart()
+    for cart in (first, second):
+        journal.apply(OP_CREATE, lambda: (store.add(cart), cart)[1])  # type: ignore
+
+    for product in ("PEN", "MUG", "PEN"):
+        journal.apply(
+            OP_ADD_PRODUCT,
+            lambda: store.update(str(first.id), lambda c: c.add_product(product)),  # type: ignore
+            product,  # type: ignore
+        )
+    journal.apply(
+        OP_ADD_PRODUCT,
+        lambda: store.update(str(second.id), lambda c: c.add_product("MUG")),
+        "MUG",
+    )
+    journal.apply(OP_REMOVE, lambda: store.pop(str(second.id)))
+
+    return first
+
+
+def recover(directory: Path) -> ShardedCartStore:
+    """
+    Opens (and closes) a journal over an empty store.
+
+    :return: The recovered store.
+    """
+    store = ShardedCartStore()
+    journal = CartJournal(store, str(directory))
+    journal.open()
+    journal.close()
+
+    return store
+
+
+@pytest.mark.parametrize("fsync", ["always", "interval", "never"])
+def test_recover_from_log(tmp_path: Path, fsync: str) -> None:
+    """
+    Test that the carts are rebuilt from the log with every fsync policy.
+    """
+    journal = CartJournal(ShardedCartStore(), str(tmp_path), fsync=fsync)  # type: ignore
+    journal.open()
+    cart = run_changes(journal)
+    journal.close()
+
+    store = recover(tmp_path)
+
+    assert len(store) == 1
+    assert store.get(str(cart.id)).products == ["PEN", "MUG", "PEN"]  # type: ignore
+
+
+def test_recover_from_snapshot_and_log(tmp_path: Path) -> None:
+    """
+    Test that the carts are rebuilt from a snapshot plus the records after it.
+    """
+    journal = CartJournal(ShardedCartStore(), str(tmp_path))
+    journal.open()
+    cart = run_changes(journal)
+    assert journal.snapshot() == 1
+    assert not os.path.getsize(tmp_path / LOG_FILE)
+
+    journal.apply(
+        OP_ADD_PRODUCT,
+        lambda: journal.store.update(str(cart.id), lambda c: c.add_product("TSHIRT")),
+        "TSHIRT",
+    )
+    journal.close()
+
+    store = recover(tmp_path)
+
+    assert len(store) == 1
+    assert store.get(str(cart.id)).products == ["PEN", "MUG", "PEN", "TSHIRT"]  # type: ignore
+    assert store.get(str(cart.id)).total == 3250  # type: ignore
+    assert store.get(str(cart.id)).version == 4  # type: ignore
+
+
+def test_snapshot_does_not_block_changes(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that changes go on while a snapshot is written, and are recovered
+    from the new log on top of the snapshot.
+    """
+    journal = CartJournal(ShardedCartStore(), str(tmp_path), fsync="always")
+    journal.open()
+    cart = run_changes(journal)
+
+    def add_tshirt() -> None:
+        journal.apply(
+            OP_ADD_PRODUCT,
+            lambda: journal.store.update(str(cart.id), lambda c: c.add_product("TSHIRT")),
+            "TSHIRT",
+        )
+
+    def concurrent_write_snapshot(*args: Any) -> int:
+        writer = threading.Thread(target=add_tshirt)
+        writer.start()
+        writer.join(1)
+        assert not writer.is_alive()
+        return write_snapshot(*args)
+
+    monkeypatch.setattr("lana_store.db.journal.write_snapshot", concurrent_write_snapshot)
+    assert journal.snapshot() == 1
+    journal.close()
+
+    assert not os.path.exists(tmp_path / PREVIOUS_LOG_FILE)
+    assert os.path.getsize(tmp_path / LOG_FILE) == RECORD_SIZE
+    store = recover(tmp_path)
+    assert store.get(str(cart.id)).products == ["PEN", "MUG", "PEN", "TSHIRT"]  # type: ignore
+
+
+def test_recover_from_interrupted_snapshot(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the former log is replayed when the process stops before the
+    snapshot is written, and a snapshot written on recovery.
+    """
+    journal = CartJournal(ShardedCartStore(), str(tmp_path))
+    journal.open()
+    cart = run_changes(journal)
+
+    def interrupted(*args: Any) -> int:
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr("lana_store.db.journal.write_snapshot", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        journal.snapshot()
+    monkeypatch.undo()
+    journal.apply(
+        OP_ADD_PRODUCT,
+        lambda: journal.store.update(str(cart.id), lambda c: c.add_product("MUG")),
+        "MUG",
+    )
+    journal.close()
+
+    assert os.path.exists(tmp_path / PREVIOUS_LOG_FILE)
+    store = recover(tmp_path)
+
+    assert store.get(str(cart.id)).products == ["PEN", "MUG", "PEN", "MUG"]  # type: ignore
+    assert not os.path.exists(tmp_path / PREVIOUS_LOG_FILE)
+    assert not os.path.getsize(tmp_path / LOG_FILE)
+    store = recover(tmp_path)
+    assert store.get(str(cart.id)).products == ["PEN", "MUG", "PEN", "MUG"]  # type: ignore
+
+
+def test_recover_with_torn_record(tmp_path: Path) -> None:
+    """
+    Test that a partially written record at the end of the log is discarded.
+    """
+    journal = CartJournal(ShardedCartStore(), str(tmp_path))
+    journal.open()
+    cart = run_changes(journal)
+    journal.close()
+
+    with open(tmp_path / LOG_FILE, "ab") as file:
+        file.write(b"\x07\x00\x00")
+
+    store = recover(tmp_path)
+
+    assert store.get(str(cart.id)).products == ["PEN", "MUG", "PEN"]  # type: ignore
+    assert os.path.getsize(tmp_path / LOG_FILE) % 30 == 0
+
+
+def test_failed_changes_are_not_logged(tmp_path: Path) -> None:
+    """
+    Test that operations that did not apply are not logged.
+    """
+    journal = CartJournal(ShardedCartStore(), str(tmp_path))
+    journal.open()
+
+    assert journal.apply(OP_REMOVE, lambda: journal.store.pop("invalid-id")) is None
+    journal.close()
+
+    assert not os.path.getsize(tmp_path / LOG_FILE)
+
+
+def test_invalid_fsync_policy(tmp_path: Path) -> None:
+    """
+    Test that unknown fsync policies are rejected.
+    """
+    with pytest.raises(ValueError):
+        CartJournal(ShardedCartStore(), str(tmp_path), fsync="sometimes")  # type: ignore
+
+
+def test_recover_from_truncated_snapshot(tmp_path: Path) -> None:
+    """
+    Test that a truncated snapshot is reported.
+    """
+    journal = CartJournal(ShardedCartStore(), str(tmp_path))
+    journal.open()
+    run_changes(journal)
+    journal.snapshot()
+    journal.close()
+
+    with open(tmp_path / SNAPSHOT_FILE, "r+b") as file:
+        file.truncate(os.path.getsize(tmp_path / SNAPSHOT_FILE) - 1)
+
+    with pytest.raises(SnapshotError):
+        recover(tmp_path)
+
+
+def test_recover_bulk_changes(tmp_path: Path) -> None:
+    """
+    Test that changes logged as several records are replayed, and discarded
+    altogether when the log ends in the middle of them.
+    """
+    journal = CartJournal(ShardedCartStore(), str(tmp_path))
+    journal.open()
+    cart = run_changes(journal)
+    records = [(OP_ADD_PRODUCT, "MUG"), (OP_ADD_PRODUCT, "MUG"), (OP_REMOVE_PRODUCT, "PEN")]
+    journal.apply_many(
+        lambda: journal.store.update(
+            str(cart.id), lambda c: c.update_products([("MUG", 2)], [("PEN", 1)])
+        ),
+        records,  # type: ignore
+    )
+    journal.close()
+
+    store = recover(tmp_path)
+    assert store.get(str(cart.id)).products == ["PEN", "MUG", "MUG", "MUG"]  # type: ignore
+
+    # Crash before the last record of the bulk change was written
+    with open(tmp_path / LOG_FILE, "r+b") as file:
+        file.truncate(os.path.getsize(tmp_path / LOG_FILE) - 30)
+
+    store = recover(tmp_path)
+    assert store.get(str(cart.id)).products == ["PEN", "MUG", "PEN"]  # type: ignore
@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from lana_store.db.memory import ShardedCartStore
+from lana_store.models.cart import Cart
+
+
+@pytest.fixture
+def store() -> ShardedCartStore:
+    """
+    Empty store with a few shards.
+    """
+    return ShardedCartStore(shards=4)
+
+
+def test_invalid_number_of_shards() -> None:
+    """
+    Test that a store needs at least one shard.
+    """
+    with pytest.raises(ValueError):
+        ShardedCartStore(shards=0)
+
+
+def test_add_and_get(store: ShardedCartStore) -> None:
+    """
+    Test cart storage and retrieval :func:`lana_store.db.memory.ShardedCartStore.get`.
+    """
+    carts = [Cart() for _ in range(20)]
+    for cart in carts:
+        store.add(cart)
+
+    assert len(store) == 20
+    assert store.get(str(carts[3].id)) is carts[3]
+    assert store.get("invalid-id") is None
+    assert store.get_many([str(carts[0].id), "invalid-id"]) == [carts[0], None]
+    assert sorted(str(cart.id) for cart in store.values()) == sorted(str(c.id) for c in carts)
+
+
+def test_add_many(store: ShardedCartStore) -> None:
+    """
+    Test that :func:`lana_store.db.memory.ShardedCartStore.add_many`
+    replaces the carts with the same Ids.
+    """
+    cart = Cart(products=["PEN"])
+    store.add(cart)
+    replacement = Cart(id=cart.id, products=["MUG", "MUG"])
+    other = Cart(products=["TSHIRT"])
+
+    store.add_many([replacement, other])
+
+    assert len(store) == 2
+    assert store.get(str(cart.id)).products == ["MUG", "MUG"]  # type: ignore
+    assert store.get(str(other.id)) == other
+
+
+class TestUpdate:
+    """
+    Set of tests for :func:`lana_store.db.memory.ShardedCartStore.update`.
+    """
+
+    def test_when_cart_exists(self, store: ShardedCartStore) -> None:
+        """
+        Test the mutation is applied.
+        """
+        cart = Cart()
+        store.add(cart)
+
+        assert store.update(str(cart.id), lambda c: c.add_product("MUG")) is cart
+        assert cart.products == ["MUG"]
+
+    def test_when_cart_does_not_exist(self, store: ShardedCartStore) -> None:
+        """
+        Test the mutation is not applied.
+        """
+        assert store.update("invalid-id", lambda c: c.add_product("MUG")) is None
+
+    def test_from_several_threads(self, store: ShardedCartStore) -> None:
+        """
+        Test that concurrent updates of the same cart are not lost.
+        """
+        cart = Cart()
+        store.add(cart)
+
+        def add_pens() -> None:
+            for _ in range(500):
+                store.update(str(cart.id), lambda c: c.add_product("PEN"))
+
+        threads = [threading.Thread(target=add_pens) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(cart.products) == 4000
+        assert cart.quantities["PEN"] == 4000
+        assert cart.total == Cart(products=cart.products).total
+
+
+def test_pop_and_clear(store: ShardedCartStore) -> None:
+    """
+    Test cart removal :func:`lana_store.db.memory.ShardedCartStore.pop`.
+    """
+    first, second = Cart(), Cart()
+    store.add(first)
+    store.add(second)
+
+    assert store.pop(str(first.id)) is first
+    assert store.pop(str(first.id)) is None
+    assert len(store) == 1
+
+    store.clear()
+
+    assert not len(store)
@@ -0,0 +1,268 @@
+import multiprocessing
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, Generator, List
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
+from lana_store.db import shm
+from lana_store.db.base import StoreFullError
+from lana_store.db.shm import EMPTY, SharedMemoryCartStore
+from lana_store.models.cart import Cart
+
+
+@pytest.fixture
+def store() -> Generator[SharedMemoryCartStore, None, None]:
+    """
+    Empty store with a few slots.
+    """
+    store = SharedMemoryCartStore(capacity=8, max_lines=4, stripes=2)
+    yield store
+    store.close()
+
+
+def test_add_and_get(store: SharedMemoryCartStore) -> None:
+    """
+    Test cart storage and retrieval :func:`lana_store.db.shm.SharedMemoryCartStore.get`.
+    """
+    carts = [Cart(products=["PEN", "MUG"]), Cart()]
+    for cart in carts:
+        store.add(cart)
+
+    assert len(store) == 2
+    assert store.get(str(carts[0].id)) == carts[0]
+    assert store.get(str(carts[0].id)).total == 1250  # type: ignore
+    assert store.get("invalid-id") is None
+    assert store.get_many([str(carts[1].id), "invalid-id"]) == [carts[1], None]
+    assert sorted(str(cart.id) for cart in store.values()) == sorted(str(c.id) for c in carts)
+
+
+def test_add_many(store: SharedMemoryCartStore) -> None:
+    """
+    Test that :func:`lana_store.db.shm.SharedMemoryCartStore.add_many`
+    replaces the carts with the same Ids.
+    """
+    cart = Cart(products=["PEN"])
+    store.add(cart)
+    replacement = Cart(id=cart.id, products=["MUG", "MUG"])
+    other = Cart(products=["TSHIRT"])
+
+    store.add_many([replacement, other])
+
+    assert len(store) == 2
+    assert store.get(str(cart.id)).products == ["MUG", "MUG"]  # type: ignore
+    assert store.get(str(other.id)) == other
+
+
+def test_when_full(store: SharedMemoryCartStore) -> None:
+    """
+    Test the limits on number of carts and products.
+    """
+    with pytest.raises(StoreFullError):
+        store.add(Cart(products=["PEN"] * 5))
+
+    cart = Cart(products=["PEN"] * 4)
+    store.add(cart)
+    with pytest.raises(StoreFullError):
+        store.update(str(cart.id), lambda c: c.add_product("PEN"))
+
+    for _ in range(7):
+        store.add(Cart())
+    with pytest.raises(StoreFullError):
+        store.add(Cart())
+
+    assert len(store) == 8
+
+
+def test_update(store: SharedMemoryCartStore) -> None:
+    """
+    Test cart modification :func:`lana_store.db.shm.SharedMemoryCartStore.update`.
+    """
+    cart = Cart(products=["PEN"])
+    store.add(cart)
+
+    updated = store.update(str(cart.id), lambda c: c.add_product("MUG"))
+
+    assert updated and updated.products == ["PEN", "MUG"]
+    assert store.get(str(cart.id)).products == ["PEN", "MUG"]  # type: ignore
+    assert store.get(str(cart.id)).version == 1  # type: ignore
+    assert store.update(str(Cart().id), lambda c: c.add_product("MUG")) is None
+    assert store.update("invalid-id", lambda c: c.add_product("MUG")) is None
+
+
+def test_pop_and_clear(store: SharedMemoryCartStore) -> None:
+    """
+    Test cart removal :func:`lana_store.db.shm.SharedMemoryCartStore.pop`.
+    """
+    carts = [Cart(products=["MUG"]) for _ in range(6)]
+    for cart in carts:
+        store.add(cart)
+
+    assert store.pop(str(carts[0].id)) == carts[0]
+    assert store.pop(str(carts[0].id)) is None
+    assert store.pop("invalid-id") is None
+    assert len(store) == 5
+    # Removed slots do not break the probing chains
+    assert all(store.get(str(cart.id)) == cart for cart in carts[1:])
+
+    store.add(carts[0])
+    assert len(store) == 6
+
+    store.clear()
+
+    assert not len(store)
+    assert store.get(str(carts[1].id)) is None
+
+
+def test_churn(store: SharedMemoryCartStore) -> None:
+    """
+    Test that removals shift the probing chains back instead of leaving
+    tombstones, so the table empties out after any churn.
+    """
+    rand = random.Random(42)
+    carts: Dict[str, Cart] = {}
+    for _ in range(2000):
+        if len(carts) < 7 and rand.random() < 0.6:
+            cart = Cart(products=["PEN"])
+            store.add(cart)
+            carts[str(cart.id)] = cart
+        elif carts:
+            id = rand.choice(sorted(carts))
+            assert store.pop(id) == carts.pop(id)
+
+        assert len(store) == len(carts)
+        assert all(store.get(id) == cart for id, cart in carts.items())
+        assert sorted(str(cart.id) for cart in store.values()) == sorted(carts)
+
+    for id in list(carts):
+        store.pop(id)
+
+    assert all(store._read(slot)[0] == EMPTY for slot in range(store.capacity))
+
+
+def same_home_cart(index: int) -> Cart:
+    """
+    Cart with its home slot at the start of any table of 8 slots.
+    """
+    return Cart(id=uuid.UUID(bytes=bytes([8 * index]) + bytes(15)))
+
+
+def test_lookups_during_churn(store: SharedMemoryCartStore) -> None:
+    """
+    Test that carts shifted by concurrent removals are always found.
+    """
+    # All with the same home slot: every removal shifts the carts after it
+    others, carts = [same_home_cart(i) for i in range(4)], [same_home_cart(i) for i in range(4, 7)]
+    for cart in others + carts:
+        store.add(cart)
+
+    def churn() -> None:
+        # Removing the carts added before shifts the others back
+        for _ in range(2000):
+            for other in others:
+                store.pop(str(other.id))
+                store.add(other)
+
+    ctx = multiprocessing.get_context("fork")
+    worker = ctx.Process(target=churn)
+    worker.start()
+    misses = 0
+    while worker.is_alive():
+        misses += sum(store.get(str(cart.id)) is None for cart in carts)
+    worker.join()
+
+    assert worker.exitcode == 0
+    assert not misses
+
+
+def test_killed_writer(store: SharedMemoryCartStore, monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that readers recover the slots left locked by a writer killed while
+    writing them, instead of hanging.
+    """
+    monkeypatch.setattr(shm, "READ_SPINS", 10)
+    monkeypatch.setattr(shm, "WRITER_TIMEOUT_SECONDS", 0.01)
+    cart = Cart(products=["PEN"])
+    store.add(cart)
+    slot = store._find(cart.key)
+    assert slot is not None
+
+    def die_writing() -> None:
+        # As _write leaves it: slot lock taken, writer pid and odd sequence
+        store._stripe(slot).acquire()  # type: ignore
+        offset = store._offset(slot)  # type: ignore
+        seq = shm._SEQ.unpack_from(store._buf, offset)[0]
+        shm._OWNER.pack_into(store._buf, offset, seq + 1, os.getpid())
+        os._exit(0)
+
+    writer = multiprocessing.get_context("fork").Process(target=die_writing)
+    writer.start()
+    writer.join()
+
+    assert store.get(str(cart.id)) == cart
+    assert store.update(str(cart.id), lambda c: c.add_product("MUG")).products == [  # type: ignore
+        "PEN",
+        "MUG",
+    ]
+
+
+def test_slow_writer(store: SharedMemoryCartStore, monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that readers keep waiting for the writers still running, however
+    slow, instead of taking their slot lock.
+    """
+    monkeypatch.setattr(shm, "READ_SPINS", 10)
+    monkeypatch.setattr(shm, "WRITER_TIMEOUT_SECONDS", 0.01)
+    cart = Cart(products=["PEN"])
+    store.add(cart)
+    writing = threading.Event()
+    errors: List[BaseException] = []
+    head = shm._SLOT_HEAD
+
+    class SlowHead:
+        size = head.size
+        unpack_from = head.unpack_from
+
+        def pack_into(self, *args: Any) -> None:
+            writing.set()
+            time.sleep(0.2)
+            head.pack_into(*args)
+
+    def write() -> None:
+        try:
+            store.update(str(cart.id), lambda c: c.add_product("MUG"))
+        except BaseException as exc:
+            errors.append(exc)
+
+    monkeypatch.setattr(shm, "_SLOT_HEAD", SlowHead())
+    writer = threading.Thread(target=write)
+    writer.start()
+    writing.wait(5)
+
+    assert store.get(str(cart.id)).products == ["PEN", "MUG"]  # type: ignore
+    writer.join()
+    assert not errors
+
+
+def test_shared_between_processes(store: SharedMemoryCartStore) -> None:
+    """
+    Test that changes from forked processes are visible to each other.
+    """
+    cart = Cart()
+    store.add(cart)
+
+    def add_pen() -> None:
+        store.update(str(cart.id), lambda c: c.add_product("PEN"))
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=add_pen) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert store.get(str(cart.id)).products == ["PEN"] * 4  # type: ignore
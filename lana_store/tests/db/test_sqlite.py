@@ -0,0 +1,271 @@
+import multiprocessing
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
+from lana_store.db.sqlite import SQLiteCartStore
+from lana_store.models.cart import Cart
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> Generator[SQLiteCartStore, None, None]:
+    """
+    Empty store on a temporary database.
+    """
+    store = SQLiteCartStore(str(tmp_path / "carts.sqlite3"), pool_size=4)
+    yield store
+    store.close()
+
+
+def test_add_and_get(store: SQLiteCartStore) -> None:
+    """
+    Test cart storage and retrieval :func:`lana_store.db.sqlite.SQLiteCartStore.get`.
+    """
+    carts = [Cart(products=["PEN", "MUG"]), Cart()]
+    for cart in carts:
+        store.add(cart)
+
+    assert len(store) == 2
+    assert store.get(str(carts[0].id)) == carts[0]
+    assert store.get(str(carts[0].id)).total == 1250  # type: ignore
+    assert store.get("invalid-id") is None
+    assert store.get_many([str(carts[1].id), "invalid-id"]) == [carts[1], None]
+    assert sorted(str(cart.id) for cart in store.values()) == sorted(str(c.id) for c in carts)
+
+
+class TestLazyLines:
+    """
+    Set of tests for the lines read on first use of :class:`lana_store.db.sqlite.SQLiteCart`.
+    """
+
+    @pytest.fixture
+    def statements(self, store: SQLiteCartStore, monkeypatch: MonkeyPatch) -> List[str]:
+        """
+        Statements run by the store from now on.
+        """
+        statements: List[str] = []
+        connect = store._connect
+
+        def traced() -> sqlite3.Connection:
+            conn = connect()
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        store.close()
+        monkeypatch.setattr(store, "_connect", traced)
+        return statements
+
+    def test_totals_and_additions(self, store: SQLiteCartStore, statements: List[str]) -> None:
+        """
+        Test that totals, versions and product additions do not read the lines.
+        """
+        cart = Cart(products=["PEN", "PEN", "MUG"])
+        store.add(cart)
+
+        fetched = store.get(str(cart.id))
+        updated = store.update(str(cart.id), lambda c: c.update_products(add=[("TSHIRT", 3)]))
+        store.update(str(cart.id), lambda c: c.add_product("PEN"))
+
+        assert fetched and (fetched.total, fetched.version) == (1250, 0)
+        assert updated and (updated.total, updated.version) == (5750, 1)
+        assert not [statement for statement in statements if "FROM cart_lines" in statement]
+        assert store.get(str(cart.id)).products == [  # type: ignore
+            "PEN", "PEN", "MUG", "TSHIRT", "TSHIRT", "TSHIRT", "PEN"
+        ]
+
+    def test_changed_meanwhile(self, store: SQLiteCartStore) -> None:
+        """
+        Test that carts changed or deleted before their lines are read take
+        their new state, or list the products in product order.
+        """
+        cart = Cart(products=["MUG", "PEN"])
+        store.add(cart)
+        changed, deleted = store.get(str(cart.id)), store.get(str(cart.id))
+        store.update(str(cart.id), lambda c: c.add_product("TSHIRT"))
+
+        assert changed and changed.products == ["MUG", "PEN", "TSHIRT"]
+        assert (changed.version, changed.total) == (1, 3250)
+
+        store.pop(str(cart.id))
+
+        assert deleted and deleted.products == ["PEN", "MUG"]
+        assert deleted.version == 0
+
+
+def test_add_many(store: SQLiteCartStore) -> None:
+    """
+    Test that :func:`lana_store.db.sqlite.SQLiteCartStore.add_many`
+    replaces the carts with the same Ids.
+    """
+    cart = Cart(products=["PEN"])
+    store.add(cart)
+    replacement = Cart(id=cart.id, products=["MUG", "MUG"])
+    other = Cart(products=["TSHIRT"])
+
+    store.add_many([replacement, other])
+
+    assert len(store) == 2
+    assert store.get(str(cart.id)).products == ["MUG", "MUG"]  # type: ignore
+    assert store.get(str(other.id)) == other
+
+
+def test_shared_between_instances(tmp_path: Path) -> None:
+    """
+    Test that carts are visible from another store over the same database.
+    """
+    path = str(tmp_path / "carts.sqlite3")
+    cart = Cart(products=["TSHIRT"])
+    SQLiteCartStore(path).add(cart)
+
+    assert SQLiteCartStore(path).get(str(cart.id)) == cart
+
+
+def test_failed_commit(store: SQLiteCartStore) -> None:
+    """
+    Test that a transaction whose commit fails is rolled back, so its
+    connection is reused afterwards.
+    """
+    with store._transaction() as conn:
+        conn.execute(
+            "CREATE TABLE orphans "
+            "(cart_id BLOB REFERENCES carts (id) DEFERRABLE INITIALLY DEFERRED)"
+        )
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with store._transaction() as conn:
+            # Only checked on commit
+            conn.execute("INSERT INTO orphans VALUES (?)", (bytes(16),))
+
+    cart = Cart()
+    store.add(cart)
+
+    assert store.get(str(cart.id)) == cart
+    assert not any(conn.in_transaction for conn in store._pool.queue)
+
+
+def test_forked_process(store: SQLiteCartStore) -> None:
+    """
+    Test that a forked process opens its own connections instead of using the
+    ones of its parent.
+    """
+    cart = Cart()
+    store.add(cart)
+    (inherited,) = store._pool.queue
+
+    def update() -> None:
+        store.update(str(cart.id), lambda c: c.add_product("PEN"))
+        with store._connection() as conn:
+            os._exit(0 if conn is not inherited and store._inherited == [inherited] else 1)
+
+    child = multiprocessing.get_context("fork").Process(target=update)
+    child.start()
+    child.join()
+
+    assert child.exitcode == 0
+    assert store.get(str(cart.id)).products == ["PEN"]  # type: ignore
+
+
+class TestUpdate:
+    """
+    Set of tests for :func:`lana_store.db.sqlite.SQLiteCartStore.update`.
+    """
+
+    def test_when_cart_exists(self, store: SQLiteCartStore) -> None:
+        """
+        Test the mutation is stored.
+        """
+        cart = Cart(products=["PEN"])
+        store.add(cart)
+
+        updated = store.update(str(cart.id), lambda c: c.add_product("MUG"))
+
+        assert updated and updated.products == ["PEN", "MUG"]
+        assert store.get(str(cart.id)).products == ["PEN", "MUG"]  # type: ignore
+
+    def test_when_cart_does_not_exist(self, store: SQLiteCartStore) -> None:
+        """
+        Test the mutation is not applied.
+        """
+        assert store.update("invalid-id", lambda c: c.add_product("MUG")) is None
+        assert store.update(str(Cart().id), lambda c: c.add_product("MUG")) is None
+
+    def test_rewrites_changed_lines(self, store: SQLiteCartStore) -> None:
+        """
+        Test that lines removed or reordered by a mutation are stored.
+        """
+        cart = Cart(products=["PEN", "MUG", "TSHIRT"])
+        store.add(cart)
+
+        def replace(c: Cart) -> None:
+            del c.lines[1:]
+            c.add_product("PEN")
+
+        store.update(str(cart.id), replace)
+
+        assert store.get(str(cart.id)).products == ["PEN", "PEN"]  # type: ignore
+
+    def test_from_several_threads(self, store: SQLiteCartStore) -> None:
+        """
+        Test that concurrent updates of the same cart are not lost.
+        """
+        cart = Cart()
+        store.add(cart)
+
+        def add_pens() -> None:
+            for _ in range(25):
+                store.update(str(cart.id), lambda c: c.add_product("PEN"))
+
+        threads = [threading.Thread(target=add_pens) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert store.get(str(cart.id)).quantities["PEN"] == 200  # type: ignore
+
+
+def test_pop_and_clear(store: SQLiteCartStore) -> None:
+    """
+    Test cart removal :func:`lana_store.db.sqlite.SQLiteCartStore.pop`.
+    """
+    first, second = Cart(products=["MUG"]), Cart()
+    store.add(first)
+    store.add(second)
+
+    assert store.pop(str(first.id)) == first
+    assert store.pop(str(first.id)) is None
+    assert store.pop("invalid-id") is None
+    assert len(store) == 1
+
+    store.clear()
+
+    assert not len(store)
+
+
+def test_version_column_migration(tmp_path: Path) -> None:
+    """
+    Test that databases created before cart versions get the new column and
+    that versions are stored.
+    """
+    path = str(tmp_path / "carts.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE carts (id BLOB PRIMARY KEY, qty_pen INTEGER NOT NULL DEFAULT 0, "
+        "qty_tshirt INTEGER NOT NULL DEFAULT 0, qty_mug INTEGER NOT NULL DEFAULT 0, "
+        "line_count INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID"
+    )
+    conn.close()
+
+    store = SQLiteCartStore(path)
+    cart = Cart()
+    store.add(cart)
+    store.update(str(cart.id), lambda c: c.add_product("PEN"))
+
+    assert store.get(str(cart.id)).version == 1  # type: ignore
+    assert [c.version for c in store.values()] == [1]
+    store.close()
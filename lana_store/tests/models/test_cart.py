@@ -1,4 +1,9 @@
-from lana_store.models.cart import Cart
+from typing import List
+
+import pytest
+
+from lana_store.models.cart import Cart, cart_key, NotEnoughProductsError
+from lana_store.models.product import ProductCodes
 
 
 class TestCartTotal:
@@ -38,3 +43,107 @@ class TestCartTotal:
         cart_sample = Cart(products=["TSHIRT", "TSHIRT", "TSHIRT", "PEN", "TSHIRT"])
 
         assert cart_sample.total == 6500
+
+
+class TestCartAddProduct:
+    """
+    Set of tests for :func:`lana_store.models.cart.Cart.add_product` (incremental
+    quantities and total).
+    """
+
+    def test_keeps_products_order(self) -> None:
+        """
+        Test that products are listed in the same order they were added.
+        """
+        cart_sample = Cart(products=["MUG"])
+        cart_sample.add_product("PEN")
+        cart_sample.add_product("MUG")
+
+        assert cart_sample.products == ["MUG", "PEN", "MUG"]
+        assert cart_sample.quantities == {"MUG": 2, "PEN": 1}
+
+    def test_total_matches_full_recount(self) -> None:
+        """
+        Test that the incremental total matches the total of a cart built at once.
+        """
+        products: List[ProductCodes] = [
+            "TSHIRT", "PEN", "TSHIRT", "PEN", "MUG", "TSHIRT", "PEN", "TSHIRT"
+        ]
+
+        cart_sample = Cart()
+        for index, product in enumerate(products):
+            cart_sample.add_product(product)
+
+            assert cart_sample.total == Cart(products=products[: index + 1]).total
+
+
+class TestCartUpdateProducts:
+    """
+    Set of tests for :func:`lana_store.models.cart.Cart.update_products` (bulk
+    additions and removals).
+    """
+
+    def test_adds_and_removes_most_recent_units(self) -> None:
+        """
+        Test that additions go first and the most recently added units are removed.
+        """
+        cart_sample = Cart(products=["PEN", "MUG", "PEN"])
+        cart_sample.update_products(add=[("MUG", 2), ("TSHIRT", 3)], remove=[("PEN", 1)])
+
+        assert cart_sample.products == ["PEN", "MUG", "MUG", "MUG", "TSHIRT", "TSHIRT", "TSHIRT"]
+        assert cart_sample.total == Cart(products=cart_sample.products).total
+
+    def test_removing_too_many_units(self) -> None:
+        """
+        Test that the cart is left untouched when removing more units than it has.
+        """
+        cart_sample = Cart(products=["PEN", "MUG"])
+
+        with pytest.raises(NotEnoughProductsError):
+            cart_sample.update_products(add=[("PEN", 2)], remove=[("MUG", 2)])
+
+        assert cart_sample.products == ["PEN", "MUG"]
+        assert cart_sample.quantities == {"PEN": 1, "MUG": 1}
+        assert cart_sample.total == 1250
+
+
+def test_version_bumped_on_every_change() -> None:
+    """
+    Test that every change of :class:`lana_store.models.cart.Cart` bumps its version.
+    """
+    cart_sample = Cart(products=["PEN"])
+    assert cart_sample.version == 0
+
+    cart_sample.add_product("MUG")
+    cart_sample.update_products(add=[("PEN", 2)], remove=[("MUG", 1)])
+
+    assert cart_sample.version == 2
+    assert Cart.from_lines(cart_sample.key, bytes(cart_sample.lines), 2).version == 2
+
+
+class TestCartRepresentation:
+    """
+    Set of tests for the compact representation of :class:`lana_store.models.cart.Cart`.
+    """
+
+    def test_from_lines(self) -> None:
+        """
+        Test that a cart rebuilt from its stored representation is the same cart.
+        """
+        cart_sample = Cart(products=["TSHIRT", "PEN", "TSHIRT", "TSHIRT"])
+        restored = Cart.from_lines(cart_sample.key, bytes(cart_sample.lines))
+
+        assert restored == cart_sample
+        assert restored.id == cart_sample.id
+        assert restored.products == ["TSHIRT", "PEN", "TSHIRT", "TSHIRT"]
+        assert restored.total == cart_sample.total == 5000
+
+    def test_cart_key(self) -> None:
+        """
+        Test the conversion of cart Ids into keys :func:`lana_store.models.cart.cart_key`.
+        """
+        cart_sample = Cart()
+
+        assert cart_key(str(cart_sample.id)) == cart_sample.key
+        assert len(cart_sample.key) == 16
+        assert cart_key("invalid-id") is None
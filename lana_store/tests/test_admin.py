@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import pytest
+import requests
+from _pytest.monkeypatch import MonkeyPatch
+
+from lana_store import admin
+from lana_store.core.config import settings
+from lana_store.db import CartStore
+from lana_store.models.cart import Cart
+
+
+def test_download_upload_export(
+    client: requests.Session,
+    carts_db: CartStore,
+    cart_with_pen: Cart,
+    tmp_path: Path,
+    monkeypatch: MonkeyPatch,
+) -> None:
+    """
+    Test that the carts are moved out to an export file and back in.
+    """
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    path = str(tmp_path / "carts.lcex")
+
+    size = admin.download_export(client, "", "secret", path)
+
+    assert size == Path(path).stat().st_size
+    carts_db.clear()
+
+    assert admin.upload_export(client, "", "secret", path) == 1
+    assert carts_db.get(str(cart_with_pen.id)).products == ["PEN"]  # type: ignore
+
+
+def test_download_export_unauthorized(
+    client: requests.Session, tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    """
+    Test that refused exports are reported.
+    """
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+
+    with pytest.raises(requests.HTTPError):
+        admin.download_export(client, "", "wrong", str(tmp_path / "carts.lcex"))
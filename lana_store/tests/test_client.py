@@ -0,0 +1,84 @@
+import threading
+
+import requests
+from _pytest.monkeypatch import MonkeyPatch
+
+from lana_client import pricing
+from lana_client.api import LanaStoreApi
+from lana_client.config import settings as client_settings
+from lana_client.mirror import CartMirror
+from lana_store.core.config import settings
+from lana_store.core.pricing import price_counts
+from lana_store.models.cart import Cart
+from lana_store.models.product import PRODUCT_CODES
+
+
+def test_client_pricing_matches_store() -> None:
+    """
+    Test that the products and pricing rules the client prices carts with
+    locally are the ones of the store.
+    """
+    assert tuple(client_settings.CLIENT_PRODUCT_CODES) == PRODUCT_CODES
+    assert client_settings.CLIENT_PRODUCT_PRICES == {
+        code: product["price"] for code, product in settings.PRODUCT_TABLE.items()
+    }
+    assert client_settings.CLIENT_PRICING_RULES == settings.PRICING_RULES
+    assert client_settings.CLIENT_MONEY_DECIMALS == settings.MONEY_DECIMALS
+
+    for count in range(10):
+        for ordinal, product in enumerate(PRODUCT_CODES):
+            counts = [0] * len(PRODUCT_CODES)
+            counts[ordinal] = count
+            assert pricing.price_products([product] * count) == price_counts(counts)
+
+
+def test_mirror_out_of_sync(
+    client: requests.Session, cart_with_pen: Cart, monkeypatch: MonkeyPatch
+) -> None:
+    """
+    Test that a pushed change the mirror cannot apply has the cart fetched
+    again instead of stopping the mirror.
+    """
+    api = LanaStoreApi()
+    monkeypatch.setattr(api, "session", client)
+    mirror = CartMirror(str(cart_with_pen.id), api, lambda mirror: None, lambda resp: None)
+
+    keeps_watching = mirror.apply_event(
+        ("products_updated", 5, {"added": [], "removed": [{"product": "MUG", "quantity": 1}]})
+    )
+
+    assert keeps_watching
+    assert mirror.products == ["PEN"]
+    assert mirror.version == cart_with_pen.version
+
+
+def test_mirror_resync_without_lock(
+    client: requests.Session, cart_with_pen: Cart, monkeypatch: MonkeyPatch
+) -> None:
+    """
+    Test that the cart is fetched again without holding the mirror lock, and
+    that the changes pushed meanwhile are applied on top of it.
+    """
+    api = LanaStoreApi()
+    monkeypatch.setattr(api, "session", client)
+    mirror = CartMirror(str(cart_with_pen.id), api, lambda mirror: None, lambda resp: None)
+    get_cart = api.get_cart
+
+    def racing_get_cart(cart_id: str) -> requests.Response:
+        # Another thread can apply changes meanwhile
+        locked = threading.Thread(target=lambda: mirror.apply_event(
+            ("cart", cart_with_pen.version + 1, {"products": ["MUG"]})
+        ))
+        locked.start()
+        locked.join(1)
+        assert not locked.is_alive()
+        return get_cart(cart_id)
+
+    monkeypatch.setattr(api, "get_cart", racing_get_cart)
+
+    mirror.apply_event(
+        ("products_updated", 0, {"added": [], "removed": [{"product": "MUG", "quantity": 1}]})
+    )
+
+    assert mirror.products == ["MUG"]
+    assert mirror.version == cart_with_pen.version + 1
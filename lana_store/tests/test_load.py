@@ -0,0 +1,76 @@
+from typing import Any, Dict, Optional
+
+import pytest
+
+from benchmarks.load import compare, DEFAULT_MIX, parse_mix, percentile
+
+
+def results(
+    throughput: float, p99: float, bytes_per_cart: Optional[float] = 300.0
+) -> Dict[str, Any]:
+    return {
+        "throughput": throughput,
+        "latency_ms": {"all": {"p50": 1.0, "p99": p99, "p999": 10.0}},
+        "bytes_per_cart": bytes_per_cart,
+    }
+
+
+def test_parse_mix() -> None:
+    """
+    Test that operation mixes are parsed :func:`benchmarks.load.parse_mix`.
+    """
+    assert parse_mix("create=1,patch=6,get=4,delete=1") == DEFAULT_MIX
+    assert parse_mix("get=1,create=0") == {"get": 1, "create": 0}
+
+
+@pytest.mark.parametrize("text", ["buy=1", "get=-1", "get=x", "get=0,delete=0", ""])
+def test_parse_mix_invalid(text: str) -> None:
+    """
+    Test that unknown operations and invalid weights are refused
+    :func:`benchmarks.load.parse_mix`.
+    """
+    with pytest.raises(ValueError):
+        parse_mix(text)
+
+
+def test_percentile() -> None:
+    """
+    Test the nearest-rank percentiles :func:`benchmarks.load.percentile`.
+    """
+    values = [float(value) for value in range(1, 1001)]
+
+    assert percentile(values, 50) == 500.0
+    assert percentile(values, 99) == 990.0
+    assert percentile(values, 99.9) == 999.0
+    assert percentile(values, 100) == 1000.0
+    assert percentile(values, 0) == 1.0
+    assert percentile([7.0], 99.9) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare() -> None:
+    """
+    Test that only the metrics worse than the baseline by more than the
+    threshold are regressions :func:`benchmarks.load.compare`.
+    """
+    baseline = results(throughput=1000.0, p99=5.0)
+
+    assert compare(results(throughput=950.0, p99=5.4), baseline, 10) == []
+    assert compare(results(throughput=2000.0, p99=1.0), baseline, 10) == []
+
+    regressions = compare(results(throughput=800.0, p99=6.0), baseline, 10)
+    assert [regression.split(":")[0] for regression in regressions] == [
+        "throughput",
+        "latency_p99_ms",
+    ]
+
+
+def test_compare_missing_metrics() -> None:
+    """
+    Test that metrics missing from the results or the baseline are not
+    compared :func:`benchmarks.load.compare`.
+    """
+    baseline = results(throughput=1000.0, p99=5.0, bytes_per_cart=None)
+
+    assert compare(results(throughput=1000.0, p99=5.0, bytes_per_cart=900.0), baseline, 10) == []
+    assert compare(results(throughput=1000.0, p99=5.0, bytes_per_cart=None), baseline, 10) == []
@@ -0,0 +1,94 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Generator
+
+import pytest
+import requests
+from _pytest.monkeypatch import MonkeyPatch
+
+from lana_store import main
+from lana_store.core import metrics
+from lana_store.core.config import settings
+
+
+@pytest.fixture
+def openapi_schema_path(tmp_path: Path, monkeypatch: MonkeyPatch) -> Generator[Path, None, None]:
+    """
+    Precomputed OpenAPI schema file.
+    """
+    path = tmp_path / "openapi.json"
+    path.write_bytes(b'{"openapi": "3.0.2", "paths": {}}')
+    monkeypatch.setattr(settings, "OPENAPI_SCHEMA_PATH", str(path))
+    main.openapi_schema.cache_clear()
+
+    yield path
+
+    main.openapi_schema.cache_clear()
+
+
+def test_metrics(client: requests.Session) -> None:
+    """
+    Test that the metrics of the requests and the carts are exposed at `/metrics`.
+    """
+    carts_created = metrics.carts_created.value()
+    pens_added = metrics.products_added.value(("PEN",))
+    cart_requests = metrics.http_request_duration.count(
+        ("PATCH", f"{settings.API_V1_STR}/carts/{{cart_id}}", "200")
+    )
+
+    id = client.post(f"{settings.API_V1_STR}/carts/").json()["id"]
+    client.patch(f"{settings.API_V1_STR}/carts/{id}", json={"product": "PEN"})
+
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert metrics.carts_created.value() == carts_created + 1
+    assert metrics.products_added.value(("PEN",)) == pens_added + 1
+    assert (
+        metrics.http_request_duration.count(
+            ("PATCH", f"{settings.API_V1_STR}/carts/{{cart_id}}", "200")
+        )
+        == cart_requests + 1
+    )
+    assert "\nlana_carts 1\n" in resp.text
+    assert 'lana_products_added_total{product="PEN"}' in resp.text
+    assert "lana_cart_pricing_seconds_count" in resp.text
+
+
+def test_openapi(client: requests.Session) -> None:
+    """
+    Test that the OpenAPI schema is served once generated.
+    """
+    resp = client.get(main.OPENAPI_URL)
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.json() == main.app.openapi()
+    assert client.get(main.OPENAPI_URL).content == resp.content
+
+
+def test_openapi_precomputed(client: requests.Session, openapi_schema_path: Path) -> None:
+    """
+    Test that the OpenAPI schema is read from the precomputed file when set.
+    """
+    resp = client.get(main.OPENAPI_URL)
+
+    assert resp.status_code == 200
+    assert resp.json() == json.loads(openapi_schema_path.read_bytes())
+
+
+def test_import_defers_batch_pricing() -> None:
+    """
+    Test that importing the app does not import numpy (only needed by the carts totals).
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, lana_store.main; print('numpy' in sys.modules)"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    assert result.stdout.strip() == "False"
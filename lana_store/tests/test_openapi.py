@@ -0,0 +1,17 @@
+import json
+from pathlib import Path
+
+from lana_store import openapi
+from lana_store.main import app
+
+
+def test_main(tmp_path: Path) -> None:
+    """
+    Test that the precomputed OpenAPI schema is the one of the app.
+    """
+    path = tmp_path / "openapi.json"
+
+    openapi.main([str(path)])
+
+    assert path.read_bytes() == openapi.encode_schema(app)
+    assert json.loads(path.read_bytes()) == app.openapi()
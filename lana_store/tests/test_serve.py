@@ -0,0 +1,78 @@
+import multiprocessing
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from fastapi import status
+from fastapi.testclient import TestClient
+
+import lana_store
+from lana_store import serve
+from lana_store.api.v1.api import api_router
+from lana_store.core.config import Settings, settings
+from lana_store.db.shm import SharedMemoryCartStore
+from lana_store.main import app
+
+
+def test_per_process_settings_are_refused(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that features keeping their state in every process are refused with
+    several workers :func:`lana_store.serve.main`.
+    """
+    monkeypatch.setattr(serve, "settings", Settings(MAX_CARTS=10, CARTS_INDEX_ENABLED=False))
+
+    assert serve.per_process_settings() == ["MAX_CARTS"]
+    with pytest.raises(SystemExit):
+        serve.main(["--workers", "2"])
+
+
+def test_per_process_state_is_disabled(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the per-process features on by default are turned off for the
+    workers :func:`lana_store.serve.disable_per_process_state`.
+    """
+    monkeypatch.setattr(lana_store, "index", lana_store.index)
+    monkeypatch.setattr(lana_store, "analytics", lana_store.analytics)
+    monkeypatch.setattr(settings, "EVENTS_ENABLED", True)
+
+    serve.disable_per_process_state()
+
+    assert lana_store.index is None
+    assert lana_store.analytics is None
+    assert not settings.EVENTS_ENABLED
+
+
+def test_workers_share_carts(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that a cart created through a worker process is found, updated and
+    deleted through another one.
+    """
+    store = SharedMemoryCartStore(capacity=100)
+    monkeypatch.setattr(lana_store, "carts_db", store)
+    ctx = multiprocessing.get_context("fork")
+    ids = ctx.Queue()
+
+    def create() -> None:
+        with TestClient(app) as client:
+            resp = client.post(f"{settings.API_V1_STR}{api_router.url_path_for('create_cart')}")
+            ids.put(resp.json()["id"])
+
+    def check(cart_id: str) -> None:
+        with TestClient(app) as client:
+            url = f"{settings.API_V1_STR}{api_router.url_path_for('get_cart', cart_id=cart_id)}"
+            assert client.get(url).status_code == status.HTTP_200_OK
+            client.patch(url, json={"product": "PEN"})
+
+    try:
+        creator = ctx.Process(target=create)
+        creator.start()
+        cart_id = ids.get(timeout=30)
+        creator.join()
+        checker = ctx.Process(target=check, args=(cart_id,))
+        checker.start()
+        checker.join()
+
+        assert creator.exitcode == 0
+        assert checker.exitcode == 0
+        assert store.get(cart_id).products == ["PEN"]  # type: ignore
+    finally:
+        store.close()